@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import os
+import resource
+import runpy
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Scaling benchmarks on synthetic data (no exchange files needed).
+#
+# Every (benchmark, size) case runs in a fresh spawned process inside a temporary
+# working directory, so peak RSS is per case and nothing touches data/processed.
+#
+# e.g. python src/bench_pipeline.py --sizes 1e4,1e5,1e6,1e7 --out bench.csv
+
+DATE = "2024-11-05"
+T_DAY = 86400.0
+ALPHA, BETA = 0.5, 2.0
+BENCHES = ["loglik", "fit", "lambda_grid", "premium", "premium_stream", "regime"]
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _events(n, seed=0):
+    from hawkes_sim import simulate, mu_for_count
+    t = simulate(mu_for_count(n, ALPHA, BETA, T_DAY), ALPHA, BETA, T_DAY, seed)
+    return t - t[0], t[-1] - t[0]
+
+
+def bench_loglik(n):
+    from hawkes_exp import neg_loglik
+    t, T = _events(n)
+    x = np.array([len(t) * (1 - ALPHA / BETA) / T, ALPHA, BETA])
+    reps = max(1, int(2e6 // max(len(t), 1)))
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        neg_loglik(x, t, T)
+    dt = (time.perf_counter() - t0) / reps
+    return {"items": len(t), "seconds": dt, "note": f"value+grad, {reps} reps"}
+
+
+def bench_fit(n):
+    from scipy.optimize import minimize
+    from hawkes_exp import neg_loglik
+    t, T = _events(n)
+    x0 = np.array([1.5 * len(t) * (1 - ALPHA / BETA) / T, 0.5 * ALPHA, 0.7 * BETA])
+    t0 = time.perf_counter()
+    res = minimize(neg_loglik, x0, args=(t, T, 0.999), jac=True, method="L-BFGS-B",
+                   bounds=[(1e-9, None)] * 3)
+    dt = time.perf_counter() - t0
+    return {"items": len(t), "seconds": dt, "note": f"nit={res.nit} nfev={res.nfev} beta={res.x[2]:.3f}"}
+
+
+def bench_lambda_grid(n):
+    from hawkes_exp import intensity_at
+    t, T = _events(n)
+    grid = np.arange(0.0, T, 0.1)  # 100ms grid
+    mu = len(t) * (1 - ALPHA / BETA) / T
+    t0 = time.perf_counter()
+    intensity_at(t, grid, mu, ALPHA, BETA)
+    dt = time.perf_counter() - t0
+    return {"items": len(grid), "seconds": dt, "note": f"{len(t)} events, 100ms grid"}
+
+
+def _tape(n):
+    from synthetic_tape import generate_day
+    counts = generate_day(DATE, trades=n, seed=0)
+    return sum(counts.values())
+
+
+def bench_premium(n):
+    import build_premium_1s
+    rows = _tape(n)
+    t0 = time.perf_counter()
+    build_premium_1s.build(DATE)
+    return {"items": rows, "seconds": time.perf_counter() - t0, "note": "in-memory groupby/pivot"}
+
+
+def bench_premium_stream(n):
+    import build_premium_1s
+    rows = _tape(n)
+    t0 = time.perf_counter()
+    build_premium_1s.build_stream(DATE)
+    return {"items": rows, "seconds": time.perf_counter() - t0, "note": "k-way merge"}
+
+
+def bench_regime(n):
+    import series_store
+    # n premium rows (3 venues per second, spilling over several days if needed)
+    rng = np.random.default_rng(0)
+    secs = int(np.ceil(n / 3))
+    t_sec = 1730764800 + np.arange(secs)
+    prem = pd.DataFrame({
+        "t_sec": np.repeat(t_sec, 3)[:n],
+        "venue": np.tile(["binance", "bybit", "gate"], secs)[:n],
+        "log_premium": rng.normal(0, 1e-4, n),
+    })
+    Path("data/processed").mkdir(parents=True, exist_ok=True)
+    prem.to_csv(f"data/processed/premium_1s_BTCUSDT_{DATE}.csv", index=False)
+    series_store.write_lambda(f"data/processed/hawkes_lambda_1s_{DATE}.bin", rng.lognormal(0, 1, secs), t_sec[0])
+
+    script = Path(__file__).with_name("premium_vs_hawkes_regime.py")
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        runpy.run_path(str(script), run_name="__main__")
+    return {"items": n, "seconds": time.perf_counter() - t0, "note": "script end-to-end incl. CSV I/O"}
+
+
+def _run_case(name, n):
+    # Child process entry point
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent))
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        base = _peak_rss_mb()
+        r = globals()[f"bench_{name}"](n)
+    r.update({
+        "bench": name,
+        "size": n,
+        "per_second": r["items"] / r["seconds"] if r["seconds"] > 0 else float("inf"),
+        "peak_rss_mb": _peak_rss_mb(),
+        "base_rss_mb": base,
+    })
+    return r
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--benches", default=",".join(BENCHES))
+    ap.add_argument("--sizes", default="1e4,1e5,1e6", help="up to 1e8 if the box has the memory")
+    ap.add_argument("--out", default=None, help="optional CSV of results")
+    args = ap.parse_args()
+
+    benches = [b for b in args.benches.split(",") if b]
+    unknown = set(benches) - set(BENCHES)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {sorted(unknown)}")
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s]
+
+    rows = []
+    ctx = get_context("spawn")
+    for name in benches:
+        for n in sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+                r = ex.submit(_run_case, name, n).result()
+            rows.append(r)
+            print(f"{name:15s} n={n:>11,d}  {r['seconds']:9.4f}s  {r['per_second']:14,.0f}/s  "
+                  f"peak {r['peak_rss_mb']:8.1f} MB  ({r['note']})", flush=True)
+
+    res = pd.DataFrame(rows)[["bench", "size", "items", "seconds", "per_second", "peak_rss_mb", "base_rss_mb", "note"]]
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        res.to_csv(args.out, index=False)
+        print("Wrote:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,212 @@
+import argparse
+import heapq
+import math
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
-IN_FILES = [
-    Path("data/processed/binance_BTCUSDT_2024-11-05.csv"),
-    Path("data/processed/bybit_BTCUSDT_2024-11-05.csv"),
-    Path("data/processed/gate_BTCUSDT_2024-11-05.csv"),
-]
-
-OUT = Path("data/processed/premium_1s_BTCUSDT_2024-11-05.csv")
-
-dfs = []
-for f in IN_FILES:
-    df = pd.read_csv(f, usecols=["ts_ms","venue","symbol","price","qty_base","side"])
-    df["ts_ms"] = pd.to_numeric(df["ts_ms"], errors="coerce").astype("int64")
-    df["price"] = pd.to_numeric(df["price"], errors="coerce")
-    df["qty_base"] = pd.to_numeric(df["qty_base"], errors="coerce")
-    dfs.append(df)
-
-tape = pd.concat(dfs, ignore_index=True)
-tape = tape.dropna(subset=["ts_ms","price"])
-tape = tape.sort_values(["ts_ms"])
-
-# Bucket to 1-second bins in UTC (ms)
-tape["t_sec"] = (tape["ts_ms"] // 1000).astype("int64")
-
-# Per venue, per second: last trade price in that second
-px = (
-    tape.groupby(["t_sec","venue"], as_index=False)
-        .agg(price_last=("price","last"))
-)
-
-# Pivot to wide (one column per venue)
-wide = px.pivot(index="t_sec", columns="venue", values="price_last").sort_index()
-
-# Reference price = median across venues available in that second
-ref = wide.median(axis=1, skipna=True)
-
-# Build long premium table
-rows = []
-for venue in wide.columns:
-    p = wide[venue]
-    prem = np.log(p) - np.log(ref)
-    rows.append(pd.DataFrame({
-        "t_sec": wide.index.values,
-        "dt_utc": pd.to_datetime(wide.index.values, unit="s", utc=True),
-        "venue": venue,
-        "symbol": "BTCUSDT",
-        "price_venue": p.values,
-        "price_ref": ref.values,
-        "log_premium": prem.values
-    }))
-
-prem_df = pd.concat(rows, ignore_index=True)
-
-# Drop rows where venue price missing (can't compute premium)
-prem_df = prem_df.dropna(subset=["price_venue","price_ref","log_premium"])
-
-OUT.parent.mkdir(parents=True, exist_ok=True)
-prem_df.to_csv(OUT, index=False)
-
-print("Wrote:", OUT)
-print("Rows:", len(prem_df))
-print("\nCoverage (seconds with venue price):")
-print(prem_df.groupby("venue")["t_sec"].nunique())
-
-print("\nPremium summary (log units):")
-print(prem_df.groupby("venue")["log_premium"].describe()[["mean","std","min","max"]])
+import trade_store
+import instrument
+
+DATE = "2024-11-05"
+VENUES = ["binance", "bybit", "gate"]
+
+# Streaming mode: trades per batch read from each venue's partition
+BATCH_ROWS = 1_000_000
+# Streaming mode: output rows buffered before each CSV append
+FLUSH_ROWS = 200_000
+
+
+def out_path(date: str) -> Path:
+    return Path(f"data/processed/premium_1s_BTCUSDT_{date}.csv")
+
+
+@instrument.timed("build_premium_1s")
+def build(date: str, venues=VENUES):
+    # Typed columns straight from the trade store (only what we need)
+    tape = trade_store.read_trades(venues=venues, dates=[date], columns=["ts_ms","venue","price"])
+    tape = tape.dropna(subset=["ts_ms","price"])
+    tape = tape.sort_values(["ts_ms"], kind="stable")
+
+    # Bucket to 1-second bins in UTC (ms)
+    tape["t_sec"] = (tape["ts_ms"] // 1000).astype("int64")
+
+    # Per venue, per second: last trade price in that second
+    px = (
+        tape.groupby(["t_sec","venue"], as_index=False)
+            .agg(price_last=("price","last"))
+    )
+
+    # Pivot to wide (one column per venue)
+    wide = px.pivot(index="t_sec", columns="venue", values="price_last").sort_index()
+
+    # Reference price = median across venues available in that second
+    ref = wide.median(axis=1, skipna=True)
+
+    # Build long premium table
+    rows = []
+    for venue in wide.columns:
+        p = wide[venue]
+        prem = np.log(p) - np.log(ref)
+        rows.append(pd.DataFrame({
+            "t_sec": wide.index.values,
+            "dt_utc": pd.to_datetime(wide.index.values, unit="s", utc=True),
+            "venue": venue,
+            "symbol": "BTCUSDT",
+            "price_venue": p.values,
+            "price_ref": ref.values,
+            "log_premium": prem.values
+        }))
+
+    prem_df = pd.concat(rows, ignore_index=True)
+
+    # Drop rows where venue price missing (can't compute premium)
+    prem_df = prem_df.dropna(subset=["price_venue","price_ref","log_premium"])
+
+    out = out_path(date)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    prem_df.to_csv(out, index=False)
+    instrument.current().tag(date=date, venues=list(venues)).rows(len(tape), "trades").rows(len(prem_df))
+    return out, prem_df
+
+
+def venue_seconds(date: str, venue: str, batch_rows: int = BATCH_ROWS):
+    # (t_sec, last price) per second for one venue, from its ts-sorted partition.
+    # A second that straddles two batches is held back until a later second appears.
+    pend = None
+    for b in trade_store.iter_batches(
+        venues=[venue], dates=[date], columns=["ts_ms","price"], batch_size=batch_rows
+    ):
+        b = b.dropna(subset=["ts_ms","price"])
+        sec = b["ts_ms"].to_numpy(np.int64) // 1000
+        px = b["price"].to_numpy(np.float64)
+        if len(sec) == 0:
+            continue
+        if np.any(sec[1:] < sec[:-1]) or (pend is not None and sec[0] < pend[0]):
+            raise SystemExit(f"{venue} {date} partition is not sorted by ts_ms.")
+
+        # last trade of each run of equal seconds
+        last = np.flatnonzero(np.append(sec[1:] != sec[:-1], True))
+        for t_sec, price in zip(sec[last].tolist(), px[last].tolist()):
+            if pend is not None and pend[0] != t_sec:
+                yield pend
+            pend = (t_sec, price)
+    if pend is not None:
+        yield pend
+
+
+def _tagged(seconds, venue):
+    for t_sec, price in seconds:
+        yield t_sec, venue, price
+
+
+def _log(x):
+    # np.log semantics without the array round trip: log(0) = -inf, log(x < 0) = NaN
+    return math.log(x) if x > 0 else (-math.inf if x == 0 else math.nan)
+
+
+def _median(xs):
+    xs = sorted(xs)
+    m = len(xs) // 2
+    return xs[m] if len(xs) % 2 else 0.5 * (xs[m - 1] + xs[m])
+
+
+@instrument.timed("build_premium_1s_stream")
+def build_stream(date: str, venues=VENUES, batch_rows: int = BATCH_ROWS):
+    # k-way merge of the per-venue second streams in time order; only the current
+    # second's last price per venue is held, and each second is emitted as it closes.
+    # Works for any number of venues. Rows come out time-ordered (venue-ordered
+    # within a second) rather than grouped by venue.
+    streams = [_tagged(venue_seconds(date, venue, batch_rows), venue) for venue in venues]
+
+    out = out_path(date)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.exists():
+        out.unlink()
+
+    cols = {"t_sec": [], "venue": [], "price_venue": [], "price_ref": [], "log_premium": []}
+    stats = {"rows": 0, "coverage": {}}
+
+    def flush():
+        if not cols["t_sec"]:
+            return
+        df = pd.DataFrame({
+            "t_sec": cols["t_sec"],
+            "dt_utc": pd.to_datetime(cols["t_sec"], unit="s", utc=True),
+            "venue": cols["venue"],
+            "symbol": "BTCUSDT",
+            "price_venue": cols["price_venue"],
+            "price_ref": cols["price_ref"],
+            "log_premium": cols["log_premium"],
+        })
+        df.to_csv(out, mode="a", header=not out.exists(), index=False)
+        for v in cols.values():
+            v.clear()
+
+    def close_second(t_sec, last):
+        # Reference price = median across venues available in that second
+        ref = _median(last.values())
+        log_ref = _log(ref)
+        for venue, p in last.items():
+            prem = _log(p) - log_ref
+            if math.isnan(prem):
+                continue  # dropped, as the in-memory build drops NaN premiums
+            cols["t_sec"].append(t_sec)
+            cols["venue"].append(venue)
+            cols["price_venue"].append(p)
+            cols["price_ref"].append(ref)
+            cols["log_premium"].append(prem)
+            stats["coverage"][venue] = stats["coverage"].get(venue, 0) + 1
+            stats["rows"] += 1
+        if len(cols["t_sec"]) >= FLUSH_ROWS:
+            flush()
+
+    cur = None
+    last = {}
+    for t_sec, venue, price in heapq.merge(*streams):
+        if t_sec != cur:
+            if last:
+                close_second(cur, last)
+            cur = t_sec
+            last = {}
+        last[venue] = price
+    if last:
+        close_second(cur, last)
+    flush()
+    if not out.exists():
+        # nothing emitted: header-only file, like the in-memory build
+        pd.DataFrame(columns=["t_sec", "dt_utc", "venue", "symbol", "price_venue", "price_ref", "log_premium"]) \
+            .to_csv(out, index=False)
+
+    instrument.current().tag(date=date, venues=list(venues), batch_rows=batch_rows).rows(stats["rows"])
+    return out, stats
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--venues", default=",".join(VENUES))
+    ap.add_argument("--stream", action="store_true", help="constant-memory k-way merge over venue tapes")
+    args = ap.parse_args()
+    venues = [v for v in args.venues.split(",") if v]
+
+    if args.stream:
+        out, stats = build_stream(args.date, venues)
+        print("Wrote:", out)
+        print("Rows:", stats["rows"])
+        print("\nCoverage (seconds with venue price):")
+        print(pd.Series(stats["coverage"], name="t_sec").sort_index())
+        return
+
+    out, prem_df = build(args.date, venues)
+    print("Wrote:", out)
+    print("Rows:", len(prem_df))
+    print("\nCoverage (seconds with venue price):")
+    print(prem_df.groupby("venue")["t_sec"].nunique())
+
+    print("\nPremium summary (log units):")
+    print(prem_df.groupby("venue")["log_premium"].describe()[["mean","std","min","max"]])
+
+
+if __name__ == "__main__":
+    main()
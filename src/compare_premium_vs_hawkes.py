@@ -1,41 +1,27 @@
-import pandas as pd
 from pathlib import Path
 
-PREM = Path("data/processed/premium_1s_BTCUSDT_2024-11-05.csv")
-LAM_OLD = Path("data/processed/hawkes_lambda_1s_2024-11-05.csv")
-LAM_NEW = Path("data/processed/hawkes_lambda_1s_strict_2024-11-05.csv")
+import instrument
+import panel_1s
+import regime_stats
 
-prem = pd.read_csv(PREM)
-old = pd.read_csv(LAM_OLD)[["t_sec","lambda"]].rename(columns={"lambda":"lambda_old"})
-new = pd.read_csv(LAM_NEW)[["t_sec","lambda"]].rename(columns={"lambda":"lambda_strict"})
+DATE = "2024-11-05"
+rec = instrument.track("compare_premium_vs_hawkes", date=DATE)
 
-df = prem.merge(old, on="t_sec", how="left").merge(new, on="t_sec", how="left")
+panel = panel_1s.read(DATE)
+df = panel_1s.long(panel, extra=["lambda", "lambda_strict"]).rename(columns={"lambda": "lambda_old"})
 df = df.dropna(subset=["log_premium","lambda_old","lambda_strict"])
-
-def regime_from_lambda(x, p50, p90, p99):
-    if x >= p99: return ">=p99"
-    if x >= p90: return "p90-p99"
-    if x >= p50: return "p50-p90"
-    return "<p50"
-
-out_rows = []
-
-for col in ["lambda_old", "lambda_strict"]:
-    p50 = df[col].quantile(0.50)
-    p90 = df[col].quantile(0.90)
-    p99 = df[col].quantile(0.99)
-    tmp = df.copy()
-    tmp["regime"] = tmp[col].apply(lambda z: regime_from_lambda(z, p50, p90, p99))
-    stats = tmp.groupby("regime")["log_premium"].describe()[["count","mean","std","min","max"]]
-    stats["model"] = col
-    stats["p50"] = p50
-    stats["p90"] = p90
-    stats["p99"] = p99
-    out_rows.append(stats.reset_index())
-
-res = pd.concat(out_rows, ignore_index=True)
+rec.rows(len(df))
+
+# Both models in one vectorized pass (regimes by each model's own pooled quantiles)
+LABELS = ["<p50", "p50-p90", "p90-p99", ">=p99"]
+res = regime_stats.regime_stats(df, ["lambda_old", "lambda_strict"], by=None, regime_labels=LABELS)
+# Same row order as the old per-model groupby("regime"): model blocks, regimes sorted by label
+res = res.sort_values(["model", "regime"], kind="stable", ignore_index=True)
+res = res[["regime","count","mean","std","min","max","model","p50","p90","p99"]]
 OUT = Path("data/processed/premium_regime_compare_old_vs_strict.csv")
 res.to_csv(OUT, index=False)
 
 print("Wrote:", OUT)
 print(res)
+
+rec.finish()
@@ -1,9 +1,35 @@
 import csv
 import argparse
-from collections import deque
+import math
+import numpy as np
+import pandas as pd
 from datetime import datetime, timezone
 from pathlib import Path
 
+import hawkes_intensity_1s
+import panel_1s
+import rolling_engine
+import series_store
+
+# Shock-window series (raw premium, rolling means, EWMA) for many centers x venues.
+#
+# Windows are cut from the aligned 1s panel: each read is limited to
+# [center - window - look-back, center + window], which parquet prunes to the hourly
+# row groups involved, and the window edges are found by np.searchsorted on the
+# sorted t_sec. Rolling means and the EWMA need history, so each venue gets a
+# look-back of enough of its own rows for the longest rolling window and for the
+# EWMA to forget its start (weight < EWMA_TOL); sparse venues extend it by doubling.
+# Cost is set by the window and look-back size, not the day.
+#
+# Centers: --center / --centers (ISO timestamps) or --top-lambda K, the K highest
+# 1s lambda seconds at least --min-gap seconds apart.
+
+DATE = "2024-11-05"
+VENUES = ["binance", "bybit", "gate"]
+OUT_DIR = Path("outputs/figures")
+EWMA_TOL = 1e-12
+
+
 def parse_dt_utc(s: str) -> datetime:
     s = s.strip().replace(" ", "T")
     dt = datetime.fromisoformat(s)
@@ -11,85 +37,111 @@ def parse_dt_utc(s: str) -> datetime:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
 
-def mean(dq: deque) -> float:
-    return sum(dq) / len(dq) if dq else float("nan")
+
+def out_path(venue: str, center: int) -> Path:
+    stamp = datetime.fromtimestamp(center, tz=timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return OUT_DIR / f"shock_window_{venue}_{stamp}.csv"
+
+
+def index_path(date: str) -> Path:
+    return OUT_DIR / f"shock_windows_{date}.csv"
+
+
+def top_lambda_centers(date: str, k: int, min_gap: int, kernel: str = "exp"):
+    # The k highest lambda seconds, greedily skipping any within min_gap of a pick
+    lam, meta = series_store.read(hawkes_intensity_1s.out_path(date, kernel))
+    _, t_sec = series_store.grid_seconds(meta)
+    order = np.argsort(-np.asarray(lam), kind="stable")
+    picked = []
+    for i in order:
+        t = int(t_sec[i])
+        if all(abs(t - p) >= min_gap for p in picked):
+            picked.append(t)
+            if len(picked) == k:
+                break
+    return sorted(picked)
+
+
+def warmup_rows(roll_windows, ewma_span: int) -> int:
+    alpha = 2.0 / (ewma_span + 1.0)
+    return max(max(roll_windows), math.ceil(math.log(EWMA_TOL) / math.log(1.0 - alpha)))
+
+
+def extract(date: str, centers, venues=VENUES, window: int = 30, roll30: int = 30,
+            roll300: int = 300, ewma_span: int = 30):
+    # Writes one CSV per (center, venue); returns the index rows
+    first, _ = panel_1s.span(date)
+    need = warmup_rows([roll30, roll300], ewma_span)
+    rows = []
+    for center in centers:
+        start, end = center - window, center + window
+        look = need
+        while True:
+            lo = max(first, start - look)
+            panel = panel_1s.read(date, lo, end, columns=[f"premium_{v}" for v in venues])
+            t = panel["t_sec"].to_numpy()
+            s = np.searchsorted(t, start, side="left")
+            short = [v for v in venues if panel[f"premium_{v}"].iloc[:s].notna().sum() < need]
+            if not short or lo == first:
+                break
+            look *= 2
+
+        for v in venues:
+            x = panel[f"premium_{v}"].to_numpy()
+            m = ~np.isnan(x)
+            tv, xv = t[m], x[m]
+            sig = rolling_engine.compute(xv, [f"r30=mean:{roll30}:1", f"r300=mean:{roll300}:1", f"ewma=ewm:{ewma_span}"])
+            a = np.searchsorted(tv, start, side="left")
+            b = np.searchsorted(tv, end, side="right")
+
+            out = out_path(v, center)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            with out.open("w", newline="") as g:
+                writer = csv.writer(g)
+                writer.writerow(["dt_utc", "venue", "log_premium", "roll_mean_30s", "roll_mean_300s", "ewma_30s"])
+                for j in range(a, b):
+                    writer.writerow([
+                        datetime.fromtimestamp(int(tv[j]), tz=timezone.utc).isoformat(), v,
+                        f"{xv[j]:.12g}", f"{sig['r30'][j]:.12g}", f"{sig['r300'][j]:.12g}", f"{sig['ewma'][j]:.12g}",
+                    ])
+            rows.append({"center": center, "venue": v, "path": str(out), "rows": int(b - a),
+                         "lookback_seconds": int(start - lo)})
+    return rows
+
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--infile", required=True)
-    ap.add_argument("--venue", required=True, choices=["binance","bybit","gate"])
-    ap.add_argument("--center", required=True)  # e.g. 2024-11-05T15:30:27+00:00
+    ap.add_argument("--date", default=None, help="panel day (default: the first center's UTC day)")
+    ap.add_argument("--venue", default=None, choices=VENUES, help="one venue (default: all)")
+    ap.add_argument("--venues", default=",".join(VENUES))
+    ap.add_argument("--center", default=None)  # e.g. 2024-11-05T15:30:27+00:00
+    ap.add_argument("--centers", default=None, help="comma-separated ISO timestamps")
+    ap.add_argument("--top-lambda", type=int, default=None, help="use the K highest lambda seconds as centers")
+    ap.add_argument("--min-gap", type=int, default=None, help="seconds between top-lambda centers (default 2*window)")
+    ap.add_argument("--kernel", default="exp", help="lambda grid for --top-lambda")
     ap.add_argument("--window", type=int, default=30)
     ap.add_argument("--roll30", type=int, default=30)
     ap.add_argument("--roll300", type=int, default=300)
     ap.add_argument("--ewma_span", type=int, default=30)
     args = ap.parse_args()
 
-    infile = Path(args.infile)
-    if not infile.exists():
-        raise SystemExit(f"Missing infile: {infile}")
-
-    center = parse_dt_utc(args.center)
-    start = center.timestamp() - args.window
-    end   = center.timestamp() + args.window
-
-    alpha = 2.0 / (args.ewma_span + 1.0)
-    ewma = None
-
-    dq30 = deque()
-    dq300 = deque()
-
-    out_dir = Path("outputs/figures")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"shock_window_{args.venue}_{center.strftime('%Y%m%dT%H%M%SZ')}.csv"
-
-    wrote = 0
-    with infile.open("r", newline="") as f, out_path.open("w", newline="") as g:
-        reader = csv.DictReader(f)
-        need = {"dt_utc","venue","log_premium"}
-        missing = need - set(reader.fieldnames or [])
-        if missing:
-            raise SystemExit(f"Missing columns in {infile.name}: {sorted(missing)}")
-
-        writer = csv.DictWriter(g, fieldnames=[
-            "dt_utc","venue","log_premium","roll_mean_30s","roll_mean_300s","ewma_30s"
-        ])
-        writer.writeheader()
-
-        for row in reader:
-            venue = row["venue"].strip().lower()
-            if venue != args.venue:
-                continue
-
-            dt = parse_dt_utc(row["dt_utc"])
-            t = dt.timestamp()
-            prem = float(row["log_premium"])
-
-            dq30.append(prem)
-            if len(dq30) > args.roll30:
-                dq30.popleft()
-
-            dq300.append(prem)
-            if len(dq300) > args.roll300:
-                dq300.popleft()
-
-            ewma = prem if ewma is None else (alpha * prem + (1 - alpha) * ewma)
-
-            if start <= t <= end:
-                writer.writerow({
-                    "dt_utc": dt.isoformat(),
-                    "venue": venue,
-                    "log_premium": f"{prem:.12g}",
-                    "roll_mean_30s": f"{mean(dq30):.12g}",
-                    "roll_mean_300s": f"{mean(dq300):.12g}",
-                    "ewma_30s": f"{ewma:.12g}",
-                })
-                wrote += 1
-
-    if wrote == 0:
+    stamps = [s for s in ([args.center] if args.center else []) + (args.centers.split(",") if args.centers else []) if s]
+    centers = [int(parse_dt_utc(s).timestamp()) for s in stamps]
+    date = args.date or (datetime.fromtimestamp(centers[0], tz=timezone.utc).date().isoformat() if centers else DATE)
+    if args.top_lambda:
+        centers += top_lambda_centers(date, args.top_lambda, args.min_gap or 2 * args.window, args.kernel)
+    if not centers:
+        raise SystemExit("No centers: pass --center, --centers or --top-lambda")
+    venues = [args.venue] if args.venue else [v for v in args.venues.split(",") if v]
+
+    rows = extract(date, sorted(set(centers)), venues, args.window, args.roll30, args.roll300, args.ewma_span)
+    if not any(r["rows"] for r in rows):
         raise SystemExit("No rows written. Check venue/center timestamp.")
-    print("Wrote:", out_path)
-    print("Rows:", wrote)
+    index = pd.DataFrame(rows)
+    index.to_csv(index_path(date), index=False)
+    print("Wrote:", index_path(date))
+    print(index.to_string(index=False))
+
 
 if __name__ == "__main__":
     main()
@@ -1,63 +1,237 @@
+import argparse
+import gzip
+import io
+import json
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
-RAW = Path("data/raw/BTC_USDT-202411.csv.gz")
-OUT = Path("data/processed/gate_BTCUSDT_2024-11-05.csv")
+import trade_store
+import instrument
 
-# Nov 5, 2024 UTC boundaries in *seconds*
-START = 1730764800.0  # 2024-11-05 00:00:00 UTC
-END   = 1730851200.0  # 2024-11-06 00:00:00 UTC
+DATE = "2024-11-05"
+
+# Day index written by --split: per UTC day, row and (decompressed) byte ranges
+INDEX_DIR = Path("data/processed")
+
+# Decompressed bytes parsed per block in --split / indexed reads
+BLOCK_MB = 64
 
 cols = ["ts_s", "trade_id", "price", "qty_base", "side_code"]
 
-chunks = []
-total = 0
-kept = 0
 
-for chunk in pd.read_csv(
-    RAW,
-    header=None,
-    names=cols,
-    sep=",",
-    chunksize=2_000_000
-):
-    total += len(chunk)
+def raw_path(date: str) -> Path:
+    # Gate publishes one archive per month
+    return Path(f"data/raw/BTC_USDT-{date[:4]}{date[5:7]}.csv.gz")
+
+
+def day_bounds(date: str):
+    # UTC day boundaries in *seconds*
+    start = pd.Timestamp(date, tz="UTC").timestamp()
+    return start, start + 86400.0
+
 
+def index_path(raw: Path) -> Path:
+    return INDEX_DIR / f"gate_day_index_{raw.name.split('.')[0]}.json"
+
+
+def parse_block(data: bytes) -> pd.DataFrame:
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=cols, sep=",")
     # Ensure numeric types
     chunk["ts_s"] = pd.to_numeric(chunk["ts_s"], errors="coerce")
     chunk["price"] = pd.to_numeric(chunk["price"], errors="coerce")
     chunk["qty_base"] = pd.to_numeric(chunk["qty_base"], errors="coerce")
     chunk["side_code"] = pd.to_numeric(chunk["side_code"], errors="coerce")
+    return chunk
+
+
+def canonical(daily: pd.DataFrame) -> pd.DataFrame:
+    # Canonical fields (we'll finalize across venues next)
+    daily["venue"] = "gate"
+    daily["symbol"] = "BTCUSDT"
+
+    # Convert float seconds to integer milliseconds (keep precision)
+    daily["ts_ms"] = (daily["ts_s"] * 1000.0).round().astype("int64")
+    daily["dt_utc"] = pd.to_datetime(daily["ts_ms"], unit="ms", utc=True)
+
+    # Standardize side
+    daily["side"] = daily["side_code"].map({1: "Buy", 2: "Sell"}).fillna("Unknown")
+
+    # Reorder columns nicely
+    return daily[["ts_ms", "dt_utc", "venue", "symbol", "trade_id", "price", "qty_base", "side"]]
+
+
+def scan_day(raw: Path, date: str):
+    # Full-month scan, keeping one day
+    start, end = day_bounds(date)
+    chunks = []
+    total = 0
+    kept = 0
+
+    for chunk in pd.read_csv(
+        raw,
+        header=None,
+        names=cols,
+        sep=",",
+        chunksize=2_000_000
+    ):
+        total += len(chunk)
+
+        # Ensure numeric types
+        chunk["ts_s"] = pd.to_numeric(chunk["ts_s"], errors="coerce")
+        chunk["price"] = pd.to_numeric(chunk["price"], errors="coerce")
+        chunk["qty_base"] = pd.to_numeric(chunk["qty_base"], errors="coerce")
+        chunk["side_code"] = pd.to_numeric(chunk["side_code"], errors="coerce")
+
+        sub = chunk[(chunk["ts_s"] >= start) & (chunk["ts_s"] < end)].copy()
+        kept += len(sub)
+        if len(sub):
+            chunks.append(sub)
+
+    return chunks, kept, total
+
+
+def indexed_day(raw: Path, date: str, entry: dict):
+    # Seek straight to the day's byte range in the decompressed stream:
+    # gzip still inflates the prefix, but nothing outside the range is parsed.
+    start, end = day_bounds(date)
+    with gzip.open(raw, "rb") as f:
+        f.seek(entry["byte_start"])
+        data = f.read(entry["byte_end"] - entry["byte_start"])
+    chunk = parse_block(data)
+    sub = chunk[(chunk["ts_s"] >= start) & (chunk["ts_s"] < end)].copy()
+    return [sub] if len(sub) else [], len(sub), len(chunk)
+
+
+@instrument.timed("extract_gate_day")
+def extract_day(raw: Path, date: str):
+    idx = index_path(raw)
+    entry = None
+    if idx.exists():
+        index = json.loads(idx.read_text())
+        if index.get("raw_size") == raw.stat().st_size:
+            entry = index["days"].get(date)
+
+    if entry is not None:
+        chunks, kept, total = indexed_day(raw, date, entry)
+    else:
+        chunks, kept, total = scan_day(raw, date)
+
+    if not chunks:
+        raise SystemExit(f"No rows matched {date} UTC.")
+
+    daily = canonical(pd.concat(chunks, ignore_index=True))
+    out = trade_store.write_day(daily, "gate", date)
+    instrument.current().tag(date=date).rows(total, "rows_scanned").rows(kept)
+    return out, daily, kept, total
+
+
+@instrument.timed("split_gate_month")
+def split_month(raw: Path, block_mb: int = BLOCK_MB):
+    # One pass over the monthly archive: every UTC day goes to its own store
+    # partition, and the day -> row/byte range index is recorded on the way.
+    # Gate monthly files are time-ordered, so each partition is appended in order.
+    # Rows whose timestamp does not parse are dropped (and counted in the index);
+    # they still advance the row/byte positions, so every range stays a file range.
+    block = block_mb << 20
+    writers = {}
+    days = {}
+    dropped = 0
+
+    offset = 0  # decompressed byte offset of `data`
+    row0 = 0    # row number of the first line in `data`
+    tail = b""
+    with gzip.open(raw, "rb") as f:
+        while True:
+            buf = f.read(block)
+            data = tail + buf
+            if not data:
+                break
+            if buf:
+                cut = data.rfind(b"\n") + 1
+                if cut == 0:
+                    tail = data
+                    continue
+                data, tail = data[:cut], data[cut:]
+            else:
+                tail = b""
+
+            # Byte range of every line in this block
+            nl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 10)
+            ends = np.append(nl + 1, len(data)) if not data.endswith(b"\n") else nl + 1
+            starts = np.concatenate([[0], ends[:-1]])
+
+            chunk = parse_block(data)
+            if len(chunk) != len(starts):
+                raise SystemExit("Blank or malformed lines in the Gate archive; cannot build a row index.")
+
+            ts = chunk["ts_s"].to_numpy(dtype=float)
+            valid = np.isfinite(ts)
+            dropped += int((~valid).sum())
+            day_no = np.full(len(ts), -1, dtype=np.int64)
+            day_no[valid] = (ts[valid] // 86400).astype("int64")
+            for d in np.unique(day_no[valid]):
+                rows = np.flatnonzero(day_no == d)
+                date = str(pd.Timestamp(int(d) * 86400, unit="s").date())
+                part = canonical(chunk.iloc[rows].copy())
+
+                if date not in writers:
+                    writers[date] = trade_store.writer("gate", date)
+                writers[date].write_table(trade_store.to_table(part))
+
+                e = days.setdefault(date, {
+                    "row_start": row0 + int(rows[0]), "row_end": 0,
+                    "byte_start": offset + int(starts[rows[0]]), "byte_end": 0,
+                    "rows": 0,
+                })
+                e["row_end"] = row0 + int(rows[-1]) + 1
+                e["byte_end"] = offset + int(ends[rows[-1]])
+                e["rows"] += len(rows)
 
-    sub = chunk[(chunk["ts_s"] >= START) & (chunk["ts_s"] < END)].copy()
-    kept += len(sub)
-    if len(sub):
-        chunks.append(sub)
+            offset += len(data)
+            row0 += len(chunk)
 
-if not chunks:
-    raise SystemExit("No rows matched Nov 5 UTC. Double-check grep for '^17307648'.")
+    for w in writers.values():
+        w.close()
 
-daily = pd.concat(chunks, ignore_index=True)
+    idx = index_path(raw)
+    idx.parent.mkdir(parents=True, exist_ok=True)
+    idx.write_text(json.dumps({
+        "raw": str(raw),
+        "raw_size": raw.stat().st_size,
+        "rows": row0,
+        "rows_dropped": dropped,
+        "bytes": offset,
+        "days": dict(sorted(days.items())),
+    }, indent=2))
+    instrument.current().tag(month=raw.name, block_mb=block_mb).rows(row0).set(rows_dropped=dropped)
+    return idx, days, row0
 
-# Canonical fields (we'll finalize across venues next)
-daily["venue"] = "gate"
-daily["symbol"] = "BTCUSDT"
 
-# Convert float seconds to integer milliseconds (keep precision)
-daily["ts_ms"] = (daily["ts_s"] * 1000.0).round().astype("int64")
-daily["dt_utc"] = pd.to_datetime(daily["ts_ms"], unit="ms", utc=True)
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--raw", default=None)
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--split", action="store_true", help="write every day of the month in one pass")
+    ap.add_argument("--block-mb", type=int, default=BLOCK_MB)
+    args = ap.parse_args()
+    raw = Path(args.raw) if args.raw else raw_path(args.date)
 
-# Standardize side
-daily["side"] = daily["side_code"].map({1: "Buy", 2: "Sell"}).fillna("Unknown")
+    if args.split:
+        idx, days, total = split_month(raw, args.block_mb)
+        print("Wrote index:", idx)
+        print("Rows:", total, " dropped (unparseable timestamp):", json.loads(idx.read_text())["rows_dropped"])
+        for date, e in sorted(days.items()):
+            print(date, "rows:", e["rows"], "->", trade_store.partition_path("gate", date))
+        return
 
-# Reorder columns nicely
-daily = daily[["ts_ms", "dt_utc", "venue", "symbol", "trade_id", "price", "qty_base", "side"]]
+    out, daily, kept, total = extract_day(raw, args.date)
+    print("Wrote:", out)
+    print("Rows kept:", kept, "of", total)
+    print("Min dt:", daily["dt_utc"].min())
+    print("Max dt:", daily["dt_utc"].max())
+    print(daily.head(3).to_string(index=False))
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-daily.to_csv(OUT, index=False)
 
-print("Wrote:", OUT)
-print("Rows kept:", kept, "of", total)
-print("Min dt:", daily["dt_utc"].min())
-print("Max dt:", daily["dt_utc"].max())
-print(daily.head(3).to_string(index=False))
+if __name__ == "__main__":
+    main()
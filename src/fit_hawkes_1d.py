@@ -1,83 +1,272 @@
+import argparse
 import numpy as np
-import pandas as pd
 from pathlib import Path
 from scipy.optimize import minimize
 
-EVENTS_CSV = Path("data/processed/large_trades_BTCUSDT_2024-11-05.csv")
-OUT_PARAMS = Path("data/processed/hawkes_fit_params_2024-11-05.txt")
-
-# ---- Load events (pooled across venues) ----
-ev = pd.read_csv(EVENTS_CSV, usecols=["ts_ms"])
-ev = ev.dropna()
-t = ev["ts_ms"].astype(np.int64).values / 1000.0  # seconds
-t = np.sort(t)
-
-# Shift to start at 0 for numerical stability
-t0 = t[0]
-t = t - t0
-T = t[-1]
-
-if len(t) < 100:
-    raise SystemExit(f"Too few events ({len(t)}). Check threshold or input file.")
-
-# ---- Hawkes exponential kernel MLE ----
-# lambda(t) = mu + alpha * sum_{ti < t} exp(-beta (t-ti))
-# Stability: branching ratio n = alpha/beta < 1
-
-def neg_loglik(x):
-    mu, alpha, beta = x
-    if mu <= 0 or alpha <= 0 or beta <= 0:
-        return 1e50
-    if alpha >= 0.999 * beta:
-        return 1e50
-
-    # Recursion for S_i = sum_{j<i} exp(-beta (t_i - t_j))
-    S = 0.0
-    ll = 0.0
-    prev = 0.0
-
-    for i in range(len(t)):
-        dt = t[i] - prev
-        # update decay
-        S = np.exp(-beta * dt) * (S + 1.0 if i > 0 else 0.0)
-        lam = mu + alpha * S
-        if lam <= 0:
-            return 1e50
-        ll += np.log(lam)
-        prev = t[i]
-
-    # Integral term: ∫0^T λ(u) du = mu*T + (alpha/beta) * sum_{ti<=T} (1 - exp(-beta*(T-ti)))
-    integral = mu * T + (alpha / beta) * np.sum(1.0 - np.exp(-beta * (T - t)))
-    return -(ll - integral)
-
-# Initial guesses (reasonable)
-# mu ~ events per second
-mu0 = len(t) / T
-alpha0 = 0.5 * mu0
-beta0 = 1.0 / 30.0  # 30s decay initial guess
-
-x0 = np.array([max(mu0, 1e-6), max(alpha0, 1e-6), max(beta0, 1e-6)], dtype=float)
-
-bounds = [(1e-9, None), (1e-9, None), (1e-9, None)]
-
-res = minimize(neg_loglik, x0, method="L-BFGS-B", bounds=bounds)
-
-if not res.success:
-    raise SystemExit(f"Optimization failed: {res.message}")
-
-mu, alpha, beta = res.x
-branch = alpha / beta
-
-OUT_PARAMS.parent.mkdir(parents=True, exist_ok=True)
-OUT_PARAMS.write_text(
-    f"Events: {len(t)}\n"
-    f"T (seconds): {T:.3f}\n"
-    f"mu: {mu:.10f}\n"
-    f"alpha: {alpha:.10f}\n"
-    f"beta: {beta:.10f}\n"
-    f"branching_ratio(alpha/beta): {branch:.6f}\n"
-    f"half_life_seconds: {np.log(2)/beta:.3f}\n"
-)
-
-print("Fitted Hawkes (1D exp kernel)")
-print(OUT_PARAMS.read_text())
+from hawkes_exp import read_params
+import hawkes_search
+import hawkes_bootstrap
+import hawkes_sumexp
+import hawkes_em
+import instrument
+import series_store
+
+DATE = "2024-11-05"
+
+
+def events_path(date: str) -> Path:
+    return Path(f"data/processed/large_trades_BTCUSDT_{date}.csv")
+
+
+def params_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_fit_params_{date}.txt")
+
+
+def kernel_params_path(date: str, kernel: str) -> Path:
+    return Path(f"data/processed/hawkes_fit_params_{kernel}_{date}.txt")
+
+
+def search_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_fit_search_{date}.csv")
+
+
+def bootstrap_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_fit_bootstrap_{date}.csv")
+
+
+def ci_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_fit_ci_{date}.txt")
+
+
+def load_events(events_csv: Path):
+    # ---- Load events (pooled across venues, sorted ts_ms from the binary mirror) ----
+    t = series_store.event_times_ms(events_csv) / 1000.0  # seconds
+
+    # Shift to start at 0 for numerical stability
+    t0 = t[0]
+    t = t - t0
+    T = t[-1]
+    return t, T
+
+
+def write_params(out_params: Path, n: int, T: float, mu: float, alpha: float, beta: float):
+    out_params.parent.mkdir(parents=True, exist_ok=True)
+    out_params.write_text(
+        f"Events: {n}\n"
+        f"T (seconds): {T:.3f}\n"
+        f"mu: {mu:.10f}\n"
+        f"alpha: {alpha:.10f}\n"
+        f"beta: {beta:.10f}\n"
+        f"branching_ratio(alpha/beta): {alpha / beta:.6f}\n"
+        f"half_life_seconds: {np.log(2)/beta:.3f}\n"
+    )
+
+
+@instrument.timed("fit_hawkes_1d")
+def fit(events_csv: Path, out_params: Path):
+    t, T = load_events(events_csv)
+
+    if len(t) < 100:
+        raise SystemExit(f"Too few events ({len(t)}). Check threshold or input file.")
+
+    # ---- Hawkes exponential kernel MLE ----
+    # lambda(t) = mu + alpha * sum_{ti < t} exp(-beta (t-ti))
+    # Stability: branching ratio n = alpha/beta < 1
+    # Likelihood + exact gradient are evaluated in bulk by hawkes_exp.neg_loglik, optimized in
+    # (mu, n, beta) with n < 0.999 as a box bound (hawkes_search.nll_mnb): the 1e50 stability
+    # wall has a zero gradient, and a start or line search past it used to end the fit there
+
+    # Initial guesses (reasonable)
+    # mu ~ events per second, branching ratio 0.5, 30s decay
+    mu0 = len(t) / T
+    n0 = 0.5
+    beta0 = 1.0 / 30.0
+
+    x0 = np.array([max(mu0, 1e-6), n0, beta0], dtype=float)
+
+    res = minimize(hawkes_search.nll_mnb, x0, args=(t, T, 0.999), jac=True, method="L-BFGS-B",
+                   bounds=hawkes_search.bounds(0.999) + [(hawkes_search.EPS, None)])
+
+    if not res.success:
+        raise SystemExit(f"Optimization failed: {res.message}")
+    mu, n, beta = res.x
+    alpha = n * beta
+    if res.nit == 0 or alpha >= 0.999 * beta:
+        raise SystemExit(f"Optimization failed: no step from the start (nit={res.nit}, "
+                         f"branching ratio {n:.6f}); {out_params} not written")
+
+    instrument.current().tag(kernel="exp", method="L-BFGS-B").rows(len(t), "events").optimizer(res)
+    write_params(out_params, len(t), T, mu, alpha, beta)
+    return out_params, res
+
+
+@instrument.timed("fit_hawkes_1d_em")
+def fit_em(events_csv: Path, out_params: Path, chunk: int = hawkes_em.CHUNK, max_branching: float = 0.999):
+    # EM over chunked E-step passes: for 10^6-10^7+ events (low large-trade thresholds)
+    t, T = load_events(events_csv)
+
+    if len(t) < 100:
+        raise SystemExit(f"Too few events ({len(t)}). Check threshold or input file.")
+
+    mu, alpha, beta, info = hawkes_em.em_fit(t, T, chunk=chunk, max_branching=max_branching)
+    if not info["converged"]:
+        print(f"Warning: EM stopped after {info['iterations']} iterations without converging")
+    instrument.current().tag(kernel="exp", method="em", chunk=chunk).rows(len(t), "events").optimizer(
+        nit=info["iterations"], success=info["converged"], fun=-info["loglik"])
+
+    write_params(out_params, len(t), T, mu, alpha, beta)
+    return out_params, info
+
+
+def write_kernel_params(out_params: Path, n: int, T: float, fitted: dict):
+    # Sum-of-exponentials / power-law params: one (a_k, b_k) pair per component
+    a, b = fitted["a"], fitted["b"]
+    lines = [
+        f"Events: {n}",
+        f"T (seconds): {T:.3f}",
+        f"kernel: {fitted['kernel']}",
+        f"components: {len(b)}",
+        f"mu: {fitted['mu']:.10f}",
+        f"branching_ratio(sum a_k/b_k): {np.sum(a / b):.6f}",
+    ]
+    if "theta" in fitted:
+        lines.append(f"tail_exponent(theta): {fitted['theta']:.6f}")
+    for k in range(len(b)):
+        lines += [
+            f"a_{k + 1}: {a[k]:.10g}",
+            f"b_{k + 1}: {b[k]:.10g}",
+            f"half_life_seconds_{k + 1}: {np.log(2) / b[k]:.6g}",
+        ]
+    out_params.parent.mkdir(parents=True, exist_ok=True)
+    out_params.write_text("\n".join(lines) + "\n")
+
+
+@instrument.timed("fit_hawkes_1d_kernel")
+def fit_kernel(events_csv: Path, out_params: Path, kernel: str, components=None,
+               max_branching: float = 0.999):
+    # Multi-scale kernels: K exponentials, O(N*K) per likelihood evaluation
+    t, T = load_events(events_csv)
+
+    if len(t) < 100:
+        raise SystemExit(f"Too few events ({len(t)}). Check threshold or input file.")
+
+    if kernel == "powerlaw":
+        fitted = hawkes_sumexp.fit_powerlaw(t, T, K=components or hawkes_sumexp.PL_COMPONENTS,
+                                            max_branching=max_branching)
+    else:
+        fitted = hawkes_sumexp.fit_sumexp(t, T, K=components or hawkes_sumexp.COMPONENTS,
+                                          max_branching=max_branching)
+    res = fitted["res"]
+    if not res.success:
+        raise SystemExit(f"Optimization failed: {res.message}")
+
+    instrument.current().tag(kernel=kernel, components=len(fitted["b"])).rows(len(t), "events").optimizer(res)
+    write_kernel_params(out_params, len(t), T, fitted)
+    return out_params, res
+
+
+@instrument.timed("fit_hawkes_1d_search")
+def fit_search(events_csv: Path, out_params: Path, out_diag: Path,
+               max_branching: float = 0.999, starts: int = 0, workers=None):
+    # Global optimum over a parallel beta profile (+ random starts), then polished
+    t, T = load_events(events_csv)
+
+    if len(t) < 100:
+        raise SystemExit(f"Too few events ({len(t)}). Check threshold or input file.")
+
+    best, diag = hawkes_search.search(t, T, max_branching=max_branching, starts=starts, workers=workers)
+
+    out_diag.parent.mkdir(parents=True, exist_ok=True)
+    diag.to_csv(out_diag, index=False)
+    instrument.current().tag(kernel="exp", method="search", starts=starts).rows(len(t), "events").optimizer(
+        nit=int(diag["nit"].sum()), nfev=int(diag["nfev"].sum()), success=bool(diag["success"].all()), fun=float(diag["nll"].min()),
+        search_points=len(diag))
+    write_params(out_params, len(t), T, best["mu"], best["alpha"], best["beta"])
+    return out_params, best
+
+
+def bootstrap_params(params_txt: Path, out_reps: Path, out_ci: Path,
+                     reps: int = hawkes_bootstrap.REPS, workers=None, max_branching: float = 0.999):
+    # Percentile CIs by simulating from, and refitting, the fitted parameters
+    vals = read_params(params_txt)
+    mu, alpha, beta = float(vals["mu"]), float(vals["alpha"]), float(vals["beta"])
+    T = float(vals["T (seconds)"])
+    if not alpha / beta < max_branching:
+        raise SystemExit(f"Cannot bootstrap {params_txt}: branching ratio {alpha / beta:.6f} >= {max_branching} "
+                         f"is not stationary, so replicates cannot be simulated. Refit with --search or --em.")
+
+    reps_df = hawkes_bootstrap.bootstrap(mu, alpha, beta, T, reps=reps, workers=workers,
+                                         max_branching=max_branching)
+    ci = hawkes_bootstrap.intervals(reps_df)
+
+    out_reps.parent.mkdir(parents=True, exist_ok=True)
+    reps_df.to_csv(out_reps, index=False)
+    c = hawkes_bootstrap.counts(reps_df)
+    lines = [
+        f"Replicates: {c['ok']} of {reps} (too few events: {c['too_few_events']}, failed fits: {c['failed']})",
+        f"Level: {hawkes_bootstrap.LEVEL}",
+    ]
+    for k, row in ci.iterrows():
+        lines.append(f"{k}: [{row['lo']:.10g}, {row['hi']:.10g}] (median {row['median']:.10g})")
+    out_ci.write_text("\n".join(lines) + "\n")
+    return out_ci, ci
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--kernel", choices=["exp", "sumexp", "powerlaw"], default="exp")
+    ap.add_argument("--components", type=int, default=None, help="exponentials in the sumexp/powerlaw kernel")
+    ap.add_argument("--search", action="store_true", help="parallel beta profile + multi-start global fit")
+    ap.add_argument("--em", action="store_true", help="EM estimator (chunked, for very large event sets)")
+    ap.add_argument("--chunk", type=int, default=hawkes_em.CHUNK, help="events per EM chunk")
+    ap.add_argument("--starts", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--max-branching", type=float, default=0.999)
+    ap.add_argument("--bootstrap", type=int, default=0, help="parametric bootstrap replicates after the fit")
+    args = ap.parse_args()
+
+    if args.kernel != "exp":
+        if args.search or args.em or args.bootstrap:
+            raise SystemExit("--search / --em / --bootstrap are only available for the exp kernel")
+        out_params, res = fit_kernel(
+            events_path(args.date), kernel_params_path(args.date, args.kernel), args.kernel,
+            components=args.components, max_branching=args.max_branching,
+        )
+        print(f"Fitted Hawkes (1D {args.kernel} kernel)")
+        print(out_params.read_text())
+        print("  nll:", round(float(res.fun), 3), " nit:", res.nit, " nfev:", res.nfev)
+    elif args.em:
+        out_params, info = fit_em(events_path(args.date), params_path(args.date),
+                                  chunk=args.chunk, max_branching=args.max_branching)
+        print("Fitted Hawkes (1D exp kernel, EM)")
+        print(out_params.read_text())
+        print("  loglik:", round(info["loglik"], 3), " iterations:", info["iterations"],
+              " converged:", info["converged"])
+    elif args.search:
+        out_params, best = fit_search(
+            events_path(args.date), params_path(args.date), search_path(args.date),
+            max_branching=args.max_branching, starts=args.starts, workers=args.workers,
+        )
+        print("Fitted Hawkes (1D exp kernel, global search)")
+        print(out_params.read_text())
+        print("Diagnostics:", search_path(args.date))
+        print("  nll:", round(best["nll"], 3), " converged:", best["success"])
+        print("  beta on grid edge:", best["on_grid_edge"], " n on stability edge:", best["on_stability_edge"])
+        print("  profile nll spread:", round(best["profile_nll_spread"], 3))
+    else:
+        out_params, _ = fit(events_path(args.date), params_path(args.date))
+        print("Fitted Hawkes (1D exp kernel)")
+        print(out_params.read_text())
+
+    if args.bootstrap:
+        out_ci, _ = bootstrap_params(
+            out_params, bootstrap_path(args.date), ci_path(args.date),
+            reps=args.bootstrap, workers=args.workers, max_branching=args.max_branching,
+        )
+        print("Bootstrap intervals:", out_ci)
+        print(out_ci.read_text())
+
+
+if __name__ == "__main__":
+    main()
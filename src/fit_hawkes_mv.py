@@ -0,0 +1,107 @@
+import argparse
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from hawkes_exp import read_params
+from hawkes_mv import fit_mv, intensity_mv, spectral_radius, unpack
+
+# Multivariate Hawkes over large trades marked by venue x side
+# (e.g. binance_Buy, gate_Sell). Writes the fitted parameters with the branching
+# matrix G[k, l] = alpha[k, l] / beta_l (expected children in k per event in l),
+# and per-dimension lambda on the 1s grid.
+
+DATE = "2024-11-05"
+
+
+def events_path(date: str) -> Path:
+    return Path(f"data/processed/large_trades_BTCUSDT_{date}.csv")
+
+
+def params_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_mv_params_{date}.json")
+
+
+def lambda_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_mv_lambda_1s_{date}.csv")
+
+
+def load_marked(events_csv: Path, by: str = "venue_side"):
+    ev = pd.read_csv(events_csv, usecols=["ts_ms", "venue", "side"]).dropna()
+    ev = ev.sort_values("ts_ms", kind="stable")
+    if by == "venue":
+        key = ev["venue"].astype(str)
+    else:
+        key = ev["venue"].astype(str) + "_" + ev["side"].astype(str)
+    dims = sorted(key.unique())
+    marks = pd.Categorical(key, categories=dims).codes.astype(np.int64)
+    ts_ms = ev["ts_ms"].astype(np.int64).values
+    return ts_ms, marks, dims
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--by", choices=["venue_side", "venue"], default="venue_side")
+    ap.add_argument("--beta0", type=float, default=None,
+                    help="initial decay for every dimension (default: from the 1D params file, else 1.0)")
+    args = ap.parse_args()
+
+    ts_ms, marks, dims = load_marked(events_path(args.date), args.by)
+    D = len(dims)
+    t0 = ts_ms[0]
+    t = (ts_ms - t0) / 1000.0
+    T = t[-1]
+
+    beta0 = args.beta0
+    if beta0 is None:
+        p1 = Path(f"data/processed/hawkes_fit_params_{args.date}.txt")
+        beta0 = float(read_params(p1)["beta"]) if p1.exists() else 1.0
+
+    res = fit_mv(t, marks, T, D, beta0=beta0)
+    if not res.success:
+        print("Warning: optimizer did not report convergence:", res.message)
+    mu, alpha, beta = unpack(res.x, D)
+    G = alpha / beta[None, :]
+
+    out = params_path(args.date)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({
+        "dims": dims,
+        "events": np.bincount(marks, minlength=D).tolist(),
+        "T_seconds": T,
+        "mu": mu.tolist(),
+        "alpha": alpha.tolist(),
+        "beta": beta.tolist(),
+        "branching": G.tolist(),
+        "spectral_radius": spectral_radius(alpha, beta),
+        "half_life_seconds": (np.log(2) / beta).tolist(),
+        "nll": float(res.fun),
+        "nit": int(res.nit),
+        "nfev": int(res.nfev),
+    }, indent=2))
+
+    # Per-dimension lambda on the same 1s grid as hawkes_intensity_1s.py
+    grid = np.arange(0, int(np.floor(T)) + 1, 1, dtype=float)
+    lam = intensity_mv(t, marks, grid, res.x, D)
+    df = pd.DataFrame({
+        "t_sec": (grid + t0 / 1000.0).astype(np.int64),
+        "dt_utc": pd.to_datetime(grid * 1000.0 + t0, unit="ms", utc=True),
+    })
+    for k, name in enumerate(dims):
+        df[f"lambda_{name}"] = lam[k]
+    df["lambda_total"] = lam.sum(axis=0)
+    lam_out = lambda_path(args.date)
+    df.to_csv(lam_out, index=False)
+
+    print("Wrote:", out)
+    print("Wrote:", lam_out)
+    print(f"Dims: {D}  Events: {len(t)}  nit: {res.nit}  nfev: {res.nfev}")
+    print("Spectral radius:", round(spectral_radius(alpha, beta), 4))
+    print("\nBranching matrix G[target, source]:")
+    print(pd.DataFrame(G, index=dims, columns=dims).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
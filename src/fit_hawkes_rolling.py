@@ -0,0 +1,137 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.optimize import minimize
+
+import hawkes_search
+from hawkes_search import nll_mnb, bounds, EPS
+import series_store
+
+# Rolling-window Hawkes refit (e.g. 1h windows every 5 min) over the large-trade events.
+#
+# - events are loaded once; each window is a searchsorted slice of the sorted array
+# - the likelihood is conditional on history: events in the look-back before the
+#   window start excite lambda inside it (their decayed state carries into the
+#   window through the same recursion) but are not scored
+# - each window warm-starts from the previous window's (mu, n, beta); the first
+#   window, and any window whose warm start fails, gets a beta profile instead
+#
+# Output rows are aligned to window ends.
+
+DATE = "2024-11-05"
+WINDOW = 3600.0
+STEP = 300.0
+MIN_EVENTS = 50
+
+
+def events_path(date: str) -> Path:
+    return Path(f"data/processed/large_trades_BTCUSDT_{date}.csv")
+
+
+def out_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_rolling_params_{date}.csv")
+
+
+def _fit_window(args, x0):
+    return minimize(
+        nll_mnb, x0, args=args, jac=True, method="L-BFGS-B",
+        bounds=bounds(args[2]) + [(EPS, None)],
+    )
+
+
+def _profile_window(args, betas=hawkes_search.BETAS):
+    # Cold start: best (mu, n) over a beta grid, then full 3-parameter polish
+    t, T, max_branching, _, t_start, n_hist = args
+    mu0 = 0.5 * (len(t) - n_hist) / (T - t_start)
+    best = None
+    for b in betas:
+        r = minimize(nll_mnb, np.array([mu0, 0.5]), args=(t, T, max_branching, b, t_start, n_hist),
+                     jac=True, method="L-BFGS-B", bounds=bounds(max_branching))
+        if best is None or r.fun < best[0]:
+            best = (r.fun, np.array([r.x[0], r.x[1], b]))
+    return _fit_window(args, best[1])
+
+
+def rolling_fit(t_abs, window=WINDOW, step=STEP, history=None, max_branching=0.999):
+    # t_abs: sorted event times in absolute seconds
+    history = window if history is None else history
+    if len(t_abs) < MIN_EVENTS:
+        raise SystemExit(f"Too few events ({len(t_abs)}). Check threshold or input file.")
+    if t_abs[-1] - t_abs[0] < window:
+        raise SystemExit(f"Events span {t_abs[-1] - t_abs[0]:.0f}s, shorter than one {window:.0f}s window.")
+    t0 = t_abs[0]
+    t = t_abs - t0
+    ends = np.arange(window, t[-1] + 1e-9, step)
+
+    rows = []
+    x_prev = None
+    for end in ends:
+        start = end - window
+        lo = np.searchsorted(t, start - history, side="left")
+        s = np.searchsorted(t, start, side="left")
+        e = np.searchsorted(t, end, side="left")
+        n = e - s
+        row = {"t_end": t0 + end, "events": int(n)}
+        if n < MIN_EVENTS:
+            rows.append(row)
+            continue
+
+        # Window-local times (>= 0) keep the recursion well conditioned
+        tw = t[lo:e] - t[lo]
+        args = (tw, end - t[lo], max_branching, None, start - t[lo], int(s - lo))
+
+        c0 = time.perf_counter()
+        warm = x_prev is not None
+        res = _fit_window(args, x_prev) if warm else _profile_window(args)
+        if warm and not res.success:
+            res = _profile_window(args)
+            warm = False
+        mu, nbr, beta = res.x
+        x_prev = res.x
+
+        row.update({
+            "mu": mu, "alpha": nbr * beta, "beta": beta,
+            "branching_ratio": nbr, "half_life_seconds": np.log(2) / beta,
+            "nll": float(res.fun), "nit": int(res.nit), "nfev": int(res.nfev),
+            "success": bool(res.success), "warm_start": warm,
+            "fit_ms": (time.perf_counter() - c0) * 1e3,
+        })
+        rows.append(row)
+
+    out = pd.DataFrame(rows)
+    out["t_sec"] = np.floor(out["t_end"]).astype("int64")
+    out["dt_utc"] = pd.to_datetime(out["t_end"] * 1000.0, unit="ms", utc=True)
+    return out.drop(columns="t_end")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--window", type=float, default=WINDOW)
+    ap.add_argument("--step", type=float, default=STEP)
+    ap.add_argument("--history", type=float, default=None, help="look-back conditioning, default = window")
+    ap.add_argument("--max-branching", type=float, default=0.999)
+    args = ap.parse_args()
+
+    t_abs = series_store.event_times_ms(events_path(args.date)) / 1000.0
+
+    c0 = time.perf_counter()
+    out = rolling_fit(t_abs, args.window, args.step, args.history, args.max_branching)
+    elapsed = time.perf_counter() - c0
+
+    path = out_path(args.date)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cols = ["t_sec", "dt_utc", "events", "mu", "alpha", "beta", "branching_ratio",
+            "half_life_seconds", "nll", "nit", "nfev", "success", "warm_start", "fit_ms"]
+    out = out.reindex(columns=cols)
+    out.to_csv(path, index=False)
+
+    print("Wrote:", path)
+    print("Windows:", len(out), f" elapsed {elapsed:.2f}s  ({1e3 * elapsed / max(len(out), 1):.1f} ms/window)")
+    print(out[["mu", "alpha", "beta", "branching_ratio", "half_life_seconds"]].describe().loc[["mean", "min", "max"]])
+
+
+if __name__ == "__main__":
+    main()
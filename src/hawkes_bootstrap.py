@@ -0,0 +1,101 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.optimize import minimize
+
+from hawkes_sim import simulate
+from hawkes_search import nll_mnb, bounds, EPS
+
+# Parametric bootstrap for the 1D exponential Hawkes fit.
+#
+# Replicates are simulated from the fitted (mu, alpha, beta) over the same
+# horizon T and refit from the data alone: a short beta profile (mu, n optimized
+# per beta, as in hawkes_search) picks the start, then a full (mu, n, beta) polish.
+# Replicates are grouped into batches, one pool task per batch, so process
+# overhead is paid per batch. Every replicate is kept in the table with a status
+# (ok / too_few_events / failed); intervals use the ok ones.
+
+REPS = 200
+BATCH = 8
+LEVEL = 0.95
+MIN_EVENTS = 10
+PROFILE_BETAS = np.logspace(-4, 3, 8)
+
+
+def _refit(t, T, max_branching, betas=PROFILE_BETAS):
+    # Start from the best point of a coarse beta profile, never from the true params
+    mu0 = 0.5 * len(t) / T
+    nfev = 0
+    best = None
+    for b in betas:
+        r = minimize(
+            nll_mnb, np.array([mu0, 0.5]), args=(t, T, max_branching, b),
+            jac=True, method="L-BFGS-B", bounds=bounds(max_branching),
+        )
+        nfev += int(r.nfev)
+        if best is None or r.fun < best[0]:
+            best = (r.fun, r.x[0], r.x[1], b)
+    res = minimize(
+        nll_mnb, np.array(best[1:]), args=(t, T, max_branching),
+        jac=True, method="L-BFGS-B", bounds=bounds(max_branching) + [(EPS, None)],
+    )
+    mu, n, beta = res.x
+    return mu, n * beta, beta, bool(res.success), nfev + int(res.nfev)
+
+
+def run_batch(mu, alpha, beta, T, reps, seed, max_branching):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(reps):
+        t = simulate(mu, alpha, beta, T, rng)
+        if len(t) < MIN_EVENTS:
+            rows.append({"events": len(t), "mu": np.nan, "alpha": np.nan, "beta": np.nan,
+                         "success": False, "nfev": 0, "status": "too_few_events"})
+            continue
+        t = t - t[0]
+        m, a, b, ok, nfev = _refit(t, t[-1], max_branching)
+        rows.append({"events": len(t), "mu": m, "alpha": a, "beta": b, "success": ok, "nfev": nfev,
+                     "status": "ok" if ok else "failed"})
+    return rows
+
+
+def bootstrap(mu, alpha, beta, T, reps=REPS, batch=BATCH, workers=None, seed=0, max_branching=0.999):
+    workers = workers or os.cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn((reps + batch - 1) // batch)
+    sizes = [min(batch, reps - i * batch) for i in range(len(seeds))]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futs = [
+            pool.submit(run_batch, mu, alpha, beta, T, k, s, max_branching)
+            for k, s in zip(sizes, seeds)
+        ]
+        rows = [r for f in futs for r in f.result()]
+
+    reps_df = pd.DataFrame(rows)
+    reps_df["branching_ratio"] = reps_df["alpha"] / reps_df["beta"]
+    reps_df["half_life_seconds"] = np.log(2) / reps_df["beta"]
+    return reps_df
+
+
+def counts(reps_df):
+    # Replicates per status: ok, too_few_events (not refit), failed (optimizer)
+    out = reps_df["status"].value_counts()
+    return {k: int(out.get(k, 0)) for k in ["ok", "too_few_events", "failed"]}
+
+
+def intervals(reps_df, level=LEVEL):
+    # Percentile intervals per parameter over the ok replicates
+    lo, hi = (1 - level) / 2, 1 - (1 - level) / 2
+    cols = ["mu", "alpha", "beta", "branching_ratio", "half_life_seconds"]
+    c = counts(reps_df)
+    if c["too_few_events"] or c["failed"]:
+        print(f"Warning: bootstrap dropped {c['too_few_events']} replicates with < {MIN_EVENTS} events "
+              f"and {c['failed']} failed refits ({c['ok']} of {len(reps_df)} used)")
+    ok = reps_df[reps_df["status"] == "ok"]
+    return pd.DataFrame({
+        "lo": ok[cols].quantile(lo),
+        "median": ok[cols].median(),
+        "hi": ok[cols].quantile(hi),
+        "sd": ok[cols].std(),
+    })
@@ -0,0 +1,115 @@
+import numpy as np
+
+# Shared exponential-kernel Hawkes routines.
+#
+# lambda(t) = mu + alpha * sum_{ti < t} exp(-beta (t - ti))
+#
+# Event times are float seconds, sorted, shifted to start at 0 by the caller.
+
+BLOCK = 8192  # events per block in the decayed-sum scan
+
+
+def decayed_sums(t, beta, weights=None, block=BLOCK):
+    # S_i = sum_{j<i} w_j * exp(-beta (t_i - t_j))   (exclusive of event i)
+    #
+    # Same recursion as S_i = exp(-beta dt_i) * (S_{i-1} + w_{i-1}), evaluated in bulk:
+    # inside a block we take a log-domain cumulative sum of w_j * exp(beta (t_j - t_s))
+    # relative to the block start t_s, so nothing overflows whatever beta is.
+    # Only the carry between blocks is a Python loop (n / block iterations).
+    t = np.asarray(t, dtype=float)
+    n = len(t)
+    out = np.empty(n)
+    if n == 0:
+        return out
+
+    if weights is None:
+        logw = None
+    else:
+        with np.errstate(divide="ignore"):
+            logw = np.log(np.asarray(weights, dtype=float))
+
+    carry = 0.0  # decayed sum of all earlier blocks, evaluated at t_s
+    for s in range(0, n, block):
+        e = min(s + block, n)
+        x = beta * (t[s:e] - t[s])
+        lx = x if logw is None else x + logw[s:e]
+        L = np.logaddexp.accumulate(lx)
+
+        out[s] = carry
+        out[s + 1:e] = carry * np.exp(-x[1:]) + np.exp(L[:-1] - x[1:])
+
+        if e < n:
+            xe = beta * (t[e] - t[s])
+            carry = carry * np.exp(-xe) + np.exp(L[-1] - xe)
+
+    return out
+
+
+def neg_loglik(x, t, T, max_branching=0.999, t_start=0.0, n_hist=0):
+    # Negative log-likelihood and its exact gradient w.r.t. (mu, alpha, beta).
+    # Returns (value, grad) so it can be passed to scipy.optimize.minimize(jac=True).
+    #
+    # Observation window is [t_start, T]. The first n_hist events are history
+    # (before t_start): they excite lambda inside the window but are not scored.
+    # Defaults (t_start=0, n_hist=0) give the plain full-sample likelihood.
+    mu, alpha, beta = x
+    if mu <= 0 or alpha <= 0 or beta <= 0:
+        return 1e50, np.zeros(3)
+    if alpha >= max_branching * beta:
+        return 1e50, np.zeros(3)
+
+    # R_i = sum_{j<i} exp(-beta (t_i - t_j))
+    # dR_i/dbeta = -sum_{j<i} (t_i - t_j) exp(-beta (t_i - t_j)) = -(t_i R_i - Q_i)
+    R = decayed_sums(t, beta)[n_hist:]
+    Q = decayed_sums(t, beta, weights=t)[n_hist:]
+    dR = Q - t[n_hist:] * R
+
+    lam = mu + alpha * R
+    if np.any(lam <= 0):
+        return 1e50, np.zeros(3)
+    inv = 1.0 / lam
+
+    # Integral term: ∫ts^T λ(u) du = mu*(T-ts) + (alpha/beta) * sum_i (exp(-beta*d0_i) - exp(-beta*(T-t_i)))
+    # with d0_i = max(ts - t_i, 0), i.e. 1 - exp(-beta*(T-t_i)) for events inside the window
+    d0 = np.maximum(t_start - t, 0.0)
+    d1 = T - t
+    E0 = np.exp(-beta * d0)
+    E1 = np.exp(-beta * d1)
+    K = np.sum(E0 - E1)
+    span = T - t_start
+    integral = mu * span + (alpha / beta) * K
+
+    ll = np.sum(np.log(lam)) - integral
+
+    g_mu = np.sum(inv) - span
+    g_alpha = np.sum(R * inv) - K / beta
+    g_beta = alpha * np.sum(dR * inv) + (alpha / beta**2) * K - (alpha / beta) * np.sum(d1 * E1 - d0 * E0)
+
+    return -ll, -np.array([g_mu, g_alpha, g_beta])
+
+
+def intensity_at(t, q, mu, alpha, beta):
+    # Exact lambda at arbitrary query times q (any order), counting events with t_j <= q.
+    # The kernel sum just after event k is R_k + 1; lambda(q) decays it from t_k to q,
+    # where k is the last event at or before q.
+    t = np.asarray(t, dtype=float)
+    q = np.asarray(q, dtype=float)
+    post = decayed_sums(t, beta) + 1.0
+
+    k = np.searchsorted(t, q, side="right") - 1
+    has = k >= 0
+    kk = np.where(has, k, 0)
+
+    lam = np.full(q.shape, float(mu))
+    lam[has] += alpha * post[kk[has]] * np.exp(-beta * (q[has] - t[kk[has]]))
+    return lam
+
+
+def read_params(path):
+    # Parse the "key: value" text written by fit_hawkes_1d*.py
+    vals = {}
+    for line in path.read_text().splitlines():
+        if ":" in line:
+            k, v = line.split(":", 1)
+            vals[k.strip()] = v.strip()
+    return vals
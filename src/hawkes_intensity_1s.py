@@ -1,70 +1,84 @@
+import argparse
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
-EVENTS_CSV = Path("data/processed/large_trades_BTCUSDT_2024-11-05.csv")
-PARAMS_TXT = Path("data/processed/hawkes_fit_params_2024-11-05.txt")
-OUT = Path("data/processed/hawkes_lambda_1s_2024-11-05.csv")
-
-# Load fitted params
-txt = PARAMS_TXT.read_text().splitlines()
-vals = {}
-for line in txt:
-    if ":" in line:
-        k, v = line.split(":", 1)
-        vals[k.strip()] = v.strip()
-
-mu = float(vals["mu"])
-alpha = float(vals["alpha"])
-beta = float(vals["beta"])
-
-# Load events
-ev = pd.read_csv(EVENTS_CSV, usecols=["ts_ms"])
-t_abs = np.sort(ev["ts_ms"].astype(np.int64).values)  # ms UTC
-t0 = t_abs[0]
-t_s = (t_abs - t0) / 1000.0  # seconds since start
-T = t_s[-1]
-
-# Build 1-second grid over the day coverage
-# We'll compute lambda at each integer second boundary
-grid = np.arange(0, int(np.floor(T)) + 1, 1, dtype=float)
-
-# Efficiently compute S(t) on grid by iterating over time and consuming events
-lam = np.empty_like(grid)
-S = 0.0
-event_idx = 0
-prev_time = 0.0
-
-for i, g in enumerate(grid):
-    dt = g - prev_time
-    if dt < 0:
-        dt = 0.0
-
-    # decay S to current grid time
-    S = np.exp(-beta * dt) * S
-    prev_time = g
-
-    # add all events that occurred in (prev_grid, g]
-    # We treat an event as adding 1.0 to S at its timestamp.
-    # Approximation: events within the second are applied at grid boundary (good enough for 1s analysis).
-    while event_idx < len(t_s) and t_s[event_idx] <= g:
-        # bring S to event time (optional refinement skipped for speed)
-        S += 1.0
-        event_idx += 1
-
-    lam[i] = mu + alpha * S
-
-out = pd.DataFrame({
-    "t_sec": (grid + (t0/1000.0)).astype(np.int64),  # absolute UTC seconds
-    "dt_utc": pd.to_datetime((grid * 1000.0 + t0), unit="ms", utc=True),
-    "lambda": lam
-})
-
-OUT.parent.mkdir(parents=True, exist_ok=True)
-out.to_csv(OUT, index=False)
-
-print("Wrote:", OUT)
-print("lambda summary:")
-print(out["lambda"].describe()[["min","mean","std","max"]])
-print("Top 5 lambda seconds:")
-print(out.sort_values("lambda", ascending=False).head(5).to_string(index=False))
+from hawkes_exp import intensity_at, read_params
+from hawkes_sumexp import intensity_sum, read_kernel
+import instrument
+import series_store
+
+DATE = "2024-11-05"
+
+
+def events_path(date: str) -> Path:
+    return Path(f"data/processed/large_trades_BTCUSDT_{date}.csv")
+
+
+def params_path(date: str, kernel: str = "exp") -> Path:
+    if kernel != "exp":
+        return Path(f"data/processed/hawkes_fit_params_{kernel}_{date}.txt")
+    return Path(f"data/processed/hawkes_fit_params_{date}.txt")
+
+
+def out_path(date: str, kernel: str = "exp") -> Path:
+    # Binary lambda grid (series_store); --csv also writes the same name with .csv
+    if kernel != "exp":
+        return Path(f"data/processed/hawkes_lambda_1s_{kernel}_{date}.bin")
+    return Path(f"data/processed/hawkes_lambda_1s_{date}.bin")
+
+
+@instrument.timed("hawkes_intensity_1s")
+def intensity(events_csv: Path, params_txt: Path, out: Path, csv: bool = False):
+    # Load fitted params
+    vals = read_params(params_txt)
+    kernel = vals.get("kernel", "exp")
+
+    # Load events (sorted ms UTC, memory-mapped)
+    t_abs = series_store.event_times_ms(events_csv)
+    t0 = int(t_abs[0])
+    t_s = (t_abs - t0) / 1000.0  # seconds since start
+    T = t_s[-1]
+
+    # 1-second grid in relative seconds
+    grid = np.arange(0, int(np.floor(T)) + 1, 1, dtype=float)
+
+    # Exact lambda at each grid point: every event decays from its own timestamp
+    if kernel == "exp":
+        lam = intensity_at(t_s, grid, float(vals["mu"]), float(vals["alpha"]), float(vals["beta"]))
+    else:
+        lam = intensity_sum(t_s, grid, *read_kernel(vals))
+
+    series_store.write_lambda(out, lam, t0 / 1000.0, 1.0, params=vals, source=Path(events_csv).name)
+    instrument.current().tag(kernel=kernel, out=out.name).rows(len(t_s), "events").rows(len(grid))
+
+    df = pd.DataFrame({
+        "t_sec": (grid + (t0/1000.0)).astype(np.int64),  # absolute UTC seconds
+        "lambda": lam
+    })
+    if csv:
+        df["dt_utc"] = pd.to_datetime((grid * 1000.0 + t0), unit="ms", utc=True)
+        df[["t_sec", "dt_utc", "lambda"]].to_csv(out.with_suffix(".csv"), index=False)
+    return out, df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--kernel", choices=["exp", "sumexp", "powerlaw"], default="exp")
+    ap.add_argument("--csv", action="store_true", help="also write the grid as CSV")
+    args = ap.parse_args()
+
+    out, df = intensity(events_path(args.date), params_path(args.date, args.kernel),
+                        out_path(args.date, args.kernel), csv=args.csv)
+    print("Wrote:", out)
+    if args.csv:
+        print("Wrote:", out.with_suffix(".csv"))
+    print("lambda summary:")
+    print(df["lambda"].describe()[["min","mean","std","max"]])
+    print("Top 5 lambda seconds:")
+    print(df.sort_values("lambda", ascending=False).head(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import numpy as np
+from scipy.optimize import minimize
+
+from hawkes_exp import decayed_sums, intensity_at
+
+# D-dimensional exponential-kernel Hawkes with one decay per source dimension:
+#
+# lambda_k(t) = mu_k + sum_l alpha[k, l] * sum_{t_j < t, mark_j = l} exp(-beta_l (t - t_j))
+#
+# Branching matrix G[k, l] = alpha[k, l] / beta_l; stationarity needs spectral radius < 1.
+# Parameters are packed as x = [mu (D), alpha (D*D, row-major), beta (D)].
+#
+# The likelihood scans each source dimension's own events (decayed sums), then
+# gathers the source states at every pooled event, so one evaluation is O(N*D)
+# bulk numpy work; every gradient term is reduced with bincount over marks.
+# fit_mv optimizes in (log mu, G, log beta) so the branching matrix is boxed.
+
+
+def unpack(x, D):
+    mu = x[:D]
+    alpha = x[D:D + D * D].reshape(D, D)
+    beta = x[D + D * D:]
+    return mu, alpha, beta
+
+
+def pack(mu, alpha, beta):
+    return np.concatenate([np.ravel(mu), np.ravel(alpha), np.ravel(beta)])
+
+
+def spectral_radius(alpha, beta):
+    return float(np.max(np.abs(np.linalg.eigvals(alpha / beta[None, :]))))
+
+
+def layout(t, marks, D):
+    # Parameter-free index work for source_sums, computed once per event set:
+    # per source l, its event times, and for every pooled event the last source-l
+    # event before it in array order (with the time gap to it).
+    out = []
+    for l in range(D):
+        src = marks == l
+        k = np.cumsum(src) - src - 1
+        has = np.flatnonzero(k >= 0)
+        kk = k[has]
+        tl = t[src]
+        out.append((tl, has, kk, t[has] - tl[kk]))
+    return out
+
+
+def source_sums(t, marks, beta, D, lay=None):
+    # R[l, i] = sum_{j<i, mark_j = l} exp(-beta_l (t_i - t_j)) and dR[l, i] = dR/dbeta_l.
+    # The scan runs over each source's own events only (sum_l N_l = N); every pooled
+    # event then decays the state of the last source-l event before it in array order.
+    lay = layout(t, marks, D) if lay is None else lay
+    n = len(t)
+    R = np.zeros((D, n))
+    dR = np.zeros((D, n))
+    for l, (tl, has, kk, gap) in enumerate(lay):
+        if len(tl) == 0:
+            continue
+        post = decayed_sums(tl, beta[l]) + 1.0
+        postQ = decayed_sums(tl, beta[l], weights=tl) + tl
+
+        decay = np.exp(-beta[l] * gap)
+        r = post[kk] * decay
+        R[l, has] = r
+        dR[l, has] = postQ[kk] * decay - t[has] * r
+    return R, dR
+
+
+def neg_loglik_mv(x, t, marks, T, D, max_radius=0.999, lay=None):
+    # Negative log-likelihood and exact gradient; t sorted (shifted to 0), marks in 0..D-1
+    mu, alpha, beta = unpack(x, D)
+    zero = np.zeros_like(x)
+    if np.any(mu <= 0) or np.any(alpha < 0) or np.any(beta <= 0):
+        return 1e50, zero
+    if spectral_radius(alpha, beta) >= max_radius:
+        return 1e50, zero
+
+    R, dR = source_sums(t, marks, beta, D, lay)
+
+    # lambda at each event for its own dimension
+    A = alpha[marks]  # (n, D): row k_i of alpha
+    lam = mu[marks] + np.einsum("il,li->i", A, R)
+    if np.any(lam <= 0):
+        return 1e50, zero
+    inv = 1.0 / lam
+
+    # Compensator per source l: K_l = sum_{j in l} (1 - E_j), M_l = sum_{j in l} (T - t_j) E_j
+    E = np.exp(-beta[marks] * (T - t))
+    K = np.bincount(marks, weights=1.0 - E, minlength=D)
+    M = np.bincount(marks, weights=(T - t) * E, minlength=D)
+    col = alpha.sum(axis=0)  # sum_k alpha[k, l]
+    integral = mu.sum() * T + np.sum(col / beta * K)
+
+    ll = np.sum(np.log(lam)) - integral
+
+    g_mu = np.bincount(marks, weights=inv, minlength=D) - T
+    g_alpha = np.empty((D, D))
+    for l in range(D):
+        g_alpha[:, l] = np.bincount(marks, weights=R[l] * inv, minlength=D) - K[l] / beta[l]
+    g_beta = (
+        np.einsum("il,li->l", A, dR * inv[None, :])
+        + col * K / beta**2
+        - col * M / beta
+    )
+
+    return -ll, -pack(g_mu, g_alpha, g_beta)
+
+
+def _nll_z(z, t, marks, T, D, max_radius, lay):
+    # Optimizer coordinates z = [log mu, G (row-major), log beta]: all O(1) scaled,
+    # and alpha = G * beta keeps the branching matrix directly boxed.
+    lmu = z[:D]
+    G = z[D:D + D * D].reshape(D, D)
+    lbeta = z[D + D * D:]
+    mu, beta = np.exp(lmu), np.exp(lbeta)
+    f, g = neg_loglik_mv(pack(mu, G * beta[None, :], beta), t, marks, T, D, max_radius, lay)
+    if f >= 1e50:
+        return f, np.zeros_like(z)
+    g_mu, g_alpha, g_beta = unpack(g, D)
+    g_G = g_alpha * beta[None, :]
+    g_lbeta = beta * (g_beta + np.sum(g_alpha * G, axis=0))
+    return f, pack(g_mu * mu, g_G, g_lbeta)
+
+
+def fit_mv(t, marks, T, D, beta0=1.0, max_radius=0.999, x0=None):
+    # L-BFGS-B from a mildly excited, stable start (spectral radius ~0.3)
+    if x0 is None:
+        rate = np.bincount(marks, minlength=D) / T
+        mu0 = np.maximum(0.5 * rate, 1e-6)
+        beta = np.full(D, float(beta0))
+        x0 = pack(mu0, np.full((D, D), 0.3 * beta0 / D), beta)
+    mu0, alpha0, beta0 = unpack(np.asarray(x0, float), D)
+    z0 = pack(np.log(mu0), alpha0 / beta0[None, :], np.log(beta0))
+    bounds = [(np.log(1e-9), None)] * D + [(0.0, max_radius)] * (D * D) + [(np.log(1e-6), np.log(1e6))] * D
+    res = minimize(_nll_z, z0, args=(t, marks, T, D, max_radius, layout(t, marks, D)),
+                   jac=True, method="L-BFGS-B", bounds=bounds)
+
+    # report in natural parameters
+    G = res.x[D:D + D * D].reshape(D, D)
+    beta = np.exp(res.x[D + D * D:])
+    res.x = pack(np.exp(res.x[:D]), G * beta[None, :], beta)
+    return res
+
+
+def intensity_mv(t, marks, q, x, D):
+    # Per-dimension lambda_k at query times q -> array (D, len(q))
+    mu, alpha, beta = unpack(x, D)
+    S = np.empty((D, len(q)))
+    for l in range(D):
+        tl = t[marks == l]
+        S[l] = intensity_at(tl, q, 0.0, 1.0, beta[l]) if len(tl) else 0.0
+    return mu[:, None] + alpha @ S
@@ -0,0 +1,188 @@
+import argparse
+import math
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from hawkes_exp import read_params
+import series_store
+
+# Online exponential-kernel Hawkes intensity + regime classifier.
+#
+# State is one decayed sum S(t) = sum_{ti <= t} exp(-beta (t - ti)); an event or
+# a clock tick is O(1). Regime cut-offs (p50/p90/p99 of lambda, as in
+# premium_vs_hawkes_regime.py) are tracked with P² streaming quantiles fed by
+# lambda sampled once per second (advance), so the thresholds match the offline
+# 1s grid; update() itself never loops.
+
+DATE = "2024-11-05"
+QUANTILES = (0.50, 0.90, 0.99)
+REGIMES = ["lambda<p50", "p50<=lambda<p90", "p90<=lambda<p99", "lambda>=p99"]
+
+
+class P2Quantile:
+    # Jain & Chlamtac P² estimator: 5 markers, O(1) memory and update
+    def __init__(self, p: float):
+        self.p = p
+        self.q = []  # marker heights
+        self.n = [0, 1, 2, 3, 4]  # marker positions
+        self.np = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]  # desired positions
+        self.dn = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+        self.count = 0
+
+    def add(self, x: float):
+        self.count += 1
+        q = self.q
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.n
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.np[i] += self.dn[i]
+
+        for i in (1, 2, 3):
+            d = self.np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                s = 1 if d > 0 else -1
+                # parabolic prediction, linear fallback if it leaves the bracket
+                qp = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not (q[i - 1] < qp < q[i + 1]):
+                    qp = q[i] + s * (q[i + s] - q[i]) / (n[i + s] - n[i])
+                q[i] = qp
+                n[i] += s
+
+    def value(self) -> float:
+        if not self.q:
+            return float("nan")
+        if self.count <= 5:
+            # exact (lower) quantile of the few samples seen so far
+            return self.q[min(int(self.p * len(self.q)), len(self.q) - 1)]
+        return self.q[2]
+
+
+class OnlineHawkes:
+    def __init__(self, mu: float, alpha: float, beta: float, quantiles=QUANTILES):
+        self.mu = mu
+        self.alpha = alpha
+        self.beta = beta
+        self.S = 0.0
+        self.t_last = None
+        self.next_tick = None
+        self.sketches = [P2Quantile(p) for p in quantiles]
+
+    @classmethod
+    def from_params(cls, params_txt: Path, **kw):
+        # Parameters as written by fit_hawkes_1d.py
+        vals = read_params(params_txt)
+        return cls(float(vals["mu"]), float(vals["alpha"]), float(vals["beta"]), **kw)
+
+    def intensity(self, t: float) -> float:
+        if self.t_last is None:
+            return self.mu
+        return self.mu + self.alpha * self.S * math.exp(-self.beta * (t - self.t_last))
+
+    def thresholds(self):
+        return [s.value() for s in self.sketches]
+
+    def regime(self, lam: float) -> str:
+        k = 0
+        for c in self.thresholds():
+            if lam >= c:
+                k += 1
+        return REGIMES[k]
+
+    def tick(self, t: float):
+        # Sample lambda at clock time t into the quantile sketches
+        lam = self.intensity(t)
+        for s in self.sketches:
+            s.add(lam)
+        return lam
+
+    def advance(self, t: float):
+        # Clock side: feed every whole second up to t (the 1s grid the offline
+        # regimes use). Driven by the caller's timer, off the per-event path.
+        if self.next_tick is None:
+            self.next_tick = math.floor(t) + 1.0
+            return
+        while self.next_tick <= t:
+            self.tick(self.next_tick)
+            self.next_tick += 1.0
+
+    def update(self, t: float):
+        # New event at time t (seconds, non-decreasing): returns (lambda, regime) just after it
+        if self.t_last is None:
+            self.S = 1.0
+        else:
+            self.S = self.S * math.exp(-self.beta * (t - self.t_last)) + 1.0
+        self.t_last = t
+        lam = self.mu + self.alpha * self.S
+        return lam, self.regime(lam)
+
+
+def main():
+    # Replay a day's large trades through the online engine
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--params", default=None)
+    args = ap.parse_args()
+
+    events_csv = Path(f"data/processed/large_trades_BTCUSDT_{args.date}.csv")
+    params_txt = Path(args.params) if args.params else Path(f"data/processed/hawkes_fit_params_{args.date}.txt")
+    out = Path(f"data/processed/hawkes_online_regime_{args.date}.csv")
+
+    ts_ms = np.asarray(series_store.event_times_ms(events_csv))
+    eng = OnlineHawkes.from_params(params_txt)
+
+    lam = np.empty(len(ts_ms))
+    reg = []
+    lat = np.empty(len(ts_ms), dtype=np.int64)
+    clock_ns = 0
+    for i, ms in enumerate(ts_ms.tolist()):
+        t = ms / 1000.0
+        c0 = time.perf_counter_ns()
+        eng.advance(t)
+        t0 = time.perf_counter_ns()
+        lam[i], r = eng.update(t)
+        lat[i] = time.perf_counter_ns() - t0
+        clock_ns += t0 - c0
+        reg.append(r)
+
+    df = pd.DataFrame({
+        "ts_ms": ts_ms,
+        "dt_utc": pd.to_datetime(ts_ms, unit="ms", utc=True),
+        "lambda": lam,
+        "regime": reg,
+    })
+    out.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out, index=False)
+
+    print("Wrote:", out)
+    print("Events:", len(df))
+    print("Final thresholds:", dict(zip(["p50", "p90", "p99"], eng.thresholds())))
+    print(f"Per-event latency (us): mean {lat.mean() / 1e3:.2f}  p99 {np.percentile(lat, 99) / 1e3:.2f}")
+    print(f"Clock ticks (1s quantile sampling): {clock_ns / 1e6:.1f} ms total")
+    print("\nRegime counts:")
+    print(df["regime"].value_counts())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import numpy as np
+from scipy.optimize import minimize
+
+from hawkes_exp import decayed_sums, intensity_at
+
+# 1D Hawkes with a kernel made of K exponentials:
+#
+# lambda(t) = mu + sum_k a_k * sum_{ti < t} exp(-b_k (t - ti))
+#
+# Branching ratio n = sum_k a_k / b_k. Every component keeps its own decayed-sum
+# recursion (hawkes_exp.decayed_sums), so likelihood, gradient and intensity are
+# O(N*K): decays from milliseconds to hours without an O(N^2) kernel sum.
+#
+# Two families:
+# - "sumexp": free a_k, b_k (2K + 1 parameters)
+# - "powerlaw": b_k fixed on a log grid, a_k / b_k ∝ b_k^theta, which approximates
+#   phi(t) ~ t^-(1 + theta) between the grid's shortest and longest time scales
+#   (3 parameters: mu, n, theta)
+#
+# Optimizers run in (log mu, n, shares, log b) with shares = softmax logits, so
+# 0 < n < max_branching is a plain box bound.
+
+COMPONENTS = 3
+PL_COMPONENTS = 12
+PL_RATES = (1e-3, 1e2)  # power-law grid: time scales from 10ms to ~17min
+EPS = 1e-9
+
+
+def neg_loglik_sum(mu, a, b, t, T, need_b=True):
+    # Negative log-likelihood on [0, T] and its gradient: (f, g_mu, g_a, g_b);
+    # g_b is None when need_b is False (fixed rate grid, skips the Q scans)
+    K = len(b)
+    n = len(t)
+    R = np.empty((K, n))
+    for k in range(K):
+        R[k] = decayed_sums(t, b[k])
+
+    lam = mu + a @ R
+    if np.any(lam <= 0):
+        return 1e50, 0.0, np.zeros(K), np.zeros(K)
+    inv = 1.0 / lam
+
+    d1 = T - t
+    E = np.exp(-b[:, None] * d1[None, :])
+    Ksum = np.sum(1.0 - E, axis=1)
+    integral = mu * T + np.sum(a / b * Ksum)
+    ll = np.sum(np.log(lam)) - integral
+
+    g_mu = np.sum(inv) - T
+    g_a = R @ inv - Ksum / b
+    g_b = None
+    if need_b:
+        g_b = np.empty(K)
+        for k in range(K):
+            dR = decayed_sums(t, b[k], weights=t) - t * R[k]
+            g_b[k] = a[k] * np.sum(dR * inv) + a[k] / b[k]**2 * Ksum[k] - a[k] / b[k] * np.sum(d1 * E[k])
+    return -ll, -g_mu, -g_a, (None if g_b is None else -g_b)
+
+
+def _softmax(s):
+    w = np.exp(s - np.max(s))
+    return w / w.sum()
+
+
+def _shares_grad(g_nk, n, w):
+    # d/dn and d/ds_j of f for n_k = n * softmax(s)_k
+    m = np.sum(g_nk * w)
+    return m, n * w * (g_nk - m)
+
+
+def _nll_sumexp(z, t, T, K):
+    # z = [log mu, n, s (K), log b (K)]
+    mu, n = np.exp(z[0]), z[1]
+    s, b = z[2:2 + K], np.exp(z[2 + K:])
+    w = _softmax(s)
+    a = n * w * b
+    f, g_mu, g_a, g_b = neg_loglik_sum(mu, a, b, t, T)
+    if f >= 1e50:
+        return f, np.zeros_like(z)
+    g_n, g_s = _shares_grad(g_a * b, n, w)
+    g_lb = b * (g_b + g_a * n * w)
+    return f, np.concatenate([[g_mu * mu, g_n], g_s, g_lb])
+
+
+def _nll_powerlaw(z, t, T, b):
+    # z = [log mu, n, theta] on the fixed rate grid b
+    mu, n, theta = np.exp(z[0]), z[1], z[2]
+    lb = np.log(b)
+    w = _softmax(theta * lb)
+    a = n * w * b
+    f, g_mu, g_a, _ = neg_loglik_sum(mu, a, b, t, T, need_b=False)
+    if f >= 1e50:
+        return f, np.zeros_like(z)
+    g_n, g_s = _shares_grad(g_a * b, n, w)
+    return f, np.array([g_mu * mu, g_n, np.sum(g_s * lb)])
+
+
+def powerlaw_grid(K=PL_COMPONENTS, rates=PL_RATES):
+    return np.logspace(np.log10(rates[1]), np.log10(rates[0]), K)
+
+
+def fit_sumexp(t, T, K=COMPONENTS, max_branching=0.999, b0=None):
+    # Start: n = 0.5 spread evenly over decays from 0.1s to 10min
+    b0 = np.logspace(1, np.log10(1 / 600), K) if b0 is None else np.asarray(b0, float)
+    z0 = np.concatenate([[np.log(0.5 * len(t) / T), 0.5], np.zeros(K), np.log(b0)])
+    bounds = [(None, None), (EPS, max_branching - EPS)] + [(-20, 20)] * K + [(np.log(1e-6), np.log(1e4))] * K
+    res = minimize(_nll_sumexp, z0, args=(t, T, K), jac=True, method="L-BFGS-B", bounds=bounds)
+
+    mu, n = np.exp(res.x[0]), res.x[1]
+    w, b = _softmax(res.x[2:2 + K]), np.exp(res.x[2 + K:])
+    order = np.argsort(-b)  # fastest component first
+    return {"kernel": "sumexp", "mu": mu, "a": (n * w * b)[order], "b": b[order], "res": res}
+
+
+def fit_powerlaw(t, T, K=PL_COMPONENTS, max_branching=0.999, rates=PL_RATES):
+    b = powerlaw_grid(K, rates)
+    z0 = np.array([np.log(0.5 * len(t) / T), 0.5, 0.0])
+    bounds = [(None, None), (EPS, max_branching - EPS), (-3.0, 3.0)]
+    res = minimize(_nll_powerlaw, z0, args=(t, T, b), jac=True, method="L-BFGS-B", bounds=bounds)
+
+    mu, n, theta = np.exp(res.x[0]), res.x[1], res.x[2]
+    a = n * _softmax(theta * np.log(b)) * b
+    return {"kernel": "powerlaw", "mu": mu, "a": a, "b": b, "theta": theta, "res": res}
+
+
+def intensity_sum(t, q, mu, a, b):
+    # Exact lambda at query times q (counting events with t_j <= q), one scan per component
+    lam = np.full(np.shape(q), float(mu))
+    for ak, bk in zip(a, b):
+        lam += intensity_at(t, q, 0.0, ak, bk)
+    return lam
+
+
+def read_kernel(vals):
+    # (mu, a, b) from read_params() output of a sumexp/powerlaw params file
+    K = int(vals["components"])
+    a = np.array([float(vals[f"a_{k}"]) for k in range(1, K + 1)])
+    b = np.array([float(vals[f"b_{k}"]) for k in range(1, K + 1)])
+    return float(vals["mu"]), a, b
@@ -0,0 +1,289 @@
+import argparse
+import atexit
+import functools
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Per-stage instrumentation: wall/CPU time, rows and rows/s, peak RSS, bytes read and
+# written, optimizer iterations/evaluations, one JSON line per stage.
+#
+# Off unless HAWKES_PROFILE names a .jsonl file; stages (in this process, pool workers
+# and subprocesses, which inherit the variable) then append their records to it, and
+# `report` folds the lines into one JSON run report. pipeline.py and run_batch.py
+# (--profile) set it per run under data/processed/profile/.
+#
+# - functions:      @instrument.timed("build_premium_1s") and, inside,
+#                   instrument.current().rows(n) / .optimizer(res) / .tag(date=...)
+# - module scripts: rec = instrument.track("premium_vs_hawkes_regime") at the top and
+#                   rec.finish() as the last line; exiting before it (uncaught exception,
+#                   raise SystemExit(...)) records the stage with status "error"
+#
+# Peak RSS is per stage on Linux (VmHWM is reset through /proc/self/clear_refs at the
+# start of each top-level stage), else the process peak. Bytes are the process
+# rchar/wchar deltas from /proc/self/io (all reads/writes, cached or not).
+
+ENV = "HAWKES_PROFILE"
+PROFILE_DIR = Path("data/processed/profile")
+
+_stack = []
+
+
+def enabled() -> bool:
+    return bool(os.environ.get(ENV))
+
+
+def _io():
+    try:
+        with open("/proc/self/io") as f:
+            vals = dict(line.split(":") for line in f.read().splitlines())
+        return int(vals["rchar"]), int(vals["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / (1024.0 * 1024.0) if sys.platform == "darwin" else kb / 1024.0
+
+
+class Stage:
+    def __init__(self, name: str, **tags):
+        self.name = name
+        self.tags = dict(tags)
+        self.counts = {}
+        self.fields = {}
+        self.fits = []
+        self.closed = False
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+        return self
+
+    def rows(self, n, label: str = "rows"):
+        # Rows processed; repeated calls accumulate (chunked stages)
+        self.counts[label] = self.counts.get(label, 0) + int(n)
+        return self
+
+    def set(self, **fields):
+        self.fields.update(fields)
+        return self
+
+    def optimizer(self, res=None, **fields):
+        # scipy OptimizeResult (nit, nfev, njev, success, fun) and/or explicit fields
+        rec = {}
+        for k in ["nit", "nfev", "njev", "success", "fun"]:
+            v = getattr(res, k, None) if res is not None else None
+            if v is not None:
+                rec[k] = v.item() if hasattr(v, "item") else v
+        rec.update(fields)
+        self.fits.append(rec)
+        return self
+
+    def start(self):
+        self.parent = _stack[-1].name if _stack else None
+        self.peak_reset = enabled() and not _stack and _reset_peak()
+        _stack.append(self)
+        self.t_start = datetime.now(timezone.utc)
+        self.wall0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+        self.io0 = _io()
+        return self
+
+    def finish(self, status: str = "ok", error=None):
+        if self.closed:
+            return None
+        self.closed = True
+        if self in _stack:
+            _stack.remove(self)
+        wall = time.perf_counter() - self.wall0
+        io1 = _io()
+        rec = {
+            "stage": self.name,
+            "parent": self.parent,
+            "tags": self.tags,
+            "status": status,
+            "pid": os.getpid(),
+            "start_utc": self.t_start.isoformat(),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(time.process_time() - self.cpu0, 6),
+            "rows": self.counts,
+            "rows_per_s": {k: round(v / wall, 1) for k, v in self.counts.items()} if wall > 0 else {},
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "peak_rss_scope": "stage" if self.peak_reset else "process",
+            "bytes_read": io1[0] - self.io0[0] if io1[0] is not None and self.io0[0] is not None else None,
+            "bytes_written": io1[1] - self.io0[1] if io1[1] is not None and self.io0[1] is not None else None,
+            "optimizer": self.fits,
+        }
+        if error is not None:
+            rec["error"] = error if isinstance(error, str) else repr(error)
+        rec.update(self.fields)
+        if enabled():
+            path = Path(os.environ[ENV])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # one write per record on an O_APPEND file, so concurrent processes interleave whole lines
+            with open(path, "a") as f:
+                f.write(json.dumps(rec, default=str) + "\n")
+        return rec
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish("ok" if exc_type is None else "error", exc)
+        return False
+
+
+class _Null(Stage):
+    # current() outside any stage: accepts the calls, records nothing
+    def finish(self, status="ok", error=None):
+        return None
+
+
+def stage(name: str, **tags) -> Stage:
+    return Stage(name, **tags)
+
+
+def current() -> Stage:
+    return _stack[-1] if _stack else _Null("none")
+
+
+def timed(name: str):
+    # Decorator: the call runs as a stage
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with Stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def track(name: str, **tags) -> Stage:
+    # Stage from now until the script calls rec.finish() (module-level scripts).
+    # SystemExit never reaches sys.excepthook and atexit does not see the exit status,
+    # so a stage still open at exit did not reach the end of its script: an error.
+    rec = Stage(name, **tags).start()
+    prev_hook = sys.excepthook
+
+    def hook(exc_type, exc, tb):
+        rec.finish("error", exc)
+        prev_hook(exc_type, exc, tb)
+
+    sys.excepthook = hook
+    atexit.register(rec.finish, "error", "exited before the end of the script (e.g. SystemExit)")
+    return rec
+
+
+# ---- run reports ----
+
+def run_path(label: str) -> Path:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return PROFILE_DIR / f"{label}_{stamp}.jsonl"
+
+
+def environment():
+    import numpy
+    import pandas
+    return {
+        "host": platform.node(), "platform": platform.platform(), "cpus": os.cpu_count(),
+        "python": platform.python_version(), "numpy": numpy.__version__, "pandas": pandas.__version__,
+    }
+
+
+def report(jsonl, out=None, **run):
+    # JSON run report from a records file: environment, run parameters, every stage record
+    jsonl = Path(jsonl)
+    recs = [json.loads(line) for line in jsonl.read_text().splitlines() if line.strip()] if jsonl.exists() else []
+    doc = {"run": dict(run, created_utc=datetime.now(timezone.utc).isoformat(), environment=environment()),
+           "stages": recs}
+    out = Path(out) if out else jsonl.with_suffix(".json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(doc, indent=1, default=str))
+    return out, doc
+
+
+def summary(doc):
+    # One row per stage record: wall, cpu, rows/s, peak RSS, MB read/written, fit iterations
+    rows = []
+    for r in doc["stages"]:
+        rate = max(r["rows_per_s"].values()) if r.get("rows_per_s") else None
+        rows.append({
+            "stage": r["stage"], "status": r["status"], "wall_s": r["wall_s"], "cpu_s": r["cpu_s"],
+            "rows_per_s": rate, "peak_rss_mb": r["peak_rss_mb"],
+            "mb_read": None if r["bytes_read"] is None else round(r["bytes_read"] / 2**20, 1),
+            "mb_written": None if r["bytes_written"] is None else round(r["bytes_written"] / 2**20, 1),
+            "nit": sum(f.get("nit", 0) or 0 for f in r["optimizer"]) or None,
+            "nfev": sum(f.get("nfev", 0) or 0 for f in r["optimizer"]) or None,
+        })
+    return rows
+
+
+def compare(base, new):
+    # Per stage: new / base ratios of wall time and peak RSS (first record per stage name)
+    def first(doc):
+        out = {}
+        for r in summary(doc):
+            out.setdefault(r["stage"], r)
+        return out
+    a, b = first(base), first(new)
+    rows = []
+    for name in [n for n in b if n in a]:
+        rows.append({
+            "stage": name,
+            "wall_base": a[name]["wall_s"], "wall_new": b[name]["wall_s"],
+            "wall_ratio": round(b[name]["wall_s"] / a[name]["wall_s"], 3) if a[name]["wall_s"] else None,
+            "rss_ratio": round(b[name]["peak_rss_mb"] / a[name]["peak_rss_mb"], 3) if a[name]["peak_rss_mb"] else None,
+        })
+    return rows
+
+
+def main():
+    import pandas as pd
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("report", help="fold a records .jsonl into a JSON run report")
+    p.add_argument("jsonl")
+    p.add_argument("--out", default=None)
+    p = sub.add_parser("show", help="print a run report")
+    p.add_argument("report")
+    p = sub.add_parser("compare", help="stage-by-stage wall/RSS ratios of two run reports")
+    p.add_argument("base")
+    p.add_argument("new")
+    args = ap.parse_args()
+
+    if args.cmd == "report":
+        out, doc = report(args.jsonl, args.out)
+        print("Wrote:", out)
+        print(pd.DataFrame(summary(doc)).to_string(index=False))
+    elif args.cmd == "show":
+        print(pd.DataFrame(summary(json.loads(Path(args.report).read_text()))).to_string(index=False))
+    else:
+        base = json.loads(Path(args.base).read_text())
+        new = json.loads(Path(args.new).read_text())
+        print(pd.DataFrame(compare(base, new)).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,19 @@
-import pandas as pd
 from pathlib import Path
 
-PREM = Path("data/processed/premium_1s_BTCUSDT_2024-11-05.csv")
-LARGE = Path("data/processed/large_trades_BTCUSDT_2024-11-05.csv")
-OUT = Path("data/processed/premium_with_large_trades_2024-11-05.csv")
-
-prem = pd.read_csv(PREM)
-large = pd.read_csv(LARGE, usecols=["t_sec","venue","qty_base","side"])
+import instrument
+import panel_1s
 
-# Flag seconds with at least one large trade (pooled)
-large_flag = (
-    large.groupby("t_sec")
-         .size()
-         .rename("large_trade_count")
-         .reset_index()
-)
+DATE = "2024-11-05"
+OUT = Path("data/processed/premium_with_large_trades_2024-11-05.csv")
+rec = instrument.track("join_large_trades_with_premium", date=DATE)
 
-prem = prem.merge(large_flag, on="t_sec", how="left")
-prem["large_trade_count"] = prem["large_trade_count"].fillna(0).astype(int)
+# Large-trade counts per second (pooled) are already aligned in the 1s panel
+panel = panel_1s.read(DATE)
+prem = panel_1s.long(panel, extra=["large_count"]).rename(columns={"large_count": "large_trade_count"})
 prem["has_large_trade"] = prem["large_trade_count"] > 0
 
 prem.to_csv(OUT, index=False)
+rec.rows(len(prem))
 
 print("Wrote:", OUT)
 print("\nSeconds with ≥1 large trade:", prem["has_large_trade"].sum())
@@ -28,3 +21,5 @@ print("\nPremium stats when NO large trade:")
 print(prem.loc[~prem["has_large_trade"], "log_premium"].describe()[["mean","std","min","max"]])
 print("\nPremium stats when LARGE trade present:")
 print(prem.loc[prem["has_large_trade"], "log_premium"].describe()[["mean","std","min","max"]])
+
+rec.finish()
@@ -1,38 +1,59 @@
-import pandas as pd
+import argparse
 from pathlib import Path
 
-FILES = [
-    Path("data/processed/binance_BTCUSDT_2024-11-05.csv"),
-    Path("data/processed/bybit_BTCUSDT_2024-11-05.csv"),
-    Path("data/processed/gate_BTCUSDT_2024-11-05.csv"),
-]
+import series_store
+import instrument
+import trade_store
+
+DATE = "2024-11-05"
+VENUES = ["binance", "bybit", "gate"]
 
 THRESHOLD = 1.0  # BTC
 
-dfs = []
-for f in FILES:
-    df = pd.read_csv(f, usecols=["ts_ms","dt_utc","venue","price","qty_base","side"])
-    df["qty_base"] = pd.to_numeric(df["qty_base"], errors="coerce")
-    dfs.append(df)
-
-tape = pd.concat(dfs, ignore_index=True)
-tape = tape.dropna(subset=["ts_ms","qty_base"])
-
-large = tape[tape["qty_base"] >= THRESHOLD].copy()
-large = large.sort_values("ts_ms")
-
-# Add second bucket for alignment with premium
-large["t_sec"] = (large["ts_ms"] // 1000).astype("int64")
-
-OUT = Path("data/processed/large_trades_BTCUSDT_2024-11-05.csv")
-OUT.parent.mkdir(parents=True, exist_ok=True)
-large.to_csv(OUT, index=False)
-
-print("Wrote:", OUT)
-print("Large trades count:", len(large))
-print("\nCounts by venue:")
-print(large["venue"].value_counts())
-print("\nFirst 5:")
-print(large.head(5).to_string(index=False))
-print("\nLast 5:")
-print(large.tail(5).to_string(index=False))
+
+def out_path(date: str) -> Path:
+    return Path(f"data/processed/large_trades_BTCUSDT_{date}.csv")
+
+
+@instrument.timed("large_trade_events")
+def extract(date: str, venues=VENUES, threshold: float = THRESHOLD):
+    tape = trade_store.read_trades(
+        venues=venues, dates=[date], columns=["ts_ms","venue","price","qty_base","side"]
+    )
+    tape = tape.dropna(subset=["ts_ms","qty_base"])
+
+    large = tape[tape["qty_base"] >= threshold].copy()
+    large = large.sort_values("ts_ms", kind="stable")
+    large = trade_store.with_dt_utc(large)
+    large = large[["ts_ms","dt_utc","venue","price","qty_base","side"]]
+
+    # Add second bucket for alignment with premium
+    large["t_sec"] = (large["ts_ms"] // 1000).astype("int64")
+
+    out = out_path(date)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    large.to_csv(out, index=False)
+    series_store.write_events(out, large["ts_ms"].to_numpy())
+    instrument.current().tag(date=date, threshold=threshold).rows(len(tape), "trades").rows(len(large))
+    return out, large
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = ap.parse_args()
+
+    out, large = extract(args.date, threshold=args.threshold)
+    print("Wrote:", out)
+    print("Large trades count:", len(large))
+    print("\nCounts by venue:")
+    print(large["venue"].value_counts())
+    print("\nFirst 5:")
+    print(large.head(5).to_string(index=False))
+    print("\nLast 5:")
+    print(large.tail(5).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,150 @@
+import argparse
 import pandas as pd
 from pathlib import Path
 import zipfile
 
-ZIP_PATH = Path("data/raw/BTCUSDT-trades-2024-11-05.zip")
-OUT = Path("data/processed/binance_BTCUSDT_2024-11-05.csv")
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 
-with zipfile.ZipFile(ZIP_PATH, "r") as z:
+import trade_store
+import instrument
+
+DATE = "2024-11-05"
+
+# Streaming mode: bytes of CSV text decoded per batch (bounds peak memory)
+BLOCK_MB = 64
+
+
+def zip_path_for(date: str) -> Path:
+    return Path(f"data/raw/BTCUSDT-trades-{date}.zip")
+
+
+def open_csv_member(z: zipfile.ZipFile):
     # pick the first csv in the archive
     csv_names = [n for n in z.namelist() if n.lower().endswith(".csv")]
     if not csv_names:
         raise SystemExit("No CSV found in the Binance zip.")
-    csv_name = csv_names[0]
+    return z.open(csv_names[0])
+
+
+@instrument.timed("normalize_binance")
+def normalize(zip_path: Path, date: str):
+    with zipfile.ZipFile(zip_path, "r") as z:
+        with open_csv_member(z) as f:
+            df = pd.read_csv(f)
+
+    # Expected columns: id, price, qty, quote_qty, time, is_buyer_maker
+    # time is milliseconds since epoch (UTC)
+    df["ts_ms"] = pd.to_numeric(df["time"], errors="coerce").astype("int64")
+    df["dt_utc"] = pd.to_datetime(df["ts_ms"], unit="ms", utc=True)
+
+    df["venue"] = "binance"
+    df["symbol"] = "BTCUSDT"
+
+    # trade_id
+    df["trade_id"] = df["id"]
+
+    # qty_base
+    df["qty_base"] = pd.to_numeric(df["qty"], errors="coerce")
+
+    # side: is_buyer_maker=False means buyer aggressive -> Buy
+    # is_buyer_maker=True  means buyer maker -> Sell aggressive -> Sell
+    df["side"] = df["is_buyer_maker"].map({False: "Buy", True: "Sell"})
+
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+
+    out = df[["ts_ms", "dt_utc", "venue", "symbol", "trade_id", "price", "qty_base", "side"]].copy()
+
+    path = trade_store.write_day(out, "binance", date)
+    instrument.current().tag(date=date).rows(len(out))
+    return path, out
+
+
+def _convert_batch(batch: pa.RecordBatch) -> pa.Table:
+    # Same mapping as normalize(), column by column in Arrow (no pandas copies)
+    n = batch.num_rows
+    side = pc.if_else(batch.column("is_buyer_maker"), "Sell", "Buy")
+    return pa.Table.from_arrays(
+        [
+            batch.column("time"),
+            pa.repeat(pa.scalar("BTCUSDT", pa.string()), n),
+            pc.cast(batch.column("id"), pa.string()),
+            batch.column("price"),
+            batch.column("qty"),
+            side,
+        ],
+        schema=trade_store.SCHEMA,
+    )
+
 
-    with z.open(csv_name) as f:
-        df = pd.read_csv(f)
+@instrument.timed("normalize_binance_stream")
+def normalize_stream(zip_path: Path, date: str, block_mb: int = BLOCK_MB):
+    # Decompress + parse + convert in fixed-size blocks and append each one to the
+    # store partition; only one block is alive at a time. Binance daily files are
+    # in trade id (= time) order, so the partition stays ts-sorted.
+    read_opts = pacsv.ReadOptions(block_size=block_mb << 20, use_threads=True)
+    conv_opts = pacsv.ConvertOptions(
+        include_columns=["id", "price", "qty", "time", "is_buyer_maker"],
+        column_types={
+            "id": pa.int64(),
+            "price": pa.float64(),
+            "qty": pa.float64(),
+            "time": pa.int64(),
+            "is_buyer_maker": pa.bool_(),
+        },
+    )
 
-# Expected columns: id, price, qty, quote_qty, time, is_buyer_maker
-# time is milliseconds since epoch (UTC)
-df["ts_ms"] = pd.to_numeric(df["time"], errors="coerce").astype("int64")
-df["dt_utc"] = pd.to_datetime(df["ts_ms"], unit="ms", utc=True)
+    rows = 0
+    ts_min = ts_max = None
+    head = None
+    with zipfile.ZipFile(zip_path, "r") as z, open_csv_member(z) as f:
+        reader = pacsv.open_csv(f, read_options=read_opts, convert_options=conv_opts)
+        with trade_store.writer("binance", date) as w:
+            for batch in reader:
+                if batch.num_rows == 0:
+                    continue
+                table = _convert_batch(batch)
+                w.write_table(table)
 
-df["venue"] = "binance"
-df["symbol"] = "BTCUSDT"
+                rows += table.num_rows
+                lo, hi = pc.min_max(table.column("ts_ms")).values()
+                ts_min = lo.as_py() if ts_min is None else min(ts_min, lo.as_py())
+                ts_max = hi.as_py() if ts_max is None else max(ts_max, hi.as_py())
+                if head is None:
+                    head = table.slice(0, 3).to_pandas()
 
-# trade_id
-df["trade_id"] = df["id"]
+    path = trade_store.partition_path("binance", date) / "part-0.parquet"
+    instrument.current().tag(date=date, block_mb=block_mb).rows(rows)
+    return path, rows, ts_min, ts_max, head
 
-# qty_base
-df["qty_base"] = pd.to_numeric(df["qty"], errors="coerce")
 
-# side: is_buyer_maker=False means buyer aggressive -> Buy
-# is_buyer_maker=True  means buyer maker -> Sell aggressive -> Sell
-df["side"] = df["is_buyer_maker"].map({False: "Buy", True: "Sell"})
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--zip", default=None)
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--stream", action="store_true", help="bounded-memory chunked conversion")
+    ap.add_argument("--block-mb", type=int, default=BLOCK_MB)
+    args = ap.parse_args()
+    zip_path = Path(args.zip) if args.zip else zip_path_for(args.date)
 
-df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    if args.stream:
+        out_path, rows, ts_min, ts_max, head = normalize_stream(zip_path, args.date, args.block_mb)
+        print("Wrote:", out_path)
+        print("Rows:", rows)
+        if rows:
+            print("Min dt:", pd.to_datetime(ts_min, unit="ms", utc=True))
+            print("Max dt:", pd.to_datetime(ts_max, unit="ms", utc=True))
+            print(head.to_string(index=False))
+        return
 
-out = df[["ts_ms", "dt_utc", "venue", "symbol", "trade_id", "price", "qty_base", "side"]].copy()
+    out_path, out = normalize(zip_path, args.date)
+    print("Wrote:", out_path)
+    print("Rows:", len(out))
+    print("Min dt:", out["dt_utc"].min())
+    print("Max dt:", out["dt_utc"].max())
+    print(out.head(3).to_string(index=False))
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-out.to_csv(OUT, index=False)
 
-print("Wrote:", OUT)
-print("Rows:", len(out))
-print("Min dt:", out["dt_utc"].min())
-print("Max dt:", out["dt_utc"].max())
-print(out.head(3).to_string(index=False))
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,57 @@
+import argparse
 import pandas as pd
 from pathlib import Path
 
-RAW = Path("data/raw/BTCUSDT2024-11-05.csv.gz")
-OUT = Path("data/processed/bybit_BTCUSDT_2024-11-05.csv")
+import trade_store
+import instrument
 
-df = pd.read_csv(RAW)
+DATE = "2024-11-05"
 
-# Expected columns include:
-# timestamp (seconds), symbol, side (Buy/Sell), size (base), price, trdMatchID, ...
-# Convert to canonical
-df["ts_s"] = pd.to_numeric(df["timestamp"], errors="coerce")
-df["ts_ms"] = (df["ts_s"] * 1000.0).round().astype("int64")
-df["dt_utc"] = pd.to_datetime(df["ts_ms"], unit="ms", utc=True)
 
-df["venue"] = "bybit"
-df["symbol"] = df["symbol"].astype(str)
+def raw_path(date: str) -> Path:
+    return Path(f"data/raw/BTCUSDT{date}.csv.gz")
 
-df["trade_id"] = df["trdMatchID"].astype(str)
-df["price"] = pd.to_numeric(df["price"], errors="coerce")
-df["qty_base"] = pd.to_numeric(df["size"], errors="coerce")
-df["side"] = df["side"].astype(str)
 
-out = df[["ts_ms", "dt_utc", "venue", "symbol", "trade_id", "price", "qty_base", "side"]].copy()
+@instrument.timed("normalize_bybit")
+def normalize(raw: Path, date: str):
+    df = pd.read_csv(raw)
 
-OUT.parent.mkdir(parents=True, exist_ok=True)
-out.to_csv(OUT, index=False)
+    # Expected columns include:
+    # timestamp (seconds), symbol, side (Buy/Sell), size (base), price, trdMatchID, ...
+    # Convert to canonical
+    df["ts_s"] = pd.to_numeric(df["timestamp"], errors="coerce")
+    df["ts_ms"] = (df["ts_s"] * 1000.0).round().astype("int64")
+    df["dt_utc"] = pd.to_datetime(df["ts_ms"], unit="ms", utc=True)
 
-print("Wrote:", OUT)
-print("Rows:", len(out))
-print("Min dt:", out["dt_utc"].min())
-print("Max dt:", out["dt_utc"].max())
-print(out.head(3).to_string(index=False))
+    df["venue"] = "bybit"
+    df["symbol"] = df["symbol"].astype(str)
+
+    df["trade_id"] = df["trdMatchID"].astype(str)
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    df["qty_base"] = pd.to_numeric(df["size"], errors="coerce")
+    df["side"] = df["side"].astype(str)
+
+    out = df[["ts_ms", "dt_utc", "venue", "symbol", "trade_id", "price", "qty_base", "side"]].copy()
+
+    path = trade_store.write_day(out, "bybit", date)
+    instrument.current().tag(date=date).rows(len(out))
+    return path, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--raw", default=None)
+    ap.add_argument("--date", default=DATE)
+    args = ap.parse_args()
+    raw = Path(args.raw) if args.raw else raw_path(args.date)
+
+    out_path, out = normalize(raw, args.date)
+    print("Wrote:", out_path)
+    print("Rows:", len(out))
+    print("Min dt:", out["dt_utc"].min())
+    print("Max dt:", out["dt_utc"].max())
+    print(out.head(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
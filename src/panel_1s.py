@@ -0,0 +1,175 @@
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import build_premium_1s
+import instrument
+import large_trade_events
+import series_store
+
+# Aligned wide 1s analytics panel, one per day.
+#
+# One row per second on a contiguous grid (first to last premium second), columns:
+#   t_sec, price_ref,
+#   price_<venue>, premium_<venue>        (NaN when the venue did not trade)
+#   lambda, lambda_strict, lambda_<kernel> (every lambda grid present for the day)
+#   large_count, large_qty, large_count_<venue>
+#
+# Built once from the premium CSV, the lambda .bin grids and the large-trade events
+# by index arithmetic on t_sec (no merges). Stored as Parquet sorted by t_sec with
+# one row group per hour, so read(date, start, end) only touches the hours it needs.
+# read/span rebuild it when the premium CSV, a lambda grid or the large-trade events
+# are newer than the panel file.
+
+DATE = "2024-11-05"
+ROW_GROUP = 3600
+
+
+def panel_path(date: str) -> Path:
+    return Path(f"data/processed/panel_1s_BTCUSDT_{date}.parquet")
+
+
+def lambda_sources(date: str):
+    # panel column -> lambda grid file (hawkes_intensity_1s*.py outputs)
+    out = {
+        "lambda": Path(f"data/processed/hawkes_lambda_1s_{date}.bin"),
+        "lambda_strict": Path(f"data/processed/hawkes_lambda_1s_strict_{date}.bin"),
+    }
+    for kernel in ["sumexp", "powerlaw"]:
+        out[f"lambda_{kernel}"] = Path(f"data/processed/hawkes_lambda_1s_{kernel}_{date}.bin")
+    return out
+
+
+@instrument.timed("panel_1s")
+def build(date: str, venues=None):
+    prem = pd.read_csv(build_premium_1s.out_path(date),
+                       usecols=["t_sec", "venue", "price_venue", "price_ref", "log_premium"])
+    venues = venues or sorted(prem["venue"].unique())
+    start, end = int(prem["t_sec"].min()), int(prem["t_sec"].max())
+    n = end - start + 1
+    t_sec = np.arange(start, end + 1, dtype=np.int64)
+
+    cols = {"t_sec": t_sec, "price_ref": np.full(n, np.nan)}
+    idx = prem["t_sec"].to_numpy(np.int64) - start
+    cols["price_ref"][idx] = prem["price_ref"].to_numpy()
+    venue = prem["venue"].to_numpy()
+    for v in venues:
+        m = venue == v
+        for src, dst in [("price_venue", f"price_{v}"), ("log_premium", f"premium_{v}")]:
+            a = np.full(n, np.nan)
+            a[idx[m]] = prem[src].to_numpy()[m]
+            cols[dst] = a
+
+    for name, path in lambda_sources(date).items():
+        if not path.exists():
+            continue
+        lam, meta = series_store.read(path)
+        _, ls = series_store.grid_seconds(meta)
+        k = ls - start
+        ok = (k >= 0) & (k < n)
+        a = np.full(n, np.nan)
+        a[k[ok]] = lam[ok]
+        cols[name] = a
+
+    events = large_trade_events.out_path(date)
+    if events.exists():
+        large = pd.read_csv(events, usecols=["t_sec", "venue", "qty_base"])
+        k = large["t_sec"].to_numpy(np.int64) - start
+        ok = (k >= 0) & (k < n)
+        cols["large_count"] = np.bincount(k[ok], minlength=n).astype(np.int64)
+        cols["large_qty"] = np.bincount(k[ok], weights=large["qty_base"].to_numpy()[ok], minlength=n)
+        lv = large["venue"].to_numpy()[ok]
+        for v in venues:
+            cols[f"large_count_{v}"] = np.bincount(k[ok][lv == v], minlength=n).astype(np.int64)
+
+    panel = pd.DataFrame(cols)
+    out = panel_path(date)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(panel, preserve_index=False), out,
+                   row_group_size=ROW_GROUP, compression="zstd")
+    instrument.current().tag(date=date).rows(len(panel))
+    return out, panel
+
+
+def inputs(date: str):
+    paths = [build_premium_1s.out_path(date), large_trade_events.out_path(date)]
+    paths += list(lambda_sources(date).values())
+    return [p for p in paths if p.exists()]
+
+
+def ensure(date: str):
+    # Build the panel if it is missing or older than any of its inputs
+    path = panel_path(date)
+    if not path.exists() or any(p.stat().st_mtime > path.stat().st_mtime for p in inputs(date)):
+        build(date)
+    return path
+
+
+def read(date: str, start=None, end=None, columns=None):
+    # Panel rows with start <= t_sec <= end (either bound optional); built when stale
+    ensure(date)
+    filters = []
+    if start is not None:
+        filters.append(("t_sec", ">=", int(start)))
+    if end is not None:
+        filters.append(("t_sec", "<=", int(end)))
+    if columns is not None and "t_sec" not in columns:
+        columns = ["t_sec"] + list(columns)
+    table = pq.read_table(panel_path(date), columns=columns, filters=filters or None)
+    return table.to_pandas()
+
+
+def span(date: str):
+    # (first, last) t_sec of the panel from the row-group statistics (no data read)
+    ensure(date)
+    meta = pq.ParquetFile(panel_path(date)).metadata
+    col = meta.schema.names.index("t_sec")
+    first = meta.row_group(0).column(col).statistics.min
+    last = meta.row_group(meta.num_row_groups - 1).column(col).statistics.max
+    return int(first), int(last)
+
+
+def venues_of(panel):
+    return [c[len("premium_"):] for c in panel.columns if c.startswith("premium_")]
+
+
+def long(panel, extra=(), venues=None):
+    # Long (t_sec, venue) rows where the venue has a premium, venue by venue, in the
+    # premium CSV schema plus any panel columns in `extra` (stacked, not merged)
+    venues = venues or venues_of(panel)
+    parts = []
+    for v in venues:
+        m = panel[f"premium_{v}"].notna().to_numpy()
+        part = pd.DataFrame({
+            "t_sec": panel["t_sec"].to_numpy()[m],
+            "venue": v,
+            "symbol": "BTCUSDT",
+            "price_venue": panel[f"price_{v}"].to_numpy()[m],
+            "price_ref": panel["price_ref"].to_numpy()[m],
+            "log_premium": panel[f"premium_{v}"].to_numpy()[m],
+        })
+        for c in extra:
+            part[c] = panel[c].to_numpy()[m]
+        parts.append(part)
+    df = pd.concat(parts, ignore_index=True)
+    df.insert(1, "dt_utc", pd.to_datetime(df["t_sec"], unit="s", utc=True))
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    args = ap.parse_args()
+
+    out, panel = build(args.date)
+    print("Wrote:", out)
+    print(f"Seconds: {len(panel)}  Columns: {len(panel.columns)}")
+    print(panel.columns.tolist())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+import build_premium_1s
+import extract_gate_day
+import fit_hawkes_1d
+import hawkes_intensity_1s
+import instrument
+import large_trade_events
+import normalize_binance_day
+import normalize_bybit_day
+import panel_1s
+import size_sketch
+import trade_store
+
+# Cached DAG runner for the "Reproduce Results" scripts of one day.
+#
+# Every stage is a src/*.py script run as a subprocess with its declared inputs,
+# outputs and parameters. Edges come from outputs -> inputs. A stage is skipped when
+# its key (content hashes of its inputs, its arguments, and the source of the script
+# and every src module it imports) matches the last successful run and its outputs
+# still have the recorded hashes. Ready stages run concurrently (e.g. the default and
+# strict Hawkes chains), so after a change only the affected branch reruns.
+#
+# Cache: data/processed/pipeline_cache.json (file digests are reused while size and
+# mtime are unchanged). Logs: data/processed/pipeline_logs/<stage>.log.
+# Profile: every stage that runs reports into instrument; the run's JSON report goes to
+# data/processed/profile/pipeline_<date>_<UTC stamp>.json (--no-profile to skip).
+#
+# e.g. python src/pipeline.py --date 2024-11-05 --quantiles 0.5,0.9,0.99 --workers 4
+
+SRC = Path(__file__).resolve().parent
+CACHE = Path("data/processed/pipeline_cache.json")
+LOG_DIR = Path("data/processed/pipeline_logs")
+DATE = "2024-11-05"
+FIXED_DATE = "2024-11-05"  # day hardcoded in the scripts without --date
+VENUES = ["binance", "bybit", "gate"]
+
+
+def stage(name, script, args=(), inputs=(), outputs=(), fixed=False):
+    return {"name": name, "script": script, "args": [str(a) for a in args],
+            "inputs": [str(p) for p in inputs], "outputs": [str(p) for p in outputs], "fixed": fixed}
+
+
+def stages(date=DATE, threshold=large_trade_events.THRESHOLD, kernels=("exp",), quantiles="0.5,0.9,0.99"):
+    part = {v: trade_store.partition_path(v, date) / "part-0.parquet" for v in VENUES}
+    large = large_trade_events.out_path(date)
+    lam = {k: hawkes_intensity_1s.out_path(date, k) for k in kernels}
+    lam_strict = Path(f"data/processed/hawkes_lambda_1s_strict_{date}.bin")
+    panel = panel_1s.panel_path(date)
+
+    out = [
+        stage("normalize_gate", "extract_gate_day.py", ["--date", date],
+              [extract_gate_day.raw_path(date)], [part["gate"]]),
+        stage("normalize_binance", "normalize_binance_day.py", ["--date", date],
+              [normalize_binance_day.zip_path_for(date)], [part["binance"]]),
+        stage("normalize_bybit", "normalize_bybit_day.py", ["--date", date],
+              [normalize_bybit_day.raw_path(date)], [part["bybit"]]),
+        stage("sizes", "size_distributions.py", ["--date", date],
+              part.values(), [size_sketch.sketch_path(v, date) for v in VENUES]),
+        stage("premium", "build_premium_1s.py", ["--date", date],
+              part.values(), [build_premium_1s.out_path(date)]),
+        stage("large", "large_trade_events.py", ["--date", date, "--threshold", threshold],
+              part.values(), [large]),
+        stage("join_large", "join_large_trades_with_premium.py", [],
+              [panel], [f"data/processed/premium_with_large_trades_{date}.csv"], fixed=True),
+    ]
+    for k in kernels:
+        params = fit_hawkes_1d.params_path(date) if k == "exp" else fit_hawkes_1d.kernel_params_path(date, k)
+        sfx = "" if k == "exp" else f"_{k}"
+        out += [
+            stage(f"fit{sfx}", "fit_hawkes_1d.py", ["--date", date, "--kernel", k], [large], [params]),
+            stage(f"intensity{sfx}", "hawkes_intensity_1s.py", ["--date", date, "--kernel", k],
+                  [large, params], [lam[k]]),
+        ]
+    strict_params = Path(f"data/processed/hawkes_fit_params_strict_{date}.txt")
+    out += [
+        stage("fit_strict", "fit_hawkes_1d_strict.py", [], [large], [strict_params], fixed=True),
+        stage("intensity_strict", "hawkes_intensity_1s_strict.py", [], [large, strict_params], [lam_strict], fixed=True),
+        stage("panel", "panel_1s.py", ["--date", date],
+              [build_premium_1s.out_path(date), large, *lam.values()] + ([lam_strict] if date == FIXED_DATE else []),
+              [panel]),
+        stage("regime", "premium_vs_hawkes_regime.py", [],
+              [panel], [f"data/processed/premium_with_hawkes_regime_{date}.csv"], fixed=True),
+        stage("compare_strict", "compare_premium_vs_hawkes.py", [],
+              [panel], ["data/processed/premium_regime_compare_old_vs_strict.csv"], fixed=True),
+        stage("naive_rolling", "naive_rolling_comparison.py", [],
+              [panel], ["data/processed/naive_rolling_comparison_stats.csv"], fixed=True),
+        stage("regime_stats", "regime_stats.py", ["--start", date, "--quantiles", quantiles],
+              [panel], [f"data/processed/regime_stats_{date}_{date}.csv"]),
+    ]
+    if date != FIXED_DATE:
+        out = [s for s in out if not s["fixed"]]
+    return out
+
+
+# ---- hashing ----
+
+def _digest(path, files):
+    # Content hash of a file, reused from the cache while size and mtime are unchanged
+    p = Path(path)
+    st = p.stat()
+    rec = files.get(str(p))
+    if rec and rec[0] == st.st_size and rec[1] == st.st_mtime_ns:
+        return rec[2]
+    h = hashlib.blake2b(digest_size=16)
+    with open(p, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    files[str(p)] = [st.st_size, st.st_mtime_ns, h.hexdigest()]
+    return h.hexdigest()
+
+
+def code_deps(script, seen=None):
+    # The script and every src module it imports, transitively
+    seen = set() if seen is None else seen
+    path = SRC / script
+    if path in seen or not path.exists():
+        return seen
+    seen.add(path)
+    for node in ast.walk(ast.parse(path.read_text())):
+        names = [a.name for a in node.names] if isinstance(node, ast.Import) else \
+            [node.module] if isinstance(node, ast.ImportFrom) and node.module else []
+        for name in names:
+            code_deps(f"{name.split('.')[0]}.py", seen)
+    return seen
+
+
+def stage_key(s, files):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(json.dumps([s["script"], s["args"]]).encode())
+    for p in sorted(code_deps(s["script"])):
+        h.update(p.name.encode() + _digest(p, files).encode())
+    for p in s["inputs"]:
+        h.update(p.encode() + (_digest(p, files) if Path(p).exists() else "missing").encode())
+    return h.hexdigest()
+
+
+def up_to_date(s, key, cache, files):
+    rec = cache["stages"].get(s["name"])
+    if not rec or rec["key"] != key:
+        return False
+    return all(Path(p).exists() and _digest(p, files) == rec["outputs"].get(p) for p in s["outputs"])
+
+
+# ---- running ----
+
+def run_stage(s):
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    c0 = time.perf_counter()
+    with open(LOG_DIR / f"{s['name']}.log", "w") as log:
+        proc = subprocess.run([sys.executable, str(SRC / s["script"]), *s["args"]],
+                              stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - c0
+
+
+def run(plan, workers=None, force=(), dry_run=False):
+    cache = json.loads(CACHE.read_text()) if CACHE.exists() else {"files": {}, "stages": {}}
+    files = cache["files"]
+    producer = {p: s["name"] for s in plan for p in s["outputs"]}
+    deps = {s["name"]: {producer[p] for p in s["inputs"] if p in producer} for s in plan}
+    by_name = {s["name"]: s for s in plan}
+    status = {}
+
+    def decide(s):
+        # run / skip (cached) / keep (external inputs missing, outputs present) / missing
+        external = [p for p in s["inputs"] if p not in producer and not Path(p).exists()]
+        if external:
+            return ("keep", None) if all(Path(p).exists() for p in s["outputs"]) else ("missing", external)
+        key = stage_key(s, files)
+        if s["name"] not in force and up_to_date(s, key, cache, files):
+            return "cached", key
+        return "run", key
+
+    pending = dict(by_name)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        while pending or running:
+            for name in list(pending):
+                if any(d in pending or d not in status for d in deps[name]):
+                    continue
+                s = pending.pop(name)
+                if any(status[d] in ("failed", "blocked", "missing") for d in deps[name]):
+                    status[name] = "blocked"
+                    print(f"{'blocked':8s} {name}")
+                    continue
+                what, key = decide(s)
+                if what != "run" or dry_run:
+                    status[name] = what if what != "run" else "stale"
+                    print(f"{status[name]:8s} {name}" + (f"  (no {', '.join(key)})" if what == "missing" else ""))
+                    continue
+                running[pool.submit(run_stage, s)] = (name, key)
+                print(f"{'start':8s} {name}")
+            if not running:
+                continue
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name, key = running.pop(fut)
+                code, secs = fut.result()
+                s = by_name[name]
+                if code == 0 and all(Path(p).exists() for p in s["outputs"]):
+                    status[name] = "ran"
+                    cache["stages"][name] = {"key": key, "outputs": {p: _digest(p, files) for p in s["outputs"]}}
+                    print(f"{'ran':8s} {name}  {secs:.1f}s")
+                else:
+                    status[name] = "failed"
+                    print(f"{'FAILED':8s} {name}  (exit {code}, see {LOG_DIR / (name + '.log')})")
+            CACHE.parent.mkdir(parents=True, exist_ok=True)
+            CACHE.write_text(json.dumps(cache))
+    if not dry_run:
+        CACHE.parent.mkdir(parents=True, exist_ok=True)
+        CACHE.write_text(json.dumps(cache))
+    return status
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--threshold", type=float, default=large_trade_events.THRESHOLD)
+    ap.add_argument("--kernels", default="exp", help="exp[,sumexp,powerlaw]")
+    ap.add_argument("--quantiles", default="0.5,0.9,0.99", help="regime cut-offs for regime_stats")
+    ap.add_argument("--only", default=None, help="comma-separated stages (their upstream is included)")
+    ap.add_argument("--force", default="", help="comma-separated stages to rerun regardless of the cache")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--dry-run", action="store_true", help="report cached/stale stages without running")
+    ap.add_argument("--no-profile", action="store_true", help="no instrumentation report")
+    args = ap.parse_args()
+
+    kernels = [k for k in args.kernels.split(",") if k]
+    if "exp" not in kernels:
+        kernels.insert(0, "exp")
+    plan = stages(args.date, args.threshold, kernels, args.quantiles)
+    if args.only:
+        producer = {p: s["name"] for s in plan for p in s["outputs"]}
+        by_name = {s["name"]: s for s in plan}
+        keep, todo = set(), [n for n in args.only.split(",") if n]
+        while todo:
+            n = todo.pop()
+            if n in keep:
+                continue
+            if n not in by_name:
+                raise SystemExit(f"Unknown stage: {n}")
+            keep.add(n)
+            todo += [producer[p] for p in by_name[n]["inputs"] if p in producer]
+        plan = [s for s in plan if s["name"] in keep]
+
+    profile = None
+    if not (args.no_profile or args.dry_run):
+        profile = instrument.run_path(f"pipeline_{args.date}")
+        os.environ[instrument.ENV] = str(profile)  # inherited by the stage subprocesses
+
+    c0 = time.perf_counter()
+    status = run(plan, args.workers, {n for n in args.force.split(",") if n}, args.dry_run)
+    counts = {}
+    for v in status.values():
+        counts[v] = counts.get(v, 0) + 1
+    print(f"\nStages: {len(plan)}  {counts}  elapsed {time.perf_counter() - c0:.1f}s")
+    if profile is not None:
+        out, _ = instrument.report(profile, runner="pipeline", date=args.date, threshold=args.threshold,
+                                   kernels=kernels, quantiles=args.quantiles, status=status,
+                                   wall_s=round(time.perf_counter() - c0, 3))
+        print("Profile:", out)
+    if any(v in ("failed", "blocked", "missing") for v in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,159 @@
-import pandas as pd
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")  # file output only; safe in worker processes
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 from pathlib import Path
 
-files = {
-    "Binance": "outputs/figures/shock_window_binance_20241105T153027Z.csv",
-    "Bybit":   "outputs/figures/shock_window_bybit_20241105T153027Z.csv",
-    "Gate":    "outputs/figures/shock_window_gate_20241105T153027Z.csv",
-}
+import export_shock_window_series
+import panel_1s
+
+# Batch figure rendering.
+#
+# - Shock windows: one three-panel figure (raw premium, 30s rolling mean, 30s EWMA per
+#   venue) per center listed in an export_shock_window_series.py index, or for --center.
+# - Full days: lambda and every venue's premium from the 1s panel, one figure per day.
+#
+# Figures render in a process pool on the Agg backend. Series longer than about two
+# points per horizontal pixel are reduced to the min and max of each pixel-wide time
+# bucket (in time order), which keeps spikes and the envelope while bounding the points drawn.
+
+OUT_DIR = Path("outputs/figures")
+CENTER = "2024-11-05T15:30:27+00:00"
+VENUES = ["binance", "bybit", "gate"]
+DPI = 150
+
+
+def minmax_downsample(x, y, buckets: int):
+    # (x, y) reduced to the first min and max of each of `buckets` equal-width time
+    # buckets (x sorted; datetimes or numeric), so gaps in the series do not squeeze
+    # or stretch the per-pixel envelope. NaN-only and empty buckets are dropped.
+    # Short series are returned unchanged.
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 2 * buckets:
+        return x, y
+    # datetime64 or (tz-aware) Timestamp objects -> integer time; only the spacing matters
+    xv = pd.to_datetime(x).asi8 if x.dtype.kind == "M" or x.dtype == object else x.astype(float)
+    edges = np.linspace(float(xv[0]), float(xv[-1]), buckets + 1)[1:-1]
+    seg = np.searchsorted(edges, xv, side="right")
+    starts = np.flatnonzero(np.r_[True, seg[1:] != seg[:-1]])  # first row of each non-empty bucket
+    run = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    with np.errstate(invalid="ignore"):
+        lo = np.fmin.reduceat(y, starts)[run]
+        hi = np.fmax.reduceat(y, starts)[run]
+    keep = np.zeros(n, dtype=bool)
+    for hit in (y == lo, y == hi):
+        idx = np.flatnonzero(hit)
+        first = np.unique(run[idx], return_index=True)[1]
+        keep[idx[first]] = True
+    return x[keep], y[keep]
+
+
+def render_window(center: int, paths: dict, out):
+    fig, axes = plt.subplots(1, len(paths), figsize=(5 * len(paths), 4), sharey=True, squeeze=False)
+    axes = axes[0]
+    for ax, (name, path) in zip(axes, paths.items()):
+        df = pd.read_csv(path)
+        df["dt_utc"] = pd.to_datetime(df["dt_utc"])
+
+        ax.plot(df["dt_utc"], df["log_premium"], label="raw", lw=1.5)
+        ax.plot(df["dt_utc"], df["roll_mean_30s"], label="roll mean 30s", alpha=0.8)
+        ax.plot(df["dt_utc"], df["ewma_30s"], label="EWMA 30s", alpha=0.8)
+
+        ax.set_title(name)
+        ax.tick_params(axis='x', rotation=45)
+
+    axes[0].set_ylabel("log premium")
+    axes[0].legend()
+
+    plt.tight_layout()
+    Path(out).parent.mkdir(exist_ok=True, parents=True)
+    fig.savefig(out, dpi=DPI)
+    plt.close(fig)
+    return str(out)
+
+
+def render_day(date: str, out, width_in: float = 15.0):
+    # lambda (top) and per-venue premium (bottom) over the day, min/max per pixel
+    panel = panel_1s.read(date)
+    t = pd.to_datetime(panel["t_sec"].to_numpy(), unit="s", utc=True).to_numpy()
+    buckets = int(width_in * DPI)
+    fig, (ax_l, ax_p) = plt.subplots(2, 1, figsize=(width_in, 6), sharex=True)
+
+    for col in [c for c in panel.columns if c.startswith("lambda")]:
+        ax_l.plot(*minmax_downsample(t, panel[col].to_numpy(), buckets), lw=0.6, label=col)
+    for v in panel_1s.venues_of(panel):
+        y = panel[f"premium_{v}"].to_numpy()
+        m = ~np.isnan(y)
+        ax_p.plot(*minmax_downsample(t[m], y[m], buckets), lw=0.6, label=v)
+
+    ax_l.set_ylabel("lambda (1/s)")
+    ax_p.set_ylabel("log premium")
+    ax_l.set_title(f"BTCUSDT {date}")
+    ax_l.legend(loc="upper right")
+    ax_p.legend(loc="upper right")
+    plt.tight_layout()
+    Path(out).parent.mkdir(exist_ok=True, parents=True)
+    fig.savefig(out, dpi=DPI)
+    plt.close(fig)
+    return str(out)
+
+
+def window_jobs(index_csv):
+    # One render_window job per center in an export index
+    idx = pd.read_csv(index_csv)
+    jobs = []
+    for center, g in idx[idx["rows"] > 0].groupby("center", sort=True):
+        paths = {v.capitalize(): p for v, p in zip(g["venue"], g["path"])}
+        out = export_shock_window_series.out_path("all", int(center)).with_suffix(".png")
+        jobs.append((render_window, (int(center), paths, out)))
+    return jobs
+
+
+def run(jobs, workers=None):
+    if (workers or os.cpu_count()) == 1 or len(jobs) == 1:
+        return [fn(*args) for fn, args in jobs]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futs = [pool.submit(fn, *args) for fn, args in jobs]
+        return [f.result() for f in futs]
 
-fig, axes = plt.subplots(1, 3, figsize=(15,4), sharey=True)
 
-for ax, (name, path) in zip(axes, files.items()):
-    df = pd.read_csv(path)
-    df["dt_utc"] = pd.to_datetime(df["dt_utc"])
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--center", default=None, help="one shock window (default: Figure 1)")
+    ap.add_argument("--index", action="append", default=[], help="shock_windows_<date>.csv (repeatable)")
+    ap.add_argument("--days", default=None, help="full-day figures: START[:END]")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
 
-    ax.plot(df["dt_utc"], df["log_premium"], label="raw", lw=1.5)
-    ax.plot(df["dt_utc"], df["roll_mean_30s"], label="roll mean 30s", alpha=0.8)
-    ax.plot(df["dt_utc"], df["ewma_30s"], label="EWMA 30s", alpha=0.8)
+    jobs = []
+    for index_csv in args.index:
+        jobs += window_jobs(index_csv)
+    if args.days:
+        start, _, end = args.days.partition(":")
+        for d in pd.date_range(start, end or start, freq="D"):
+            date = str(d.date())
+            jobs.append((render_day, (date, OUT_DIR / f"day_{date}.png")))
+    if args.center or not jobs:
+        center = int(export_shock_window_series.parse_dt_utc(args.center or CENTER).timestamp())
+        paths = {v.capitalize(): export_shock_window_series.out_path(v, center) for v in VENUES}
+        out = OUT_DIR / "figure1_shock_window.png" if not args.center else \
+            export_shock_window_series.out_path("all", center).with_suffix(".png")
+        jobs.append((render_window, (center, paths, out)))
 
-    ax.set_title(name)
-    ax.tick_params(axis='x', rotation=45)
+    c0 = time.perf_counter()
+    outs = run(jobs, args.workers)
+    for out in outs:
+        print("Saved", out)
+    print(f"Figures: {len(outs)}  elapsed {time.perf_counter() - c0:.1f}s")
 
-axes[0].set_ylabel("log premium")
-axes[0].legend()
 
-plt.tight_layout()
-Path("outputs/figures").mkdir(exist_ok=True, parents=True)
-plt.savefig("outputs/figures/figure1_shock_window.png", dpi=150)
-print("Saved outputs/figures/figure1_shock_window.png")
+if __name__ == "__main__":
+    main()
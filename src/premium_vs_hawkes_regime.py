@@ -1,43 +1,36 @@
-import pandas as pd
+import numpy as np
 from pathlib import Path
 
-PREM = Path("data/processed/premium_1s_BTCUSDT_2024-11-05.csv")
-LAM = Path("data/processed/hawkes_lambda_1s_2024-11-05.csv")
+import instrument
+import panel_1s
+import regime_stats
 
-prem = pd.read_csv(PREM)
-lam = pd.read_csv(LAM)
+DATE = "2024-11-05"
+rec = instrument.track("premium_vs_hawkes_regime", date=DATE)
 
-# Join on t_sec
-prem = prem.merge(lam[["t_sec","lambda"]], on="t_sec", how="left")
+# Premium rows with lambda alongside, from the aligned 1s panel
+panel = panel_1s.read(DATE)
+prem = panel_1s.long(panel, extra=["lambda"])
 prem = prem.dropna(subset=["lambda", "log_premium"])
 
-# Define regimes by lambda quantiles (pooled)
-q50 = prem["lambda"].quantile(0.50)
-q90 = prem["lambda"].quantile(0.90)
-q99 = prem["lambda"].quantile(0.99)
-
-def regime(x):
-    if x >= q99: return "lambda>=p99"
-    if x >= q90: return "p90<=lambda<p99"
-    if x >= q50: return "p50<=lambda<p90"
-    return "lambda<p50"
-
-prem["regime"] = prem["lambda"].apply(regime)
+# Define regimes by lambda quantiles (pooled), binned with searchsorted
+cuts = regime_stats.cut_points(prem["lambda"])
+q50, q90, q99 = cuts
+prem["regime"] = np.asarray(regime_stats.labels())[regime_stats.assign(prem["lambda"], cuts)]
 
 OUT = Path("data/processed/premium_with_hawkes_regime_2024-11-05.csv")
 prem.to_csv(OUT, index=False)
+rec.rows(len(prem))
 
 print("Wrote:", OUT)
 print("\nLambda quantiles:", {"p50": q50, "p90": q90, "p99": q99})
 
+stats = regime_stats.regime_stats(prem, ["lambda"], by=None).set_index("regime").sort_index()
+
 print("\nPremium stats by regime (log units):")
-print(
-    prem.groupby("regime")["log_premium"]
-        .describe()[["count","mean","std","min","max"]]
-        .sort_index()
-)
+print(stats[["count","mean","std","min","max"]])
 
 print("\nPremium tail amplification (|premium| max by regime):")
-tmp = prem.copy()
-tmp["abs_prem"] = tmp["log_premium"].abs()
-print(tmp.groupby("regime")["abs_prem"].max().sort_index())
+print(stats["abs_max"])
+
+rec.finish()
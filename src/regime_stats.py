@@ -0,0 +1,155 @@
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+import instrument
+import panel_1s
+
+# Vectorized regime statistics for any number of lambda models and cut-points.
+#
+# Regimes: each model's lambda is binned by its own pooled quantiles (e.g. p50/p90/p99
+# -> 4 regimes) with np.searchsorted, so "lambda >= p99" is the top bin.
+# Statistics: the value column is argsorted once; for each model the (venue, regime)
+# cells become contiguous value-ordered segments after an O(N) radix sort of the
+# cell codes, so count/mean/std/min/max/abs max/tail quantiles are bincounts and
+# segment lookups. The frame itself is never copied or regrouped per model.
+
+QUANTILES = (0.50, 0.90, 0.99)
+TAILS = (0.01, 0.99)
+
+
+def _pname(q):
+    return f"p{100 * q:g}"
+
+
+def labels(quantiles=QUANTILES, name="lambda"):
+    # ["lambda<p50", "p50<=lambda<p90", "p90<=lambda<p99", "lambda>=p99"]
+    p = [_pname(q) for q in quantiles]
+    out = [f"{name}<{p[0]}"]
+    out += [f"{a}<={name}<{b}" for a, b in zip(p[:-1], p[1:])]
+    out.append(f"{name}>={p[-1]}")
+    return out
+
+
+def cut_points(x, quantiles=QUANTILES):
+    # Pooled cut-points over the finite values (linear interpolation, as pandas)
+    x = np.asarray(x, dtype=float)
+    return np.quantile(x[np.isfinite(x)], quantiles)
+
+
+def assign(x, cuts):
+    # Regime code per value: number of cut-points <= x (NaN -> -1)
+    x = np.asarray(x, dtype=float)
+    code = np.searchsorted(cuts, x, side="right")
+    return np.where(np.isnan(x), -1, code)
+
+
+@instrument.timed("regime_stats")
+def regime_stats(df, models, value="log_premium", by="venue", quantiles=QUANTILES,
+                 tails=TAILS, regime_labels=None):
+    # One row per (model, by, regime): count, mean, std, min, max, abs_max, tail quantiles
+    # of `value`, plus the model's cut-points. by=None pools all rows under "all".
+    # Rows with NaN lambda or value are left out per model.
+    v = df[value].to_numpy(dtype=float)
+    if by is None:
+        groups, gcode = np.array(["all"]), np.zeros(len(df), dtype=np.int64)
+    else:
+        gcode, groups = pd.factorize(df[by], sort=True)
+    R = len(quantiles) + 1
+    G = len(groups)
+    regime_labels = regime_labels or labels(quantiles)
+
+    # Values are sorted once; per model, a stable sort of the small cell codes (radix
+    # sort on int16) keeps every (venue, regime) cell contiguous and value-ordered.
+    vmask = np.isfinite(v) & (gcode >= 0)
+    ov = np.argsort(np.where(vmask, v, np.inf), kind="stable")
+    xs = v[ov]
+    ncell = G * R
+    drop = ncell  # code for rows with NaN lambda/value
+
+    instrument.current().tag(models=list(models), by=by).rows(len(df)).rows(len(df) * len(models), "cells")
+    parts = []
+    for col in models:
+        lam = df[col].to_numpy(dtype=float)
+        ok = vmask & np.isfinite(lam)
+        cuts = cut_points(lam[ok], quantiles)
+        cell = np.full(len(df), drop, dtype=np.int16 if ncell < 2**15 else np.int64)
+        cell[ok] = gcode[ok] * R + assign(lam[ok], cuts)
+        k = cell[ov]
+        order = np.argsort(k, kind="stable")
+        k, x = k[order], xs[order]
+
+        count = np.bincount(k, minlength=ncell + 1)[:ncell]
+        n_ok = count.sum()
+        k, x = k[:n_ok], x[:n_ok]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.bincount(k, weights=x, minlength=ncell) / count
+            ss = np.bincount(k, weights=(x - mean[k]) ** 2, minlength=ncell)
+            std = np.sqrt(ss / (count - 1))
+        std[count < 2] = np.nan
+
+        idx = np.flatnonzero(count > 0)
+        first = (np.cumsum(count) - count)[idx]
+        last = first + count[idx] - 1
+
+        def seg_quantile(q):
+            # linear interpolation inside each value-sorted cell
+            pos = first + q * (count[idx] - 1)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.minimum(lo + 1, last)
+            return x[lo] + (pos - lo) * (x[hi] - x[lo])
+
+        g_i, r_i = np.divmod(idx, R)
+        part = pd.DataFrame({
+            "model": col,
+            "venue": groups[g_i],
+            "regime": np.asarray(regime_labels, dtype=object)[r_i],
+            "regime_code": r_i,
+            "count": count[idx],
+            "mean": mean[idx],
+            "std": std[idx],
+            "min": x[first],
+            "max": x[last],
+            "abs_max": np.maximum(np.abs(x[first]), np.abs(x[last])),
+        })
+        for q in tails:
+            part[f"{value}_{_pname(q)}"] = seg_quantile(q)
+        for j, q in enumerate(quantiles):
+            part[_pname(q)] = cuts[j]
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _long_with_lambdas(panel):
+    return panel_1s.long(panel, extra=[c for c in panel.columns if c.startswith("lambda")])
+
+
+def main():
+    # Many days x many models: pooled cut-points per model across the loaded days
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", required=True)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--models", default=None, help="panel lambda columns (default: all present)")
+    ap.add_argument("--quantiles", default=",".join(f"{q:g}" for q in QUANTILES))
+    ap.add_argument("--pooled", action="store_true", help="pool venues instead of per-venue stats")
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    dates = [str(d.date()) for d in pd.date_range(args.start, args.end or args.start, freq="D")]
+    df = pd.concat([_long_with_lambdas(panel_1s.read(d)) for d in dates], ignore_index=True)
+    models = [m for m in args.models.split(",") if m] if args.models else \
+        [c for c in df.columns if c.startswith("lambda")]
+    quantiles = [float(q) for q in args.quantiles.split(",") if q]
+
+    res = regime_stats(df, models, by=None if args.pooled else "venue", quantiles=quantiles)
+    out = Path(args.out) if args.out else Path(f"data/processed/regime_stats_{dates[0]}_{dates[-1]}.csv")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    res.to_csv(out, index=False)
+    print("Wrote:", out)
+    print(f"Days: {len(dates)}  Rows: {len(df)}  Models: {models}")
+    print(res.drop(columns=["regime_code"]).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
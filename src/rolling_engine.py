@@ -0,0 +1,244 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.signal import lfilter
+
+import instrument
+import panel_1s
+import regime_stats
+
+# Rolling estimators of the 1s premium, many kinds x many windows, one pass per venue.
+#
+# Spec strings: "[name=]kind:window[:min_periods]", windows in rows (= seconds of the
+# venue's own 1s series, as pandas .rolling(window)), min_periods defaulting to window.
+#   mean:300:30      rolling mean                       -> roll_mean_300s
+#   vwmean:30:5      volume-weighted mean sum(x*w)/sum(w) -> roll_vwap_30s
+#   median:30:5      rolling median                     -> roll_median_30s
+#   q0.9:300         rolling 90% quantile               -> roll_q90_300s
+#   ewm:30           EWMA, span 30, adjust=False         -> ewma_30
+#
+# Per venue, the centered prefix sums of x, w and x*w are built once and every mean /
+# weighted mean window is a difference of two of them. The EWMAs are one linear filter
+# each (scipy lfilter). Medians and quantiles run on pandas' rolling skiplist (Cython,
+# O(log window) per step) over the bare array. Nothing is copied per estimator, and
+# venues are independent, so they run in parallel.
+
+KINDS = ["mean", "vwmean", "median", "ewm"]
+WINDOWS = [30, 60, 300, 900, 3600]
+
+
+def parse(spec: str) -> dict:
+    name = None
+    if "=" in spec:
+        name, spec = spec.split("=", 1)
+    parts = spec.split(":")
+    kind, window = parts[0], int(parts[1])
+    min_periods = int(parts[2]) if len(parts) > 2 else window
+    q = None
+    if kind == "median":
+        q = 0.5
+    elif kind.startswith("q"):
+        q = float(kind[1:])
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"Quantile out of range in {spec!r}")
+    elif kind not in ("mean", "vwmean", "ewm"):
+        raise ValueError(f"Unknown estimator kind in {spec!r}")
+
+    if name is None:
+        if kind == "ewm":
+            name = f"ewma_{window}"
+        elif kind == "vwmean":
+            name = f"roll_vwap_{window}s"
+        elif q is not None and kind != "median":
+            name = f"roll_q{100 * q:g}_{window}s"
+        else:
+            name = f"roll_{kind}_{window}s"
+    return {"name": name, "kind": kind, "window": window, "min_periods": min_periods, "q": q}
+
+
+def grid(kinds=KINDS, windows=WINDOWS, min_frac: float = 1.0):
+    # Spec strings for every kind x window; min_periods = ceil(min_frac * window)
+    out = []
+    for kind in kinds:
+        for w in windows:
+            out.append(f"{kind}:{w}" if kind == "ewm" else f"{kind}:{w}:{max(1, int(np.ceil(min_frac * w)))}")
+    return out
+
+
+def _prefix(a):
+    # Prefix sums of a - mean(a) (centered, so long series keep their precision)
+    c = float(a.mean()) if len(a) else 0.0
+    p = np.empty(len(a) + 1)
+    p[0] = 0.0
+    np.cumsum(a - c, out=p[1:])
+    return p, c
+
+
+def _window_sum(prefix, w):
+    p, c = prefix
+    n = len(p) - 1
+    i = np.arange(1, n + 1)
+    lo = np.maximum(i - w, 0)
+    return p[i] - p[lo] + c * (i - lo)
+
+
+def compute(x, specs, weight=None):
+    # name -> estimator array aligned with x (x finite, in time order)
+    x = np.asarray(x, dtype=float)
+    if not np.isfinite(x).all():
+        raise ValueError("rolling_engine.compute needs finite values (drop NaN rows first)")
+    specs = [parse(s) if isinstance(s, str) else s for s in specs]
+    n = len(x)
+    filled = np.arange(1, n + 1)  # rows seen so far
+
+    cache = {}
+
+    def prefix(key):
+        if key not in cache:
+            if key == "x":
+                cache[key] = _prefix(x)
+            elif key == "w":
+                cache[key] = _prefix(np.asarray(weight, dtype=float))
+            else:
+                cache[key] = _prefix(x * np.asarray(weight, dtype=float))
+        return cache[key]
+
+    series = None
+    out = {}
+    for s in specs:
+        kind, w, mp = s["kind"], s["window"], s["min_periods"]
+        if kind == "ewm":
+            a = 2.0 / (w + 1.0)
+            y = lfilter([a], [1.0, a - 1.0], x, zi=[(1.0 - a) * x[0]])[0] if n else x.copy()
+        elif kind == "mean":
+            y = _window_sum(prefix("x"), w) / np.minimum(filled, w)
+        elif kind == "vwmean":
+            if weight is None:
+                raise ValueError(f"{s['name']} needs a weight column")
+            y = _window_sum(prefix("xw"), w) / _window_sum(prefix("w"), w)
+        else:
+            if series is None:
+                series = pd.Series(x, copy=False)
+            y = series.rolling(w, min_periods=mp).quantile(s["q"]).to_numpy(copy=True)
+        if kind != "ewm":
+            y[: max(mp, 1) - 1] = np.nan
+        out[s["name"]] = y
+    return out
+
+
+def _unit(key, x, weight, specs):
+    return key, compute(x, specs, weight)
+
+
+@instrument.timed("rolling_engine")
+def run(df, specs, value="log_premium", weight="price_venue", by="venue", workers=None):
+    # Estimator columns aligned with df.index; rows of each `by` group are taken in
+    # frame order (time order), groups computed in parallel
+    specs = [parse(s) if isinstance(s, str) else s for s in specs]
+    needs_w = any(s["kind"] == "vwmean" for s in specs)
+    codes, keys = pd.factorize(df[by], sort=True) if by else (np.zeros(len(df), dtype=np.int64), ["all"])
+    x = df[value].to_numpy(dtype=float)
+    wt = df[weight].to_numpy(dtype=float) if needs_w else None
+    rows = [np.flatnonzero(codes == k) for k in range(len(keys))]
+    instrument.current().tag(estimators=len(specs), groups=len(keys)).rows(len(df)).rows(len(df) * len(specs), "values")
+
+    args = [(k, x[r], None if wt is None else wt[r], specs) for k, r in enumerate(rows)]
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(args) == 1:
+        done = [_unit(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+            done = list(pool.map(_unit, *zip(*args)))
+
+    out = {s["name"]: np.full(len(df), np.nan) for s in specs}
+    for k, sig in done:
+        for name, y in sig.items():
+            out[name][rows[k]] = y
+    return pd.DataFrame(out, index=df.index)
+
+
+def summarize(signals, df, regime="regime", by="venue"):
+    # std/min/max (+count) of every signal column per (by, regime), NaNs left out;
+    # rows are ordered once by (by, regime) and each column is a reduceat over segments
+    gcode, groups = pd.factorize(df[by], sort=True)
+    rcode, regimes = pd.factorize(df[regime], sort=True)
+    order = np.lexsort((rcode, gcode))
+    cell = (gcode * len(regimes) + rcode)[order]
+    starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+    seg = cell[starts]
+    g_i, r_i = np.divmod(seg, len(regimes))
+    seg_of = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(cell)]))
+
+    parts = []
+    for name in signals.columns:
+        y = signals[name].to_numpy(dtype=float)[order]
+        ok = np.isfinite(y)
+        y0 = np.where(ok, y, 0.0)
+        count = np.add.reduceat(ok.astype(np.int64), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.add.reduceat(y0, starts) / count
+            dev = np.where(ok, y - mean[seg_of], 0.0)
+            std = np.sqrt(np.add.reduceat(dev * dev, starts) / (count - 1))
+        std[count < 2] = np.nan
+        keep = count > 0
+        parts.append(pd.DataFrame({
+            "regime": np.asarray(regimes, dtype=object)[r_i][keep],
+            "count": count[keep],
+            "std": std[keep],
+            "min": np.fmin.reduceat(y, starts)[keep],
+            "max": np.fmax.reduceat(y, starts)[keep],
+            by: np.asarray(groups, dtype=object)[g_i][keep],
+            "method": name,
+        }))
+    # stable sort on `by` keeps method and regime order within each group
+    res = pd.concat(parts, ignore_index=True)
+    return res.sort_values(by, kind="stable").reset_index(drop=True)
+
+
+def main():
+    # Window sweep over a date range: every kind x window, regimes by pooled lambda quantiles
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", required=True)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--kinds", default=",".join(KINDS), help="mean,vwmean,median,ewm,q<q> (e.g. q0.9)")
+    ap.add_argument("--windows", default=",".join(str(w) for w in WINDOWS), help="seconds")
+    ap.add_argument("--min-frac", type=float, default=1.0, help="min_periods as a fraction of the window")
+    ap.add_argument("--specs", default=None, help="explicit spec strings instead of --kinds x --windows")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args()
+
+    dates = [str(d.date()) for d in pd.date_range(args.start, args.end or args.start, freq="D")]
+    if args.specs:
+        specs = [s for s in args.specs.split(",") if s]
+    else:
+        kinds = [k for k in args.kinds.split(",") if k]
+        windows = [int(w) for w in args.windows.split(",") if w]
+        specs = grid(kinds, windows, args.min_frac)
+
+    c0 = time.perf_counter()
+    df = pd.concat([panel_1s.long(panel_1s.read(d), extra=["lambda"]) for d in dates], ignore_index=True)
+    df = df.dropna(subset=["lambda", "log_premium"])
+    df = df.sort_values(["venue", "t_sec"], kind="stable").reset_index(drop=True)
+    cuts = regime_stats.cut_points(df["lambda"])
+    df["regime"] = np.asarray(regime_stats.labels())[regime_stats.assign(df["lambda"], cuts)]
+
+    signals = run(df, specs, workers=args.workers)
+    signals.insert(0, "raw", df["log_premium"].to_numpy())
+    res = summarize(signals, df)
+
+    out = Path(args.out) if args.out else Path(f"data/processed/rolling_sweep_{dates[0]}_{dates[-1]}.csv")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    res.to_csv(out, index=False)
+    print("Wrote:", out)
+    print(f"Days: {len(dates)}  Rows: {len(df)}  Estimators: {len(specs)}  elapsed {time.perf_counter() - c0:.1f}s")
+    print(res.head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
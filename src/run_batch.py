@@ -0,0 +1,164 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import build_premium_1s
+import extract_gate_day
+import fit_hawkes_1d
+import hawkes_intensity_1s
+import instrument
+import large_trade_events
+import normalize_binance_day
+import normalize_bybit_day
+import panel_1s
+import size_sketch
+import trade_store
+
+# Date-range batch runner.
+#
+# Phase 1 (independent units, process pool):
+#   (binance, day), (bybit, day) -> normalize into the trade store
+#   (gate, month)                -> one-pass split of the monthly archive
+# Phase 2 (gather, one unit per day, process pool across days):
+#   large trades -> premium -> Hawkes fit -> lambda 1s grid -> aligned 1s panel,
+#   plus the per-(venue, side) trade-size sketches
+#
+# Days missing a store partition for any requested venue are skipped (and listed)
+# before phase 2 rather than failing deep inside the premium build.
+#
+# e.g. python src/run_batch.py --start 2024-11-01 --end 2024-11-30 --workers 16
+
+VENUES = ["binance", "bybit", "gate"]
+STAGES = ["normalize", "large", "premium", "fit", "intensity", "panel", "sketch"]
+
+
+def normalize_unit(venue: str, key: str, stream: bool):
+    # key is a date for binance/bybit and a month (YYYY-MM) for gate
+    if venue == "binance":
+        zip_path = normalize_binance_day.zip_path_for(key)
+        if stream:
+            out = normalize_binance_day.normalize_stream(zip_path, key)[0]
+        else:
+            out = normalize_binance_day.normalize(zip_path, key)[0]
+        return [out]
+    if venue == "bybit":
+        return [normalize_bybit_day.normalize(normalize_bybit_day.raw_path(key), key)[0]]
+    if venue == "gate":
+        raw = extract_gate_day.raw_path(key + "-01")
+        idx, days, _ = extract_gate_day.split_month(raw)
+        return [idx]
+    raise ValueError(f"Unknown venue: {venue}")
+
+
+def day_unit(date: str, venues, stages, threshold: float):
+    outs = []
+    if "large" in stages:
+        outs.append(large_trade_events.extract(date, venues=venues, threshold=threshold)[0])
+    if "premium" in stages:
+        outs.append(build_premium_1s.build(date, venues=venues)[0])
+    if "fit" in stages:
+        outs.append(fit_hawkes_1d.fit(fit_hawkes_1d.events_path(date), fit_hawkes_1d.params_path(date))[0])
+    if "intensity" in stages:
+        outs.append(hawkes_intensity_1s.intensity(
+            hawkes_intensity_1s.events_path(date),
+            hawkes_intensity_1s.params_path(date),
+            hawkes_intensity_1s.out_path(date),
+        )[0])
+    if "panel" in stages:
+        outs.append(panel_1s.build(date)[0])
+    if "sketch" in stages:
+        for v in venues:
+            size_sketch.build_day(v, date)
+            outs.append(size_sketch.sketch_path(v, date))
+    return outs
+
+
+def missing_venues(date: str, venues):
+    return [v for v in venues if not (trade_store.partition_path(v, date) / "part-0.parquet").exists()]
+
+
+def run_pool(pool, units):
+    # units: {label: (fn, args)} -> {label: outputs or exception}
+    futures = {pool.submit(fn, *args): label for label, (fn, args) in units.items()}
+    results = {}
+    for fut in as_completed(futures):
+        label = futures[fut]
+        try:
+            results[label] = fut.result()
+            print("done:", label)
+        except BaseException as e:
+            results[label] = e
+            print("FAILED:", label, "-", e)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", required=True)  # e.g. 2024-11-01
+    ap.add_argument("--end", required=True)    # inclusive
+    ap.add_argument("--venues", default=",".join(VENUES))
+    ap.add_argument("--stages", default=",".join(STAGES))
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--threshold", type=float, default=large_trade_events.THRESHOLD)
+    ap.add_argument("--stream", action="store_true", help="streaming Binance normalizer")
+    ap.add_argument("--profile", action="store_true", help="per-stage instrumentation report for the run")
+    args = ap.parse_args()
+
+    dates = [str(d.date()) for d in pd.date_range(args.start, args.end, freq="D")]
+    venues = [v for v in args.venues.split(",") if v]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = (set(venues) - set(VENUES)) | (set(stages) - set(STAGES))
+    if unknown:
+        raise SystemExit(f"Unknown venues/stages: {sorted(unknown)}")
+
+    profile = None
+    if args.profile:
+        profile = instrument.run_path(f"batch_{args.start}_{args.end}")
+        os.environ[instrument.ENV] = str(profile)  # set before the pool forks its workers
+
+    t_start = time.time()
+    failed = []
+    skipped = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        if "normalize" in stages:
+            units = {}
+            for v in venues:
+                if v == "gate":
+                    for month in sorted({d[:7] for d in dates}):
+                        units[("gate", month)] = (normalize_unit, (v, month, args.stream))
+                else:
+                    for d in dates:
+                        units[(v, d)] = (normalize_unit, (v, d, args.stream))
+            res = run_pool(pool, units)
+            failed += [k for k, r in res.items() if isinstance(r, BaseException)]
+
+        day_stages = [s for s in stages if s != "normalize"]
+        if day_stages:
+            for d in dates:
+                miss = missing_venues(d, venues)
+                if miss:
+                    skipped.append(d)
+                    print("SKIPPED:", ("day", d), "- no trade store partition for", miss)
+            units = {("day", d): (day_unit, (d, venues, day_stages, args.threshold))
+                     for d in dates if d not in skipped}
+            res = run_pool(pool, units)
+            failed += [k for k, r in res.items() if isinstance(r, BaseException)]
+
+    print(f"\nDays: {len(dates)}  Venues: {venues}  Workers: {args.workers}")
+    print(f"Elapsed: {time.time() - t_start:.1f}s")
+    if profile is not None:
+        out, _ = instrument.report(profile, runner="run_batch", start=args.start, end=args.end, venues=venues,
+                                   stages=stages, workers=args.workers, wall_s=round(time.time() - t_start, 3))
+        print("Profile:", out)
+    if skipped:
+        print("Skipped days (missing partitions):", skipped)
+    if failed:
+        print("Failed units:", sorted(failed))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
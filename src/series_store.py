@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Binary, memory-mappable 1D series shared between stages.
+#
+# File layout: 8-byte magic, then a JSON header padded to HEADER bytes, then the
+# raw little-endian array. Reading is a header parse plus np.memmap, so a day of
+# event timestamps or a 1s lambda grid loads in milliseconds with no copy.
+#
+# kinds:
+# - "events": sorted int64 ts_ms (t0 = first ts_ms)
+# - "lambda": float64 lambda on a regular grid, value i at t0 + i*dt seconds
+#   (t0 absolute UTC seconds), with the source params in the header
+#
+# Files sit next to the CSV they mirror: large_trades_*.csv -> large_trades_*.ts_ms.bin,
+# hawkes_lambda_1s_*.bin for lambda grids.
+
+MAGIC = b"HWKSER01"
+HEADER = 4096
+
+
+def write(path, arr, **meta):
+    arr = np.ascontiguousarray(arr)
+    head = dict(meta, dtype=arr.dtype.newbyteorder("<").str, length=int(len(arr)))
+    blob = json.dumps(head).encode()
+    if len(blob) > HEADER - len(MAGIC):
+        raise ValueError(f"Header too large for {path}: {len(blob)} bytes")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique temp file in the same directory: concurrent writers of one mirror (e.g. the
+    # fit and fit_strict stages) each replace the target atomically with a whole file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + blob.ljust(HEADER - len(MAGIC)))
+            f.write(arr.astype(head["dtype"], copy=False).tobytes())
+        tmp.replace(path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        head = f.read(HEADER)
+    if head[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Not a series file: {path}")
+    return json.loads(head[len(MAGIC):].decode().strip())
+
+
+def read(path):
+    # (read-only memmap, header dict)
+    meta = read_header(path)
+    n = meta["length"]
+    if n == 0:
+        return np.empty(0, dtype=meta["dtype"]), meta
+    arr = np.memmap(path, dtype=meta["dtype"], mode="r", offset=HEADER, shape=(n,))
+    return arr, meta
+
+
+# ---- event timestamps ----
+
+def events_bin(events_csv) -> Path:
+    return Path(events_csv).with_suffix(".ts_ms.bin")
+
+
+def write_events(events_csv, ts_ms):
+    ts_ms = np.sort(np.asarray(ts_ms, dtype=np.int64))
+    t0 = int(ts_ms[0]) if len(ts_ms) else None
+    return write(events_bin(events_csv), ts_ms, kind="events", unit="ms", t0=t0, source=Path(events_csv).name)
+
+
+def event_times_ms(events_csv):
+    # Sorted int64 ts_ms of an events CSV via its binary mirror; the CSV is parsed
+    # (and the mirror written) only when the mirror is missing or older than the CSV.
+    events_csv = Path(events_csv)
+    b = events_bin(events_csv)
+    if not b.exists() or (events_csv.exists() and events_csv.stat().st_mtime > b.stat().st_mtime):
+        ev = pd.read_csv(events_csv, usecols=["ts_ms"]).dropna()
+        write_events(events_csv, ev["ts_ms"].astype(np.int64).values)
+    return read(b)[0]
+
+
+# ---- lambda grids ----
+
+def write_lambda(path, lam, t0: float, dt: float = 1.0, **meta):
+    return write(path, np.asarray(lam, dtype=np.float64), kind="lambda", t0=float(t0), dt=float(dt), **meta)
+
+
+def grid_seconds(meta):
+    # Absolute grid times (float seconds) and their whole-second buckets (t_sec)
+    t = meta["t0"] + meta["dt"] * np.arange(meta["length"])
+    return t, np.floor(t).astype(np.int64)
+
+
+def lambda_frame(path, name: str = "lambda"):
+    # (t_sec, <name>) frame over the memmapped values, for joins on t_sec
+    lam, meta = read(path)
+    _, t_sec = grid_seconds(meta)
+    return pd.DataFrame({"t_sec": t_sec, name: lam}, copy=False)
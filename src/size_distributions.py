@@ -1,56 +1,66 @@
+import argparse
 import pandas as pd
-from pathlib import Path
 
-FILES = [
-    Path("data/processed/binance_BTCUSDT_2024-11-05.csv"),
-    Path("data/processed/bybit_BTCUSDT_2024-11-05.csv"),
-    Path("data/processed/gate_BTCUSDT_2024-11-05.csv"),
-]
+import size_sketch
+import trade_store
 
-dfs = []
-for f in FILES:
-    df = pd.read_csv(f)
-    dfs.append(df)
+DATE = "2024-11-05"
+VENUES = ["binance", "bybit", "gate"]
 
-data = pd.concat(dfs, ignore_index=True)
-
-# Ensure numeric
-data["qty_base"] = pd.to_numeric(data["qty_base"], errors="coerce")
-
-print("\n==============================")
-print("ROWS PER VENUE")
-print("==============================")
-print(data.groupby("venue").size())
+# Size distributions from the persisted per-(venue, side, day) sketches: the tape is
+# scanned (in chunks) only for days without an up-to-date sketch, and per-venue,
+# pooled and multi-day figures are merges. Quantiles are within size_sketch.ALPHA
+# relative error; counts, extremes and the top trades are exact.
 
 # Quantiles to inspect tail behavior
 qs = [0.5, 0.9, 0.99, 0.999]
 
-print("\n==============================")
-print("SIZE QUANTILES PER VENUE (BTC)")
-print("==============================")
-for venue, g in data.groupby("venue"):
-    print(f"\nVenue: {venue}")
-    print(g["qty_base"].quantile(qs))
-
-print("\n==============================")
-print("POOLED SIZE QUANTILES (BTC)")
-print("==============================")
-print(data["qty_base"].quantile(qs))
-
-print("\n==============================")
-print("BUY vs SELL MEDIAN SIZE (BTC)")
-print("==============================")
-print(
-    data.groupby(["venue", "side"])["qty_base"]
-    .median()
-    .unstack()
-)
-
-# Top trades snapshot
-print("\n==============================")
-print("TOP 10 LARGEST TRADES (ALL VENUES)")
-print("==============================")
-print(
-    data.sort_values("qty_base", ascending=False)
-        .head(10)[["dt_utc", "venue", "price", "qty_base", "side"]]
-)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--end", default=None, help="last day of a multi-day range starting at --date")
+    ap.add_argument("--venues", default=",".join(VENUES))
+    ap.add_argument("--rebuild", action="store_true", help="rescan the tape even if sketches are current")
+    args = ap.parse_args()
+
+    dates = [str(d.date()) for d in pd.date_range(args.date, args.end or args.date, freq="D")]
+    venues = [v for v in args.venues.split(",") if v]
+    sketches = size_sketch.collect(venues, dates, args.rebuild)
+    present = sorted({v for v, _ in sketches})
+    sides = size_sketch.SIDES + sorted({s for _, s in sketches} - set(size_sketch.SIDES))
+
+    print("\n==============================")
+    print("ROWS PER VENUE")
+    print("==============================")
+    print(pd.Series({v: size_sketch.merged(sketches, venue=v).count for v in present}, name="count"))
+
+    print("\n==============================")
+    print("SIZE QUANTILES PER VENUE (BTC)")
+    print("==============================")
+    for v in present:
+        print(f"\nVenue: {v}")
+        print(pd.Series(size_sketch.merged(sketches, venue=v).quantile(qs), index=qs, name="qty_base"))
+
+    print("\n==============================")
+    print("POOLED SIZE QUANTILES (BTC)")
+    print("==============================")
+    print(pd.Series(size_sketch.merged(sketches).quantile(qs), index=qs, name="qty_base"))
+
+    print("\n==============================")
+    print("BUY vs SELL MEDIAN SIZE (BTC)")
+    print("==============================")
+    print(pd.DataFrame(
+        {s: {v: sketches[(v, s)].median() for v in present if (v, s) in sketches} for s in sides}
+    ).rename_axis("venue").rename_axis("side", axis=1))
+
+    # Top trades snapshot
+    print("\n==============================")
+    print("TOP 10 LARGEST TRADES (ALL VENUES)")
+    print("==============================")
+    top = trade_store.with_dt_utc(size_sketch.top_trades(sketches, 10))
+    print(top[["dt_utc", "venue", "price", "qty_base", "side"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import json
+import math
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+import trade_store
+
+# Mergeable trade-size sketches, one per (venue, side, day), persisted next to the store.
+#
+# Quantiles: log-bucketed relative-error sketch (DDSketch-style, same mergeable family
+# as t-digest/KLL). A size x > 0 lands in bucket ceil(log_gamma(x)) with
+# gamma = (1 + ALPHA) / (1 - ALPHA), so any quantile is returned within ALPHA relative
+# error, a chunk update is one np.bincount and merging is adding bucket counts, in
+# any order. Trade sizes span ~8 decades, so a day is a couple of thousand integers.
+# Top trades: the K largest (qty, ts_ms, price) per sketch, kept by argpartition per
+# chunk and on merge, so the top-K of any union of sketches is exact.
+#
+# data/processed/size_sketches/<venue>_<date>.json holds one sketch per side value of
+# one store partition (Buy, Sell and any other value, e.g. Gate's "Unknown", so every
+# row is counted); they are rebuilt only when the partition file is newer.
+
+SKETCH_DIR = Path("data/processed/size_sketches")
+ALPHA = 0.005
+TOP_K = 100
+SIDES = ["Buy", "Sell"]
+OTHER = "Unknown"  # missing side values
+VERSION = 2  # sketch files written with Buy/Sell only (no version) are rebuilt
+BATCH = 1_000_000
+
+
+class SizeSketch:
+    def __init__(self, alpha: float = ALPHA, k: int = TOP_K):
+        self.alpha = alpha
+        self.k = k
+        self.log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.offset = 0  # bucket index of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero = 0  # sizes <= 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.top = np.zeros(0, dtype=[("qty", "f8"), ("ts_ms", "i8"), ("price", "f8")])
+
+    def _grow(self, lo: int, hi: int):
+        # Make room for bucket indices lo..hi
+        if not len(self.counts):
+            self.offset, self.counts = lo, np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        new_lo = min(lo, self.offset)
+        new_hi = max(hi, self.offset + len(self.counts) - 1)
+        if new_lo == self.offset and new_hi == self.offset + len(self.counts) - 1:
+            return
+        c = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+        c[self.offset - new_lo: self.offset - new_lo + len(self.counts)] = self.counts
+        self.offset, self.counts = new_lo, c
+
+    def _keep_top(self, top):
+        if len(top) > self.k:
+            top = top[np.argpartition(-top["qty"], self.k - 1)[: self.k]]
+        self.top = np.sort(top, order="qty")[::-1]
+
+    def add(self, qty, ts_ms=None, price=None):
+        # One chunk of trades (NaN sizes ignored)
+        qty = np.asarray(qty, dtype=float)
+        ok = np.isfinite(qty)
+        qty = qty[ok]
+        if not len(qty):
+            return self
+        pos = qty > 0
+        self.zero += int((~pos).sum())
+        self.count += len(qty)
+        self.total += float(qty.sum())
+        self.min = min(self.min, float(qty.min()))
+        self.max = max(self.max, float(qty.max()))
+
+        idx = np.ceil(np.log(qty[pos]) / self.log_gamma).astype(np.int64)
+        if len(idx):
+            lo, hi = int(idx.min()), int(idx.max())
+            self._grow(lo, hi)
+            self.counts[lo - self.offset: hi - self.offset + 1] += np.bincount(idx - lo, minlength=hi - lo + 1)
+
+        n = len(qty)
+        cand = np.argpartition(-qty, self.k - 1)[: self.k] if n > self.k else np.arange(n)
+        chunk = np.zeros(len(cand), dtype=self.top.dtype)
+        chunk["qty"] = qty[cand]
+        chunk["ts_ms"] = np.asarray(ts_ms)[ok][cand] if ts_ms is not None else -1
+        chunk["price"] = np.asarray(price, dtype=float)[ok][cand] if price is not None else np.nan
+        self._keep_top(np.concatenate([self.top, chunk]))
+        return self
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f"Cannot merge sketches with alpha {self.alpha} and {other.alpha}")
+        if len(other.counts):
+            self._grow(other.offset, other.offset + len(other.counts) - 1)
+            i = other.offset - self.offset
+            self.counts[i: i + len(other.counts)] += other.counts
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.k = max(self.k, other.k)
+        self._keep_top(np.concatenate([self.top, other.top]))
+        return self
+
+    def quantile(self, qs):
+        # Lower quantiles (rank floor(q * (count - 1))), within alpha relative error;
+        # the extremes are exact
+        qs = np.atleast_1d(np.asarray(qs, dtype=float))
+        if not self.count:
+            return np.full(len(qs), np.nan)
+        rank = np.floor(qs * (self.count - 1)).astype(np.int64)
+        cum = self.zero + np.cumsum(self.counts)
+        b = np.searchsorted(cum, rank, side="right")
+        gamma = math.exp(self.log_gamma)
+        val = 2.0 * gamma ** (self.offset + np.minimum(b, len(self.counts) - 1)) / (gamma + 1.0)
+        val = np.where(rank < self.zero, min(self.min, 0.0), val)
+        val = np.clip(val, self.min, self.max)
+        val[rank == self.count - 1] = self.max
+        val[rank == 0] = self.min
+        return val
+
+    def median(self) -> float:
+        return float(self.quantile(0.5)[0])
+
+    def to_dict(self):
+        return {
+            "alpha": self.alpha, "k": self.k, "offset": self.offset, "counts": self.counts.tolist(),
+            "zero": self.zero, "count": self.count, "total": self.total,
+            "min": self.min if self.count else None, "max": self.max if self.count else None,
+            "top": {f: self.top[f].tolist() for f in self.top.dtype.names},
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls(d["alpha"], d["k"])
+        s.offset, s.counts = d["offset"], np.asarray(d["counts"], dtype=np.int64)
+        s.zero, s.count, s.total = d["zero"], d["count"], d["total"]
+        s.min = d["min"] if d["min"] is not None else math.inf
+        s.max = d["max"] if d["max"] is not None else -math.inf
+        s.top = np.zeros(len(d["top"]["qty"]), dtype=s.top.dtype)
+        for f in s.top.dtype.names:
+            s.top[f] = d["top"][f]
+        return s
+
+
+def sketch_path(venue: str, date: str) -> Path:
+    return SKETCH_DIR / f"{venue}_{date}.json"
+
+
+def build_day(venue: str, date: str, batch_size: int = BATCH):
+    # {side: SizeSketch} for one store partition, streamed in bounded chunks
+    sk = {side: SizeSketch() for side in SIDES}
+    for chunk in trade_store.iter_batches(venues=[venue], dates=[date], batch_size=batch_size,
+                                          columns=["ts_ms", "price", "qty_base", "side"]):
+        side = chunk["side"].fillna(OTHER).astype(str).to_numpy()
+        for s in pd.unique(side):
+            m = side == s
+            sk.setdefault(s, SizeSketch()).add(chunk["qty_base"].to_numpy()[m], chunk["ts_ms"].to_numpy()[m],
+                                               chunk["price"].to_numpy()[m])
+    out = sketch_path(venue, date)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(json.dumps({"version": VERSION, "venue": venue, "date": date, "sides": {s: v.to_dict() for s, v in sk.items()}}))
+    tmp.replace(out)
+    return sk
+
+
+def load_day(venue: str, date: str, rebuild: bool = False):
+    # Persisted sketches of one partition; built (or rebuilt) when missing or stale
+    path = sketch_path(venue, date)
+    part = trade_store.partition_path(venue, date) / "part-0.parquet"
+    stale = not path.exists() or (part.exists() and part.stat().st_mtime > path.stat().st_mtime)
+    d = None if rebuild or stale else json.loads(path.read_text())
+    if d is None or d.get("version") != VERSION:
+        if not part.exists():
+            return None
+        return build_day(venue, date)
+    return {s: SizeSketch.from_dict(v) for s, v in d["sides"].items()}
+
+
+def collect(venues, dates, rebuild: bool = False):
+    # {(venue, side): SizeSketch} merged over the dates (missing partitions skipped)
+    out = {}
+    for venue in venues:
+        for date in dates:
+            day = load_day(venue, date, rebuild)
+            if day is None:
+                continue
+            for side, sk in day.items():
+                out.setdefault((venue, side), SizeSketch()).merge(sk)
+    return out
+
+
+def merged(sketches, venue=None, side=None):
+    # One sketch over the (venue, side) cells matching the filters (None = all)
+    out = SizeSketch()
+    for (v, s), sk in sketches.items():
+        if (venue is None or v == venue) and (side is None or s == side):
+            out.merge(sk)
+    return out
+
+
+def top_trades(sketches, n: int = 10):
+    # n largest trades across the sketches, with venue/side, largest first
+    rows = []
+    for (v, s), sk in sketches.items():
+        t = pd.DataFrame(sk.top)
+        t["venue"], t["side"] = v, s
+        rows.append(t)
+    df = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=["qty", "ts_ms", "price", "venue", "side"])
+    df = df.sort_values("qty", ascending=False, kind="stable").head(n).reset_index(drop=True)
+    return df.rename(columns={"qty": "qty_base"})
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", required=True)
+    ap.add_argument("--end", default=None)
+    ap.add_argument("--venues", default="binance,bybit,gate")
+    ap.add_argument("--rebuild", action="store_true")
+    args = ap.parse_args()
+
+    dates = [str(d.date()) for d in pd.date_range(args.start, args.end or args.start, freq="D")]
+    venues = [v for v in args.venues.split(",") if v]
+    sketches = collect(venues, dates, args.rebuild)
+    print(f"Sketches: {len(sketches)} (venue, side) cells over {len(dates)} days in {SKETCH_DIR}")
+    for (v, s), sk in sorted(sketches.items()):
+        print(f"{v:8s} {s:4s} trades={sk.count:>10d}  buckets={len(sk.counts)}")
+
+
+if __name__ == "__main__":
+    main()
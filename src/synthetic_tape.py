@@ -0,0 +1,99 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+import trade_store
+from hawkes_sim import simulate, mu_for_count
+
+# Synthetic multi-venue BTCUSDT tape in the normalized schema, written to the
+# trade store, for benchmarks and tests without exchange data.
+#
+# - one shared mid-price path (Brownian, 1s grid, linearly interpolated)
+# - per venue: Poisson background of small lognormal trades plus "large" trades
+#   whose times come from a Hawkes process, so the large-trade pipeline has
+#   clustered events to fit
+# - generated and written hour by hour, so memory is bounded for big tapes
+
+DATE = "2024-11-05"
+VENUES = ["binance", "bybit", "gate"]
+SHARES = {"binance": 0.6, "bybit": 0.3, "gate": 0.1}
+
+# (median size, lognormal sigma) of small trades, roughly the README's numbers
+SIZE = {"binance": (0.007, 2.0), "bybit": (0.013, 2.0), "gate": (0.0008, 2.2)}
+PRICE0 = 70000.0
+VOL_1S = 2.0e-5  # per-second log-price volatility
+
+LARGE_SHARE = 0.002  # fraction of trades that are >= 1 BTC
+LARGE_HAWKES = (0.5, 2.0)  # (alpha, beta) for large-trade clustering
+CHUNK_SECONDS = 3600
+
+
+def mid_path(rng, seconds=86400):
+    steps = rng.normal(0.0, VOL_1S, seconds + 1)
+    steps[0] = 0.0
+    return PRICE0 * np.exp(np.cumsum(steps))
+
+
+def generate_day(date=DATE, venues=VENUES, trades=1_000_000, seed=0, root=trade_store.STORE):
+    rng = np.random.default_rng(seed)
+    day0_ms = int(pd.Timestamp(date, tz="UTC").timestamp() * 1000)
+    mid = mid_path(rng)
+    alpha, beta = LARGE_HAWKES
+    shares = np.array([SHARES.get(v, 1.0) for v in venues], dtype=float)
+    shares /= shares.sum()
+
+    counts = {}
+    for venue, share in zip(venues, shares):
+        n_total = int(trades * share)
+        n_large = int(n_total * LARGE_SHARE)
+        large_t = simulate(mu_for_count(n_large, alpha, beta, 86400.0), alpha, beta, 86400.0, rng) if n_large else np.empty(0)
+        offset = rng.normal(0.0, 5e-5)  # persistent venue basis
+        med, sig = SIZE.get(venue, (0.005, 2.0))
+        trade_id = 0
+
+        with trade_store.writer(venue, date, root) as w:
+            for c0 in range(0, 86400, CHUNK_SECONDS):
+                c1 = c0 + CHUNK_SECONDS
+                n_small = rng.poisson((n_total - len(large_t)) * CHUNK_SECONDS / 86400.0)
+                lt = large_t[(large_t >= c0) & (large_t < c1)]
+                t = np.concatenate([rng.uniform(c0, c1, n_small), lt])
+                is_large = np.concatenate([np.zeros(n_small, bool), np.ones(len(lt), bool)])
+                order = np.argsort(t, kind="stable")
+                t, is_large = t[order], is_large[order]
+                n = len(t)
+
+                ts_ms = day0_ms + np.floor(t * 1000.0).astype(np.int64)
+                price = np.interp(t, np.arange(len(mid)), mid) * np.exp(offset + rng.normal(0.0, 2e-5, n))
+                qty = med * np.exp(sig * rng.standard_normal(n))
+                qty[is_large] = 1.0 + rng.pareto(2.5, is_large.sum())
+                qty = np.maximum(np.round(qty, 4), 0.0001)
+
+                chunk = pd.DataFrame({
+                    "ts_ms": ts_ms,
+                    "symbol": "BTCUSDT",
+                    "trade_id": np.arange(trade_id, trade_id + n).astype(str),
+                    "price": np.round(price, 1),
+                    "qty_base": qty,
+                    "side": np.where(rng.random(n) < 0.5, "Buy", "Sell"),
+                })
+                trade_id += n
+                w.write_table(trade_store.to_table(chunk))
+        counts[venue] = trade_id
+    return counts
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--venues", default=",".join(VENUES))
+    ap.add_argument("--trades", type=float, default=1e6, help="total trades across venues")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    counts = generate_day(args.date, [v for v in args.venues.split(",") if v], int(args.trades), args.seed)
+    for venue, n in counts.items():
+        print(venue, "rows:", n, "->", trade_store.partition_path(venue, args.date))
+
+
+if __name__ == "__main__":
+    main()
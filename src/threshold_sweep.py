@@ -0,0 +1,160 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.optimize import minimize
+
+import fit_hawkes_1d
+import hawkes_em
+from hawkes_search import nll_mnb, bounds, EPS
+import large_trade_events
+import series_store
+import trade_store
+
+# Large-trade threshold sensitivity in one pass.
+#
+# The day's tapes are read from the store once. Thresholds are either absolute
+# (BTC, same for every venue) or per-venue size quantiles (e.g. q0.999 = each
+# venue's own 99.9th percentile trade size). Trades below the smallest cut-off are
+# dropped right after the scan and the rest are sorted by time once, so every
+# event set is a mask over the same small frame.
+# Each event set is written like large_trade_events.py output, then all sets are
+# fit in parallel into one comparison table: EM (scales to low thresholds), then a
+# short L-BFGS-B polish from the EM point, which settles the weakly excited sets
+# where EM crawls towards n -> 0.
+
+DATE = "2024-11-05"
+THRESHOLDS = [0.5, 1.0, 2.0, 5.0]
+QUANTILES = [0.99, 0.999]
+MIN_EVENTS = 100
+EM_ITER = 100
+MAX_BRANCHING = 0.999
+
+
+def events_path(date: str, label: str) -> Path:
+    return Path(f"data/processed/large_trades_BTCUSDT_{date}_thr-{label}.csv")
+
+
+def params_path(date: str, label: str) -> Path:
+    return Path(f"data/processed/hawkes_fit_params_{date}_thr-{label}.txt")
+
+
+def out_path(date: str) -> Path:
+    return Path(f"data/processed/hawkes_threshold_sweep_{date}.csv")
+
+
+def cutoffs(tape, venues, thresholds, quantiles):
+    # {label: {venue: min qty_base}}
+    out = {}
+    for x in thresholds:
+        out[f"{x:g}btc"] = {v: float(x) for v in venues}
+    if quantiles:
+        q = tape.groupby("venue", observed=True)["qty_base"].quantile(quantiles)
+        for p in quantiles:
+            out[f"q{p:g}"] = {v: float(q.loc[(v, p)]) for v in venues if (v, p) in q.index}
+    return out
+
+
+def event_sets(date, venues=large_trade_events.VENUES, thresholds=THRESHOLDS, quantiles=QUANTILES):
+    # One scan -> {label: (per-venue cut-offs, large-trade frame)}
+    tape = trade_store.read_trades(
+        venues=venues, dates=[date], columns=["ts_ms", "venue", "price", "qty_base", "side"]
+    )
+    tape = tape.dropna(subset=["ts_ms", "qty_base"])
+    cuts = cutoffs(tape, venues, thresholds, quantiles)
+
+    # Keep only trades above the smallest cut-off of their venue, then sort once
+    venue = tape["venue"].astype(str).to_numpy()
+    qty = tape["qty_base"].to_numpy()
+    floor = pd.DataFrame(cuts).min(axis=1)
+    tape = tape[qty >= floor.reindex(venue).fillna(np.inf).to_numpy()]
+    tape = tape.sort_values("ts_ms", kind="stable").reset_index(drop=True)
+    tape = trade_store.with_dt_utc(tape)
+    tape = tape[["ts_ms", "dt_utc", "venue", "price", "qty_base", "side"]]
+    tape["t_sec"] = (tape["ts_ms"] // 1000).astype("int64")
+
+    venue = tape["venue"].astype(str)
+    sets = {}
+    for label, cut in cuts.items():
+        thr = venue.map(cut).fillna(np.inf).to_numpy()
+        sets[label] = (cut, tape[tape["qty_base"].to_numpy() >= thr])
+    return sets
+
+
+def fit_unit(date: str, label: str, ts_ms):
+    # EM + polish fit of one event set -> comparison row (params file written as a side effect)
+    row = {"label": label, "events": len(ts_ms)}
+    if len(ts_ms) < MIN_EVENTS:
+        return row
+    t = np.sort(np.asarray(ts_ms, dtype=np.int64)) / 1000.0
+    t = t - t[0]
+    T = t[-1]
+
+    c0 = time.perf_counter()
+    mu, alpha, beta, info = hawkes_em.em_fit(t, T, max_iter=EM_ITER)
+    x0 = np.array([mu, min(alpha / beta, MAX_BRANCHING - 2 * EPS), beta])
+    res = minimize(nll_mnb, x0, args=(t, T, MAX_BRANCHING), jac=True, method="L-BFGS-B",
+                   bounds=bounds(MAX_BRANCHING) + [(EPS, None)])
+    mu, n, beta = res.x
+    fit_hawkes_1d.write_params(params_path(date, label), len(t), T, mu, n * beta, beta)
+    row.update({
+        "mu": mu, "alpha": n * beta, "beta": beta,
+        "branching_ratio": n, "half_life_seconds": np.log(2) / beta,
+        "loglik": -res.fun, "loglik_per_event": -res.fun / len(t),
+        "em_iterations": info["iterations"], "polish_nfev": int(res.nfev), "converged": bool(res.success),
+        "fit_seconds": time.perf_counter() - c0,
+    })
+    return row
+
+
+def sweep(date, venues=large_trade_events.VENUES, thresholds=THRESHOLDS, quantiles=QUANTILES, workers=None):
+    sets = event_sets(date, venues, thresholds, quantiles)
+
+    info = {}
+    for label, (cut, large) in sets.items():
+        out = events_path(date, label)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        large.to_csv(out, index=False)
+        series_store.write_events(out, large["ts_ms"].to_numpy())
+        counts = large["venue"].value_counts()
+        info[label] = {f"cut_{v}": cut.get(v, np.nan) for v in venues}
+        info[label].update({f"events_{v}": int(counts.get(v, 0)) for v in venues})
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futs = [pool.submit(fit_unit, date, label, large["ts_ms"].to_numpy())
+                for label, (_, large) in sets.items()]
+        rows = [f.result() for f in futs]
+
+    table = pd.DataFrame([{**r, **info[r["label"]]} for r in rows])
+    out = out_path(date)
+    table.to_csv(out, index=False)
+    return out, table
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--date", default=DATE)
+    ap.add_argument("--venues", default=",".join(large_trade_events.VENUES))
+    ap.add_argument("--thresholds", default=",".join(f"{x:g}" for x in THRESHOLDS), help="absolute BTC cut-offs")
+    ap.add_argument("--quantiles", default=",".join(f"{p:g}" for p in QUANTILES), help="per-venue size quantiles")
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    venues = [v for v in args.venues.split(",") if v]
+    thresholds = [float(x) for x in args.thresholds.split(",") if x]
+    quantiles = [float(x) for x in args.quantiles.split(",") if x]
+
+    c0 = time.perf_counter()
+    out, table = sweep(args.date, venues, thresholds, quantiles, args.workers)
+    print("Wrote:", out)
+    print(f"Event sets: {len(table)}  elapsed {time.perf_counter() - c0:.1f}s")
+    cols = ["label", "events", "mu", "alpha", "beta", "branching_ratio", "half_life_seconds", "loglik_per_event"]
+    print(table.reindex(columns=cols).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
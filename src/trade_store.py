@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Canonical columnar trade store.
+#
+# data/processed/trades/venue=<venue>/date=<YYYY-MM-DD>/part-0.parquet
+#
+# One file per (venue, UTC day), sorted by ts_ms, typed columns, row-group
+# statistics on ts_ms so time-range filters skip whole row groups.
+# venue and date live in the path (hive partitioning), not in the files.
+
+STORE = Path("data/processed/trades")
+ROW_GROUP = 1_000_000
+
+SCHEMA = pa.schema([
+    ("ts_ms", pa.int64()),
+    ("symbol", pa.string()),
+    ("trade_id", pa.string()),
+    ("price", pa.float64()),
+    ("qty_base", pa.float64()),
+    ("side", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("venue", pa.string()), ("date", pa.string())]),
+    flavor="hive",
+)
+
+
+def partition_path(venue, date, root=STORE):
+    return Path(root) / f"venue={venue}" / f"date={date}"
+
+
+def to_table(df):
+    # Canonical normalized frame (ts_ms, venue, symbol, trade_id, price, qty_base, side) -> typed table
+    out = pd.DataFrame({
+        "ts_ms": df["ts_ms"].astype("int64"),
+        "symbol": df["symbol"].astype(str),
+        "trade_id": df["trade_id"].astype(str),
+        "price": df["price"].astype("float64"),
+        "qty_base": df["qty_base"].astype("float64"),
+        "side": df["side"].astype(str),
+    })
+    return pa.Table.from_pandas(out, schema=SCHEMA, preserve_index=False)
+
+
+def writer(venue, date, root=STORE):
+    # Incremental writer for one partition (caller writes tables in ts_ms order)
+    d = partition_path(venue, date, root)
+    d.mkdir(parents=True, exist_ok=True)
+    return pq.ParquetWriter(d / "part-0.parquet", SCHEMA, compression="zstd")
+
+
+def write_day(df, venue, date, root=STORE):
+    # Replace one (venue, date) partition with the given trades
+    df = df.sort_values("ts_ms", kind="stable")
+    path = partition_path(venue, date, root) / "part-0.parquet"
+    with writer(venue, date, root) as w:
+        w.write_table(to_table(df), row_group_size=ROW_GROUP)
+    return path
+
+
+def dataset(root=STORE):
+    return ds.dataset(str(root), format="parquet", partitioning=PARTITIONING)
+
+
+def _filter(venues=None, dates=None, start_ms=None, end_ms=None):
+    f = None
+    parts = []
+    if venues is not None:
+        parts.append(ds.field("venue").isin(list(venues)))
+    if dates is not None:
+        parts.append(ds.field("date").isin([str(d) for d in dates]))
+    if start_ms is not None:
+        parts.append(ds.field("ts_ms") >= int(start_ms))
+    if end_ms is not None:
+        parts.append(ds.field("ts_ms") < int(end_ms))
+    for p in parts:
+        f = p if f is None else f & p
+    return f
+
+
+def read_trades(venues=None, dates=None, columns=None, start_ms=None, end_ms=None, root=STORE):
+    # Projected, filtered read into pandas; [start_ms, end_ms) is pushed down to row groups.
+    # Partitions are read in (venue, date) path order and each file is ts-sorted.
+    table = dataset(root).to_table(
+        columns=columns,
+        filter=_filter(venues, dates, start_ms, end_ms),
+    )
+    return table.to_pandas()
+
+
+def iter_batches(venues=None, dates=None, columns=None, start_ms=None, end_ms=None,
+                 batch_size=1_000_000, root=STORE):
+    # Same as read_trades but yields pandas chunks, for bounded-memory scans
+    scanner = dataset(root).scanner(
+        columns=columns,
+        filter=_filter(venues, dates, start_ms, end_ms),
+        batch_size=batch_size,
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def with_dt_utc(df):
+    df["dt_utc"] = pd.to_datetime(df["ts_ms"].to_numpy(np.int64), unit="ms", utc=True)
+    return df
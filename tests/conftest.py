@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# src/ is a flat directory of scripts; make its modules importable the way they import each other
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import build_premium_1s
+import trade_store
+
+DATE = "2024-11-05"
+T0 = int(pd.Timestamp(DATE, tz="UTC").timestamp() * 1000)
+
+
+def write_venue(venue, ts_ms, price):
+    n = len(ts_ms)
+    trade_store.write_day(pd.DataFrame({
+        "ts_ms": T0 + np.asarray(ts_ms), "symbol": "BTCUSDT", "trade_id": np.arange(n).astype(str),
+        "price": price, "qty_base": 0.1, "side": "Buy",
+    }), venue, DATE)
+
+
+def by_second(path):
+    df = pd.read_csv(path)
+    return df.sort_values(["t_sec", "venue"], ignore_index=True)
+
+
+def test_stream_matches_in_memory_build_with_bad_prices(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # second 2: a zero price on binance (-inf premium); second 3: a negative price on bybit (NaN, dropped)
+    write_venue("binance", [100, 900, 1500, 2500, 3500], [100.0, 101.0, 102.0, 0.0, 104.0])
+    write_venue("bybit", [200, 1200, 2200, 3200], [100.5, 101.5, 102.5, -1.0])
+    write_venue("gate", [300, 2300, 3300], [99.5, 102.2, 103.9])
+
+    build_premium_1s.build(DATE, ["binance", "bybit", "gate"])
+    mem = by_second(build_premium_1s.out_path(DATE))
+    build_premium_1s.build_stream(DATE, ["binance", "bybit", "gate"], batch_rows=2)
+    stream = by_second(build_premium_1s.out_path(DATE))
+
+    pd.testing.assert_frame_equal(stream, mem)
+    assert np.isneginf(mem["log_premium"]).sum() == 1
+
+
+def test_stream_writes_header_when_nothing_is_emitted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_venue("binance", [100, 200], [-1.0, -2.0])  # every premium is NaN
+
+    out, stats = build_premium_1s.build_stream(DATE, ["binance"])
+    assert stats["rows"] == 0
+    df = pd.read_csv(out)
+    assert len(df) == 0
+    assert list(df.columns) == ["t_sec", "dt_utc", "venue", "symbol", "price_venue", "price_ref", "log_premium"]
+
+
+@pytest.mark.parametrize("x, expected", [(2.0, np.log(2.0)), (0.0, -np.inf), (-1.0, np.nan)])
+def test_log_matches_numpy(x, expected):
+    np.testing.assert_equal(build_premium_1s._log(x), expected)
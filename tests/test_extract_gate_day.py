@@ -0,0 +1,39 @@
+import gzip
+import json
+
+import extract_gate_day
+import trade_store
+
+LINES = [
+    "1730764800.5,1,75000.0,0.010,1",   # 2024-11-05
+    "1730764801.25,2,75001.0,0.020,2",
+    "not-a-time,3,75002.0,0.030,1",     # dropped: unparseable timestamp
+    "1730851199.0,4,75003.0,0.040,2",
+    "1730851200.0,5,75004.0,0.050,1",   # 2024-11-06
+    ",6,75005.0,0.060,",                 # dropped: empty timestamp
+    "1730851260.0,7,75006.0,0.070,9",   # unknown side code
+]
+
+
+def test_split_month_drops_unparseable_timestamps(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    raw = tmp_path / "BTC_USDT-202411.csv.gz"
+    with gzip.open(raw, "wt") as f:
+        f.write("\n".join(LINES) + "\n")
+
+    idx, days, total = extract_gate_day.split_month(raw, block_mb=1)
+    index = json.loads(idx.read_text())
+
+    assert sorted(days) == ["2024-11-05", "2024-11-06"]  # no INT64_MIN date key
+    assert total == len(LINES) and index["rows_dropped"] == 2
+    assert sum(e["rows"] for e in days.values()) + index["rows_dropped"] == total
+
+    # Row/byte ranges stay positions in the file and round-trip through the indexed read
+    day5 = days["2024-11-05"]
+    assert (day5["row_start"], day5["row_end"], day5["rows"]) == (0, 4, 3)
+    chunks, kept, _ = extract_gate_day.indexed_day(raw, "2024-11-05", day5)
+    assert kept == 3 and chunks[0]["trade_id"].tolist() == [1, 2, 4]
+
+    part = trade_store.read_trades(venues=["gate"], dates=["2024-11-06"])
+    assert part["trade_id"].astype(int).tolist() == [5, 7]
+    assert part["side"].tolist() == ["Buy", "Unknown"]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import OptimizeResult
+
+import fit_hawkes_1d
+from hawkes_exp import read_params
+from hawkes_sim import simulate
+
+MU, ALPHA, BETA = 0.3, 0.25, 0.5  # branching 0.5, ~54k events over a day-length horizon
+T = 90000.0
+
+
+@pytest.fixture(scope="module")
+def events_csv(tmp_path_factory):
+    t = simulate(MU, ALPHA, BETA, T, rng=8)
+    path = tmp_path_factory.mktemp("fit") / "large_trades_BTCUSDT_2024-11-05.csv"
+    pd.DataFrame({"ts_ms": np.round(1.7e12 + t * 1000.0).astype(np.int64)}).to_csv(path, index=False)
+    return path
+
+
+def test_fit_on_a_day_sized_event_set_is_stationary_and_moves(events_csv, tmp_path):
+    # The old start (alpha0 = 0.5 * events/s, beta0 = 1/30) sat past the stability wall at this
+    # event count and came back as the "fit" after zero iterations
+    out, res = fit_hawkes_1d.fit(events_csv, tmp_path / "params.txt")
+    vals = read_params(out)
+    assert res.nit > 0
+    assert float(vals["branching_ratio(alpha/beta)"]) < 0.999
+    assert float(vals["mu"]) == pytest.approx(MU, rel=0.1)
+    assert float(vals["alpha"]) / float(vals["beta"]) == pytest.approx(ALPHA / BETA, rel=0.1)
+
+
+def test_fit_refuses_to_write_an_unmoved_start(events_csv, tmp_path, monkeypatch):
+    def stuck(fun, x0, **kwargs):
+        return OptimizeResult(x=np.array([0.6, 0.3, 1 / 30]), success=True, nit=0, nfev=1, fun=1e50)
+
+    monkeypatch.setattr(fit_hawkes_1d, "minimize", stuck)
+    out = tmp_path / "params.txt"
+    with pytest.raises(SystemExit, match="no step from the start"):
+        fit_hawkes_1d.fit(events_csv, out)
+    assert not out.exists()
+
+
+def test_bootstrap_refuses_non_stationary_params(tmp_path):
+    # Checked before any pool work is submitted, instead of failing inside a worker
+    params = tmp_path / "params.txt"
+    fit_hawkes_1d.write_params(params, 55964, 86384.259, 0.6478495116, 0.3239247558, 1 / 30)
+    with pytest.raises(SystemExit, match="--search or --em"):
+        fit_hawkes_1d.bootstrap_params(params, tmp_path / "reps.csv", tmp_path / "ci.txt", reps=8)
+    assert not (tmp_path / "reps.csv").exists()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from scipy.optimize import minimize
+
+from hawkes_em import em_fit
+from hawkes_exp import neg_loglik
+from hawkes_sim import simulate
+
+MU, ALPHA, BETA = 0.5, 0.8, 2.0
+
+
+@pytest.fixture(scope="module")
+def events():
+    t = simulate(MU, ALPHA, BETA, 20000.0, rng=5)
+    return t - t[0], 20000.0 - t[0]
+
+
+def test_em_recovers_simulated_params(events):
+    t, T = events
+    mu, alpha, beta, info = em_fit(t, T)
+    assert info["converged"]
+    assert mu == pytest.approx(MU, rel=0.1)
+    assert alpha / beta == pytest.approx(ALPHA / BETA, rel=0.1)
+    assert beta == pytest.approx(BETA, rel=0.15)
+
+
+def test_em_chunked_matches_mle(events):
+    # Small chunks exercise the carried (R, D) state; the fixed point is the MLE
+    t, T = events
+    mu, alpha, beta, _ = em_fit(t, T, chunk=1000, warm=0)
+    res = minimize(neg_loglik, [0.4, 0.5, 1.0], args=(t, T), jac=True, method="L-BFGS-B",
+                   bounds=[(1e-9, None)] * 3)
+    np.testing.assert_allclose([mu, alpha, beta], res.x, rtol=2e-3)
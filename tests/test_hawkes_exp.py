@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from hawkes_exp import decayed_sums, intensity_at, neg_loglik
+from hawkes_sim import simulate
+
+MU, ALPHA, BETA = 0.4, 0.6, 1.5
+
+
+@pytest.fixture(scope="module")
+def events():
+    t = simulate(MU, ALPHA, BETA, 600.0, rng=1)
+    return t - t[0], 600.0 - t[0]
+
+
+def brute_nll(x, t, T, t_start=0.0, n_hist=0):
+    # O(N^2) conditional likelihood straight from the definition
+    mu, alpha, beta = x
+    ll = 0.0
+    for i in range(n_hist, len(t)):
+        ll += np.log(mu + alpha * np.sum(np.exp(-beta * (t[i] - t[:i]))))
+    d0 = np.maximum(t_start - t, 0.0)
+    ll -= mu * (T - t_start) + alpha / beta * np.sum(np.exp(-beta * d0) - np.exp(-beta * (T - t)))
+    return -ll
+
+
+def fd_grad(f, x, h=1e-6):
+    x = np.asarray(x, dtype=float)
+    g = np.empty_like(x)
+    for k in range(len(x)):
+        e = np.zeros_like(x)
+        e[k] = h * max(abs(x[k]), 1.0)
+        g[k] = (f(x + e) - f(x - e)) / (2 * e[k])
+    return g
+
+
+def test_decayed_sums_blocks_match_recursion(events):
+    t, _ = events
+    S = np.zeros(len(t))
+    for i in range(1, len(t)):
+        S[i] = np.exp(-BETA * (t[i] - t[i - 1])) * (S[i - 1] + 1.0)
+    np.testing.assert_allclose(decayed_sums(t, BETA, block=37), S, rtol=1e-11, atol=1e-13)
+
+
+def test_neg_loglik_value_matches_brute_force(events):
+    t, T = events
+    x = (0.35, 0.5, 1.2)
+    f, _ = neg_loglik(x, t, T)
+    assert f == pytest.approx(brute_nll(x, t, T), rel=1e-11)
+
+
+def test_neg_loglik_gradient_matches_finite_differences(events):
+    t, T = events
+    x = np.array([0.35, 0.5, 1.2])
+    _, g = neg_loglik(x, t, T)
+    np.testing.assert_allclose(g, fd_grad(lambda z: neg_loglik(z, t, T)[0], x), rtol=1e-5, atol=1e-6)
+
+
+def test_conditional_likelihood_scores_only_the_window(events):
+    t, T = events
+    t_start = t[len(t) // 3] + 1e-3
+    n_hist = int(np.searchsorted(t, t_start))
+    x = np.array([0.35, 0.5, 1.2])
+
+    f, g = neg_loglik(x, t, T, t_start=t_start, n_hist=n_hist)
+    assert f == pytest.approx(brute_nll(x, t, T, t_start, n_hist), rel=1e-11)
+    fd = fd_grad(lambda z: neg_loglik(z, t, T, t_start=t_start, n_hist=n_hist)[0], x)
+    np.testing.assert_allclose(g, fd, rtol=1e-5, atol=1e-6)
+
+
+def test_neg_loglik_rejects_unstable_params(events):
+    t, T = events
+    f, g = neg_loglik((0.3, 2.0, 1.0), t, T, max_branching=0.999)
+    assert f >= 1e50 and not g.any()
+
+
+def test_intensity_at_matches_brute_force(events):
+    t, _ = events
+    rng = np.random.default_rng(2)
+    q = np.concatenate([rng.uniform(-1.0, t[-1] + 5.0, 200), t[:20]])  # unsorted, incl. event times
+    lam = intensity_at(t, q, MU, ALPHA, BETA)
+    ref = np.array([MU + ALPHA * np.sum(np.exp(-BETA * (s - t[t <= s]))) for s in q])
+    np.testing.assert_allclose(lam, ref, rtol=1e-11)
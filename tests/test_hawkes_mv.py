@@ -0,0 +1,45 @@
+import numpy as np
+
+from hawkes_mv import _nll_z, layout, neg_loglik_mv, pack
+from hawkes_sim import simulate_mv
+
+D = 2
+MU = np.array([0.3, 0.2])
+ALPHA = np.array([[0.4, 0.2], [0.3, 0.5]])
+BETA = np.array([1.0, 2.0])
+
+
+def fd_grad(f, x, h=1e-6):
+    g = np.empty_like(x)
+    for k in range(len(x)):
+        e = np.zeros_like(x)
+        e[k] = h * max(abs(x[k]), 1.0)
+        g[k] = (f(x + e) - f(x - e)) / (2 * e[k])
+    return g
+
+
+def sample():
+    t, marks = simulate_mv(MU, ALPHA, BETA, 500.0, rng=3)
+    return t, marks, 500.0
+
+
+def test_neg_loglik_mv_matches_brute_force():
+    t, marks, T = sample()
+    f, _ = neg_loglik_mv(pack(MU, ALPHA, BETA), t, marks, T, D)
+    ll = 0.0
+    for i in range(len(t)):
+        k = marks[i]
+        past = np.arange(i)
+        lam = MU[k] + np.sum(ALPHA[k, marks[past]] * np.exp(-BETA[marks[past]] * (t[i] - t[past])))
+        ll += np.log(lam)
+    ll -= MU.sum() * T + np.sum(ALPHA[:, marks].sum(axis=0) / BETA[marks] * (1 - np.exp(-BETA[marks] * (T - t))))
+    assert abs(f + ll) <= 1e-10 * abs(ll)
+
+
+def test_nll_z_gradient_matches_finite_differences():
+    t, marks, T = sample()
+    lay = layout(t, marks, D)
+    z = pack(np.log(MU), ALPHA / BETA[None, :], np.log(BETA))
+    _, g = _nll_z(z, t, marks, T, D, 0.999, lay)
+    fd = fd_grad(lambda y: _nll_z(y, t, marks, T, D, 0.999, lay)[0], z)
+    np.testing.assert_allclose(g, fd, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from hawkes_sim import simulate
+from hawkes_sumexp import _nll_powerlaw, _nll_sumexp, neg_loglik_sum, powerlaw_grid
+
+
+def fd_grad(f, x, h=1e-6):
+    g = np.empty_like(x)
+    for k in range(len(x)):
+        e = np.zeros_like(x)
+        e[k] = h * max(abs(x[k]), 1.0)
+        g[k] = (f(x + e) - f(x - e)) / (2 * e[k])
+    return g
+
+
+def sample():
+    t = simulate(0.4, 0.6, 1.5, 400.0, rng=4)
+    return t - t[0], 400.0 - t[0]
+
+
+def test_neg_loglik_sum_matches_brute_force():
+    t, T = sample()
+    mu, a, b = 0.3, np.array([0.4, 0.01]), np.array([2.0, 0.05])
+    f = neg_loglik_sum(mu, a, b, t, T)[0]
+    ll = sum(np.log(mu + np.sum(a[:, None] * np.exp(-b[:, None] * (t[i] - t[None, :i])))) for i in range(len(t)))
+    ll -= mu * T + np.sum(a / b * np.sum(1 - np.exp(-b[:, None] * (T - t[None, :])), axis=1))
+    assert abs(f + ll) <= 1e-10 * abs(ll)
+
+
+def test_nll_sumexp_gradient_matches_finite_differences():
+    t, T = sample()
+    K = 3
+    z = np.concatenate([[np.log(0.3), 0.45], [0.2, -0.1, 0.0], np.log([3.0, 0.5, 0.02])])
+    _, g = _nll_sumexp(z, t, T, K)
+    fd = fd_grad(lambda y: _nll_sumexp(y, t, T, K)[0], z)
+    np.testing.assert_allclose(g, fd, rtol=1e-5, atol=1e-5)
+
+
+def test_nll_powerlaw_gradient_matches_finite_differences():
+    t, T = sample()
+    b = powerlaw_grid(6)
+    z = np.array([np.log(0.3), 0.4, 0.3])
+    _, g = _nll_powerlaw(z, t, T, b)
+    fd = fd_grad(lambda y: _nll_powerlaw(y, t, T, b)[0], z)
+    np.testing.assert_allclose(g, fd, rtol=1e-5, atol=1e-5)
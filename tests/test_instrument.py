@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import instrument
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+
+def run_script(tmp_path, body):
+    # A module-level script using instrument.track, run in its own interpreter
+    script = tmp_path / "script.py"
+    script.write_text("import instrument\nrec = instrument.track('demo')\nrec.rows(3)\n" + body)
+    jsonl = tmp_path / "profile.jsonl"
+    env = dict(os.environ, PYTHONPATH=str(SRC), **{instrument.ENV: str(jsonl)})
+    proc = subprocess.run([sys.executable, str(script)], env=env, capture_output=True, text=True)
+    recs = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    return proc.returncode, recs
+
+
+def test_track_records_a_finished_script_as_ok(tmp_path):
+    code, recs = run_script(tmp_path, "rec.finish()\n")
+    assert code == 0
+    assert [(r["stage"], r["status"], r["rows"]) for r in recs] == [("demo", "ok", {"rows": 3})]
+
+
+def test_track_records_system_exit_as_error(tmp_path):
+    code, recs = run_script(tmp_path, "raise SystemExit('Too few events (3).')\nrec.finish()\n")
+    assert code == 1
+    assert len(recs) == 1 and recs[0]["status"] == "error"
+    assert "before the end" in recs[0]["error"]
+
+
+def test_track_records_uncaught_exception_once(tmp_path):
+    code, recs = run_script(tmp_path, "raise ValueError('bad input')\nrec.finish()\n")
+    assert code == 1
+    assert len(recs) == 1 and recs[0]["status"] == "error" and "bad input" in recs[0]["error"]
+
+
+def test_timed_records_system_exit_as_error(tmp_path, monkeypatch):
+    jsonl = tmp_path / "p.jsonl"
+    monkeypatch.setenv(instrument.ENV, str(jsonl))
+
+    @instrument.timed("demo_fn")
+    def fail():
+        raise SystemExit("no rows")
+
+    with pytest.raises(SystemExit):
+        fail()
+    rec = json.loads(jsonl.read_text())
+    assert rec["stage"] == "demo_fn" and rec["status"] == "error"
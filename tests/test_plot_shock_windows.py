@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from plot_shock_windows import minmax_downsample
+
+
+def brute(x, y, buckets):
+    # first min / first max per equal-width time bucket
+    xv = x.astype(float)
+    b = np.minimum(((xv - xv[0]) / (xv[-1] - xv[0]) * buckets).astype(int), buckets - 1)
+    keep = set()
+    for k in np.unique(b):
+        idx = np.flatnonzero(b == k)
+        yy = y[idx]
+        if np.all(np.isnan(yy)):
+            continue
+        keep.add(idx[np.nanargmin(yy)])
+        keep.add(idx[np.nanargmax(yy)])
+    return np.array(sorted(keep))
+
+
+def test_buckets_are_equal_width_in_time_across_gaps():
+    # dense first hour, a 5h gap, then sparse data: row-count buckets would spend
+    # almost every bucket on the dense hour
+    rng = np.random.default_rng(9)
+    x = np.r_[np.arange(0, 3600, 1.0), np.arange(21600, 28800, 60.0)]
+    y = rng.normal(size=len(x))
+    y[100:130] = np.nan
+    xs, ys = minmax_downsample(x, y, 50)
+    ref = brute(x, y, 50)
+    np.testing.assert_array_equal(xs, x[ref])
+    np.testing.assert_array_equal(ys, y[ref])
+    # a 576s bucket width: at most 2 points per bucket, the sparse tail kept at its own resolution
+    assert np.all(np.bincount(np.minimum((xs / (28740 / 50)).astype(int), 49)) <= 2)
+    assert np.nanmax(y) in ys and np.nanmin(y) in ys
+
+
+def test_datetime_axis_and_short_series():
+    t = pd.date_range("2024-11-05", periods=5000, freq="s", tz="UTC").to_numpy()
+    y = np.sin(np.arange(5000) / 50.0)
+    xs, ys = minmax_downsample(t, y, 100)
+    assert xs.dtype == t.dtype and len(xs) <= 200
+    ref = brute(pd.to_datetime(t).asi8, y, 100)
+    np.testing.assert_array_equal(xs, t[ref])
+
+    naive = t.astype("datetime64[ns]") if t.dtype.kind == "M" else pd.to_datetime(t).tz_localize(None).to_numpy()
+    np.testing.assert_array_equal(minmax_downsample(naive, y, 100)[1], ys)
+
+    xs, ys = minmax_downsample(t[:150], y[:150], 100)
+    assert len(xs) == 150
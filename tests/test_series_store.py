@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import series_store
+
+
+def test_write_read_round_trip(tmp_path):
+    arr = np.random.default_rng(6).normal(size=1000)
+    path = series_store.write(tmp_path / "x.bin", arr, kind="test", note="round trip")
+    back, meta = series_store.read(path)
+    assert isinstance(back, np.memmap)
+    np.testing.assert_array_equal(back, arr)
+    assert meta["kind"] == "test" and meta["note"] == "round trip" and meta["length"] == 1000
+
+
+def test_empty_series(tmp_path):
+    back, meta = series_store.read(series_store.write(tmp_path / "e.bin", np.empty(0, dtype=np.int64)))
+    assert len(back) == 0 and meta["length"] == 0
+
+
+def test_event_mirror_is_rebuilt_when_csv_is_newer(tmp_path):
+    csv = tmp_path / "large_trades_BTCUSDT_2024-11-05.csv"
+    pd.DataFrame({"ts_ms": [3000, 1000, 2000]}).to_csv(csv, index=False)
+    np.testing.assert_array_equal(series_store.event_times_ms(csv), [1000, 2000, 3000])
+    assert series_store.events_bin(csv).exists()
+
+    pd.DataFrame({"ts_ms": [5000, 4000]}).to_csv(csv, index=False)
+    b = series_store.events_bin(csv)
+    t = b.stat().st_mtime - 10
+    os.utime(b, (t, t))
+    np.testing.assert_array_equal(series_store.event_times_ms(csv), [4000, 5000])
+
+
+def test_lambda_grid_seconds(tmp_path):
+    path = series_store.write_lambda(tmp_path / "lam.bin", [1.0, 2.0, 3.0], t0=100.5, dt=1.0, mu=0.1)
+    frame = series_store.lambda_frame(path)
+    assert frame["t_sec"].tolist() == [100, 101, 102]
+    assert frame["lambda"].tolist() == [1.0, 2.0, 3.0]
+    assert series_store.read_header(path)["mu"] == 0.1
+
+
+def test_concurrent_writers_leave_one_whole_file(tmp_path):
+    # Writers of the same mirror use their own temp files; the survivor is always complete
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = tmp_path / "events.ts_ms.bin"
+    arrays = [np.full(200_000, k, dtype=np.int64) for k in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda a: series_store.write(path, a, kind="events"), arrays))
+    back, meta = series_store.read(path)
+    assert meta["length"] == 200_000 and len(np.unique(back)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
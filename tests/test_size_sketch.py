@@ -0,0 +1,43 @@
+import numpy as np
+
+from size_sketch import ALPHA, SizeSketch
+
+QS = [0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 0.999, 1.0]
+
+
+def sizes(n=200_000, seed=7):
+    rng = np.random.default_rng(seed)
+    return rng.lognormal(-4.0, 2.0, n), np.arange(n, dtype=np.int64)
+
+
+def test_quantiles_within_relative_error():
+    x, ts = sizes()
+    sk = SizeSketch().add(x, ts)
+    exact = np.quantile(x, QS, method="lower")
+    assert np.all(np.abs(sk.quantile(QS) - exact) <= ALPHA * exact * (1 + 1e-9))
+    assert sk.count == len(x) and sk.min == x.min() and sk.max == x.max()
+
+
+def test_merge_is_order_independent_and_matches_one_pass():
+    x, ts = sizes()
+    parts = np.array_split(np.arange(len(x)), 7)
+    one = SizeSketch().add(x, ts)
+    fwd, rev = SizeSketch(), SizeSketch()
+    for p in parts:
+        fwd.merge(SizeSketch().add(x[p], ts[p]))
+    for p in parts[::-1]:
+        rev.merge(SizeSketch().add(x[p], ts[p]))
+    for sk in (fwd, rev):
+        np.testing.assert_array_equal(sk.quantile(QS), one.quantile(QS))
+        assert sk.count == one.count
+    np.testing.assert_array_equal(fwd.top["qty"], np.sort(x)[::-1][:len(fwd.top)])
+    np.testing.assert_array_equal(fwd.top["ts_ms"], ts[np.argsort(-x)][:len(fwd.top)])
+
+
+def test_dict_round_trip():
+    x, ts = sizes(5000)
+    sk = SizeSketch().add(x, ts)
+    back = SizeSketch.from_dict(sk.to_dict())
+    np.testing.assert_array_equal(back.quantile(QS), sk.quantile(QS))
+    for f in ["qty", "ts_ms"]:
+        np.testing.assert_array_equal(back.top[f], sk.top[f])